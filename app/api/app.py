@@ -1,13 +1,17 @@
+import os
+import time
+import importlib
+import threading
 from pathlib import Path
-from typing import Optional, List, Literal
+from typing import Optional, List, Literal, Dict, Any
 
-import pandas as pd
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Header
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from fastapi.responses import PlainTextResponse
+from pydantic import BaseModel, Field
 from dotenv import load_dotenv
 from fastapi import Body
-from backend.app.services.scheduler import get_last_events
+from backend.app.services.scheduler import get_inbox_page, get_thread_events, thread_state, cached_draft, save_draft
 
 from fastapi import APIRouter
 
@@ -21,7 +25,8 @@ load_dotenv(BACKEND_ROOT / ".env")
 from backend.app.models.ai_stub import AIStub
 from backend.app.pipelines.build_dataset_fast import build_state
 from backend.app.services.llm import draft_email_from_state, draft_message_from_state
-from backend.app.services.scheduler import start_scheduler
+from backend.app.services.scheduler import start_scheduler, set_model
+from backend.app.services import metrics, tracing
 
 # ---------- Paths ----------
 DATASET = BACKEND_ROOT / "data" / "processed" / "dataset.parquet"
@@ -31,6 +36,23 @@ MODEL_PATH = STORAGE / "ai_stub.joblib"
 # ---------- App ----------
 app = FastAPI(title="ShadowShift API")
 
+HTTP_SECONDS = metrics.histogram("shadowshift_http_request_seconds", "API request latency", ("method", "route", "status"))
+
+@app.middleware("http")
+async def _observe_latency(request, call_next):
+    started = time.perf_counter()
+    status = 500
+    with tracing.span(f"{request.method} {request.url.path}") as sp:
+        try:
+            response = await call_next(request)
+            status = response.status_code
+            return response
+        finally:
+            # label by route template (/poll/jobs/{job_id}), not the raw path
+            route = getattr(request.scope.get("route"), "path", "unmatched")
+            sp.set(route=route, status=status)
+            HTTP_SECONDS.observe(time.perf_counter() - started, method=request.method, route=route, status=status)
+
 # CORS (dev open; prod: restrict to FE origin)
 app.add_middleware(
     CORSMiddleware,
@@ -51,6 +73,12 @@ except Exception as _e:
 
 MODEL: Optional[AIStub] = None
 READY = False
+# model loading runs in a background thread (MODEL_WARMUP=blocking to wait for it at startup);
+# /health reports its progress
+WARMUP: Dict[str, Any] = {"state": "pending", "step": None, "done": [], "started_at": None,
+                          "seconds": None, "error": None}
+# imported during warm-up so the first /act or draft request does not pay for them
+WARM_IMPORTS = ("pandas", "openai")
 
 # ---------- Schemas ----------
 class RecommendIn(BaseModel):
@@ -94,31 +122,61 @@ def _exists_and_newer(path_a: Path, path_b: Path) -> bool:
     return path_a.stat().st_mtime >= path_b.stat().st_mtime
 
 # ---------- Lifecycle ----------
-@app.on_event("startup")
-def startup():
-    """Load or (re)fit the baseline model."""
+def _warm_step(step: Optional[str]) -> None:
+    if WARMUP["step"]:
+        WARMUP["done"].append(WARMUP["step"])
+    WARMUP["step"] = step
+
+def warm_up():
+    """Load or (re)fit the baseline model, then pre-import what the first requests need."""
     global READY, MODEL
     READY = False
+    WARMUP.update(state="running", step=None, done=[], started_at=time.time(), seconds=None, error=None)
+    started = time.perf_counter()
     STORAGE.mkdir(parents=True, exist_ok=True)
-
-    if not DATASET.exists():
-        print(f"[startup] Dataset missing at {DATASET}")
-        return
-
     try:
-        if _exists_and_newer(MODEL_PATH, DATASET):
-            MODEL = AIStub.load(MODEL_PATH)
-            print(f"[startup] Loaded model from {MODEL_PATH}")
-        else:
-            df = pd.read_parquet(DATASET)
-            MODEL = AIStub()
-            MODEL.fit(df)
-            MODEL.save(MODEL_PATH)
-            print(f"[startup] Fitted & saved model → {MODEL_PATH}")
-        READY = True
-    except Exception as e:
-        print(f"[startup] init error: {e}")
-        READY = False
+        if not DATASET.exists():
+            print(f"[startup] Dataset missing at {DATASET}")
+            WARMUP.update(state="failed", error=f"dataset missing at {DATASET}")
+            return
+        try:
+            if _exists_and_newer(MODEL_PATH, DATASET):
+                _warm_step("load_model")
+                MODEL = AIStub.load(MODEL_PATH)
+                print(f"[startup] Loaded model from {MODEL_PATH}")
+            else:
+                _warm_step("fit_model")
+                import pandas as pd
+                df = pd.read_parquet(DATASET)
+                MODEL = AIStub()
+                MODEL.fit(df)
+                MODEL.save(MODEL_PATH)
+                print(f"[startup] Fitted & saved model → {MODEL_PATH}")
+            set_model(MODEL)
+            READY = True
+        except Exception as e:
+            print(f"[startup] init error: {e}")
+            READY = False
+            WARMUP.update(state="failed", error=str(e))
+            return
+        for name in WARM_IMPORTS:
+            _warm_step(f"import:{name}")
+            try:
+                importlib.import_module(name)
+            except ImportError as e:
+                print(f"[startup] warm-up import {name} failed: {e}")
+        _warm_step(None)
+        WARMUP["state"] = "ready"
+    finally:
+        WARMUP["seconds"] = round(time.perf_counter() - started, 2)
+
+@app.on_event("startup")
+def startup():
+    if os.getenv("MODEL_WARMUP", "background") == "blocking":
+        warm_up()
+    else:
+        WARMUP["state"] = "running"
+        threading.Thread(target=warm_up, name="model-warmup", daemon=True).start()
 
 @app.on_event("startup")
 def start_bg_tasks():
@@ -130,11 +188,15 @@ def start_bg_tasks():
 # ---------- Routes ----------
 @app.get("/health")
 def health():
+    from backend.app.services import resilience
     return {
         "ready": READY,
+        "warmup": {**WARMUP, "done": list(WARMUP["done"])},
         "dataset_exists": DATASET.exists(),
         "model_path": str(MODEL_PATH),
         "model_saved": MODEL_PATH.exists(),
+        "breakers": resilience.breakers_snapshot(),
+        "hedging": resilience.hedge_stats(),
     }
 
 @app.get("/config")
@@ -174,12 +236,14 @@ def act(inp: ActIn):
     if inp.state:
         state_str = inp.state
     elif inp.events:
-        df = pd.DataFrame(inp.events)
-        if "ts" not in df.columns and "timestamp" in df.columns:
-            df["ts"] = pd.to_datetime(df["timestamp"], utc=True)
-        if "actor" not in df.columns:
-            df["actor"] = df.get("author") or "other"
-        df = df.sort_values("ts").reset_index(drop=True)
+        import pandas as pd
+        with tracing.span("act.dataframe", events=len(inp.events)):
+            df = pd.DataFrame(inp.events)
+            if "ts" not in df.columns and "timestamp" in df.columns:
+                df["ts"] = pd.to_datetime(df["timestamp"], utc=True)
+            if "actor" not in df.columns:
+                df["actor"] = df.get("author") or "other"
+            df = df.sort_values("ts").reset_index(drop=True)
         state_str = build_state(df, N=5)
     else:
         raise HTTPException(status_code=422, detail="Provide either 'state' or 'events'")
@@ -237,12 +301,71 @@ def debug_env2():
     ]
     return {k: (os.getenv(k)[:6] + "..." if os.getenv(k) else "") for k in keys}
 
-@app.post("/poll/now")
+@app.post("/poll/now", status_code=202)
 def poll_now():
-    from backend.app.services.scheduler import poll
+    from backend.app.services import poll_jobs
+    return poll_jobs.trigger()
+
+@app.get("/poll/jobs/{job_id}")
+def poll_job(job_id: str):
+    from backend.app.services import poll_jobs
+    job = poll_jobs.get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Poll job not found")
+    return job
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics_endpoint():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+class TracingIn(BaseModel):
+    enabled: bool
+
+@app.get("/debug/traces")
+def debug_traces(limit: int = 10):
+    """Slowest recent traces (span trees) while tracing is enabled."""
+    return {"enabled": tracing.enabled(), "traces": tracing.slowest(limit)}
+
+@app.post("/debug/tracing")
+def debug_tracing(inp: TracingIn):
+    tracing.set_enabled(inp.enabled)
+    if not inp.enabled:
+        tracing.clear()
+    return {"enabled": tracing.enabled()}
+
+@app.get("/debug/profile", response_class=PlainTextResponse)
+async def debug_profile(seconds: float = 5.0, interval_ms: float = 10.0):
+    """Sample all threads for `seconds` and return folded stacks (flamegraph.pl / speedscope input)."""
     import asyncio
-    stats = asyncio.run(poll())
-    return stats
+    from backend.app.services import profiler
+    if not (0 < seconds <= 60):
+        raise HTTPException(status_code=422, detail="seconds must be in (0,60]")
+    try:
+        prof = await asyncio.to_thread(profiler.profile_for, seconds, interval_ms)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return PlainTextResponse(prof.folded())
+
+@app.post("/debug/profile/start")
+def debug_profile_start(interval_ms: float = 10.0):
+    from backend.app.services import profiler
+    try:
+        return profiler.start(interval_ms)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+@app.post("/debug/profile/stop", response_class=PlainTextResponse)
+def debug_profile_stop():
+    from backend.app.services import profiler
+    prof = profiler.stop()
+    if prof is None:
+        raise HTTPException(status_code=404, detail="No profile was started")
+    return PlainTextResponse(prof.folded())
+
+@app.get("/llm/stats")
+def llm_stats(recent: int = 20):
+    from backend.app.services.llm import get_llm_stats
+    return get_llm_stats(recent=recent)
 
 @app.get("/poll/stats")
 def poll_stats():
@@ -251,14 +374,21 @@ def poll_stats():
 
 
 @app.get("/inbox")
-def inbox():
-    return get_last_events()
+def inbox(source: Optional[Literal["gmail", "discord", "github"]] = None, since: Optional[str] = None,
+          cursor: Optional[str] = None, limit: int = 50):
+    if not (1 <= limit <= 500):
+        raise HTTPException(status_code=422, detail="limit must be in [1,500]")
+    try:
+        return get_inbox_page(source=source, since=since, cursor=cursor, limit=limit)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
 
 class DraftFromThreadIn(BaseModel):
     source: Literal["gmail", "discord", "github"]
     thread_id: str
     max_words: int = 180
     model: Optional[str] = None
+    refresh: bool = False   # ignore a stored poller draft
 
 class DraftFreeIn(BaseModel):
     source: Literal["gmail", "discord", "github"]
@@ -268,22 +398,24 @@ class DraftFreeIn(BaseModel):
 
 @app.post("/draft/from-thread")
 def draft_from_thread(inp: DraftFromThreadIn):
-    events_by_source = get_last_events()
-    rows = [e for e in events_by_source.get(inp.source, []) if str(e.get("thread_id")) == str(inp.thread_id)]
+    # build_state only looks at the last 5 events
+    rows = get_thread_events(inp.source, inp.thread_id, last=5)
     if not rows:
-        raise HTTPException(status_code=404, detail="Thread not found in last poll")
-
-    df = pd.DataFrame(rows)
-    if "ts" not in df.columns and "timestamp" in df.columns:
-        df["ts"] = pd.to_datetime(df["timestamp"], errors="coerce", utc=True)
-        df["ts"] = df["ts"].fillna(pd.Timestamp.utcnow())
-    if "actor" not in df.columns:
-        df["actor"] = df.get("author") or "other"
-    if "text" not in df.columns:
-        df["text"] = df.get("snippet") or ""
-
-    df = df.sort_values("ts").reset_index(drop=True)
-    state = build_state(df, N=5)
+        raise HTTPException(status_code=404, detail="Thread not found in event store")
+
+    state = thread_state(rows)
+
+    # the poller may already have drafted this exact thread state
+    cached = None if inp.refresh else cached_draft(inp.source, inp.thread_id, state, inp.max_words, inp.model)
+    metrics.CACHE_REQUESTS.inc(cache="thread_draft", result="hit" if cached is not None else "miss")
+    if cached is not None:
+        return {
+            "state": state,
+            "subject": cached.get("subject", ""),
+            "body": cached.get("body", ""),
+            "model": cached.get("model", ""),
+            "cached": True,
+        }
 
     try:
         if inp.source == "gmail":
@@ -292,12 +424,14 @@ def draft_from_thread(inp: DraftFromThreadIn):
             draft = draft_message_from_state(state=state, platform=inp.source, max_words=inp.max_words, model=inp.model)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"LLM draft failed: {e}")
+    save_draft(inp.source, inp.thread_id, state, draft, inp.max_words)
 
     return {
         "state": state,
         "subject": draft.get("subject", ""),
         "body": draft.get("body", ""),
         "model": draft.get("model", ""),
+        "cached": False,
     }
 
 @app.post("/draft/free")
@@ -305,6 +439,7 @@ def draft_free(inp: DraftFreeIn):
     if not inp.messages:
         raise HTTPException(status_code=422, detail="messages cannot be empty")
 
+    import pandas as pd
     df = pd.DataFrame(inp.messages)
     if "ts" not in df.columns and "timestamp" in df.columns:
         df["ts"] = pd.to_datetime(df["timestamp"], errors="coerce", utc=True)
@@ -346,34 +481,64 @@ class SendDiscordIn(BaseModel):
     channel_id: str
     content: str
 
+class BulkMessageIn(BaseModel):
+    provider: Literal["gmail", "discord"]
+    # discord
+    channel_id: str | None = None
+    content: str | None = None
+    # gmail
+    to: str | None = None
+    subject: str | None = None
+    body: str | None = None
+    thread_id: str | None = None
+    in_reply_to: str | None = None
+    idempotency_key: str | None = None
+
+class SendBulkIn(BaseModel):
+    messages: List[BulkMessageIn]
+    concurrency: Optional[int] = Field(None, ge=1, le=64)
+
+def _send_error(e: Exception, provider: str) -> HTTPException:
+    from backend.app.services.outbound import IdempotencyConflict
+    if isinstance(e, IdempotencyConflict):
+        return HTTPException(status_code=409, detail=str(e))
+    if isinstance(e, ValueError):
+        return HTTPException(status_code=422, detail=str(e))
+    return HTTPException(status_code=500, detail=f"{provider} send failed: {e}")
+
 @app.post("/send/gmail")
-def send_gmail_endpoint(inp: SendGmailIn):
-    from backend.app.services import gmail_services
+async def send_gmail_endpoint(inp: SendGmailIn, idempotency_key: Optional[str] = Header(None)):
+    from backend.app.services import outbound
     try:
-        res = gmail_services.send_gmail(
-            to=inp.to,
-            subject=inp.subject,
-            body=inp.body,
-            thread_id=inp.thread_id,
-            in_reply_to=inp.in_reply_to
-        )
-        return {"ok": True, "message_id": res.get("id"), "thread_id": res.get("threadId")}
+        res = await outbound.send_async({"provider": "gmail", **inp.model_dump(), "idempotency_key": idempotency_key})
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Gmail send failed: {e}")
+        raise _send_error(e, "Gmail")
+    return {"ok": True, "message_id": res.get("message_id"), "thread_id": res.get("thread_id"), "replayed": res["replayed"]}
 
 @app.post("/send/discord")
-def send_discord_endpoint(inp: SendDiscordIn):
-    import os, requests, json
-    token = os.getenv("DISCORD_BOT_TOKEN")
-    if not token:
+async def send_discord_endpoint(inp: SendDiscordIn, idempotency_key: Optional[str] = Header(None)):
+    from backend.app.services import outbound
+    # a configuration error, not a failed send: decided before the idempotency key is reserved
+    if not os.getenv("DISCORD_BOT_TOKEN"):
         raise HTTPException(status_code=400, detail="DISCORD_BOT_TOKEN missing")
+    try:
+        res = await outbound.send_async({"provider": "discord", **inp.model_dump(), "idempotency_key": idempotency_key})
+    except Exception as e:
+        raise _send_error(e, "Discord")
+    return {"ok": True, "message_id": res.get("message_id"), "replayed": res["replayed"]}
 
-    url = f"https://discord.com/api/v10/channels/{inp.channel_id}/messages"
-    headers = {"Authorization": f"Bot {token}", "Content-Type": "application/json"}
-    data = {"content": inp.content}
-
-    r = requests.post(url, headers=headers, data=json.dumps(data), timeout=20)
-    if r.status_code not in (200, 201):
-        raise HTTPException(status_code=500, detail=f"Discord send failed: {r.status_code} {r.text}")
-
-    return {"ok": True, "message_id": r.json().get("id")}
+@app.post("/send/bulk")
+async def send_bulk_endpoint(inp: SendBulkIn, idempotency_key: Optional[str] = Header(None)):
+    """Fan out many sends. With an Idempotency-Key header, message i uses '<key>:<i>' unless it has its own key."""
+    from backend.app.services import outbound
+    if not inp.messages:
+        raise HTTPException(status_code=422, detail="messages cannot be empty")
+    if len(inp.messages) > 500:
+        raise HTTPException(status_code=422, detail="at most 500 messages per bulk send")
+    messages = []
+    for i, m in enumerate(inp.messages):
+        msg = m.model_dump(exclude_none=True)
+        if idempotency_key and not msg.get("idempotency_key"):
+            msg["idempotency_key"] = f"{idempotency_key}:{i}"
+        messages.append(msg)
+    return await outbound.send_bulk(messages, concurrency=inp.concurrency)
@@ -1,7 +1,6 @@
 from fastapi import APIRouter, HTTPException, Body
 from fastapi.responses import HTMLResponse
 import json
-import pandas as pd
 from typing import List, Dict, Any
 
 from backend.app.services.medium_services import (
@@ -81,6 +80,7 @@ def draft_from_articles(payload: Dict[str, Any] = Body(...)):
             "timestamp": a.get("published")
         })
 
+    import pandas as pd
     df = pd.DataFrame(rows)
     if "ts" not in df.columns and "timestamp" in df.columns:
         df["ts"] = pd.to_datetime(df["timestamp"], errors="coerce", utc=True)
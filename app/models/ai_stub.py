@@ -4,12 +4,20 @@ ShadowShift - AI Stub (Baseline)
 - Predicts an action from: ["reply", "reply_urgent", "follow_up", "summarize"]
 """
 
-from typing import List, Dict, Any, Optional
+from __future__ import annotations
+
+from typing import List, Dict, Any, Optional, TYPE_CHECKING
 from pathlib import Path
-import joblib
-import pandas as pd
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.neighbors import NearestNeighbors
+
+from backend.app.services import metrics, tracing
+
+# sklearn, pandas and joblib take over a second to import: load them when a model is fitted or loaded
+if TYPE_CHECKING:
+    import pandas as pd
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    from sklearn.neighbors import NearestNeighbors
+
+_PREDICT_HELP = "AIStub inference time"
 
 
 class AIStub:
@@ -32,6 +40,9 @@ class AIStub:
         """
         Expects df with columns: ["state", "action"]
         """
+        from sklearn.feature_extraction.text import TfidfVectorizer
+        from sklearn.neighbors import NearestNeighbors
+
         if "state" not in df.columns or "action" not in df.columns:
             raise ValueError("DataFrame must contain 'state' and 'action' columns")
 
@@ -51,6 +62,8 @@ class AIStub:
         return {"num_examples": len(texts), "classes": sorted(set(self.actions))}
 
     # ---- Inference ----
+    @tracing.traced("aistub.predict")
+    @metrics.timed("shadowshift_aistub_predict_seconds", _PREDICT_HELP, method="predict")
     def predict(self, state: str) -> Dict[str, Any]:
         if not self.fitted:
             raise RuntimeError("Model not fitted. Call fit() first.")
@@ -61,14 +74,28 @@ class AIStub:
         score = 1 - float(dist[0][0])  # cosine similarity → confidence-ish
         return {"action": self.actions[i], "confidence": score}
 
+    @tracing.traced("aistub.batch_predict")
+    @metrics.timed("shadowshift_aistub_predict_seconds", _PREDICT_HELP, method="batch_predict")
     def batch_predict(self, states: List[str]) -> List[Dict[str, Any]]:
-        return [self.predict(s) for s in states]
+        if not self.fitted:
+            raise RuntimeError("Model not fitted. Call fit() first.")
+        if not states:
+            return []
+
+        # one vectorizer pass + one neighbour search for the whole batch
+        Xq = self.vectorizer.transform(states)
+        dist, idx = self.nn.kneighbors(Xq)
+        return [
+            {"action": self.actions[int(i[0])], "confidence": 1 - float(d[0])}
+            for d, i in zip(dist, idx)
+        ]
 
     # ---- Persistence ----
     def save(self, path: str | Path):
         """Persist fitted model to disk."""
         if not self.fitted:
             raise RuntimeError("Model not fitted; cannot save.")
+        import joblib
         blob = {
             "vectorizer": self.vectorizer,
             "nn": self.nn,
@@ -83,6 +110,7 @@ class AIStub:
     @classmethod
     def load(cls, path: str | Path) -> "AIStub":
         """Load model from disk."""
+        import joblib
         blob = joblib.load(path)
         obj = cls(ngram_range=blob["ngram_range"], n_neighbors=blob["n_neighbors"])
         obj.vectorizer = blob["vectorizer"]
@@ -1,6 +1,13 @@
+from __future__ import annotations
+
 from pathlib import Path
 import json
-import pandas as pd
+from typing import TYPE_CHECKING
+
+from backend.app.services import metrics, tracing
+
+if TYPE_CHECKING:   # pandas is imported on first use so importing build_state stays cheap
+    import pandas as pd
 
 ROOT = Path(__file__).resolve().parents[2]
 RAW_EVENTS = ROOT / "data" / "raw" / "events.jsonl"
@@ -11,6 +18,7 @@ OUT = PROC / "dataset.parquet"
 YOU_TOKENS = {"you"}
 
 def read_events():
+    import pandas as pd
     rows = []
     with open(RAW_EVENTS, "r", encoding="utf-8") as f:
         for line in f:
@@ -48,6 +56,7 @@ def finalize_label(thread_df: pd.DataFrame) -> str | None:
     # 2) follow_up if last is not you & older than 24h
     last = thread_df.iloc[-1]
     if last["actor"] not in YOU_TOKENS:
+        import pandas as pd
         now_utc = pd.Timestamp.now(tz="UTC")   # FIXED
         age_s = (now_utc - last["ts"]).total_seconds()
         if age_s > 86400:
@@ -60,6 +69,8 @@ def finalize_label(thread_df: pd.DataFrame) -> str | None:
             return "summarize"
     return None
 
+@tracing.traced("build_state")
+@metrics.timed("shadowshift_build_state_seconds", "Time to serialize a thread into a state string")
 def build_state(thread_df: pd.DataFrame, N: int = 5) -> str:
     ctx = thread_df.tail(N)
     srcs = ", ".join(sorted(ctx["source"].unique()))
@@ -88,6 +99,7 @@ def main():
                 "thread_id": tid,
                 "timestamp_utc": sub.iloc[-1]["ts"].isoformat(),
             })
+    import pandas as pd
     out = pd.DataFrame(rows)
     if out.empty:
         raise SystemExit("No labeled rows produced. Check your events.jsonl or rules.")
@@ -0,0 +1,86 @@
+"""
+Adaptive per-source polling intervals.
+
+Each source keeps its own interval within [POLL_MIN_SECONDS, POLL_MAX_SECONDS]:
+- new events        -> interval halves (poll busy sources more often)
+- quiet poll        -> interval grows by POLL_QUIET_FACTOR
+- fetch error       -> interval doubles (exponential backoff over consecutive errors)
+State is shared through `coordination` so the API leader, the worker ticker and the fetch
+stage all see the same schedule.
+"""
+
+import os
+import time
+from typing import Dict, Any, List, Iterable, Optional
+
+from backend.app.services import coordination
+
+KEY = "poll_schedule"
+
+
+def _bounds():
+    lo = float(os.getenv("POLL_MIN_SECONDS", "30"))
+    hi = float(os.getenv("POLL_MAX_SECONDS", "1800"))
+    base = float(os.getenv("POLL_EVERY_SECONDS", "120"))
+    return lo, max(lo, hi), min(max(base, lo), max(lo, hi))
+
+
+def next_interval(current: float, new_events: int, error: bool,
+                  lo: float, hi: float, quiet_factor: float = 1.5) -> float:
+    if error:
+        nxt = current * 2
+    elif new_events > 0:
+        nxt = current / 2
+    else:
+        nxt = current * quiet_factor
+    return max(lo, min(hi, nxt))
+
+
+def _load() -> Dict[str, Dict[str, Any]]:
+    return coordination.read(KEY) or {}
+
+
+def _state(states: Dict[str, Dict[str, Any]], source: str) -> Dict[str, Any]:
+    _, _, base = _bounds()
+    return states.setdefault(source, {"interval": base, "next_due": 0.0, "consecutive_errors": 0,
+                                      "last_new": 0, "last_polled": None})
+
+
+def due(sources: Iterable[str], now: Optional[float] = None) -> List[str]:
+    """Sources whose next poll is due; they are pushed one interval ahead so they are not re-dispatched."""
+    now = now or time.time()
+
+    def take(states: Dict[str, Dict[str, Any]]) -> List[str]:
+        out: List[str] = []
+        for s in sources:
+            st = _state(states, s)
+            if st["next_due"] <= now:
+                st["next_due"] = now + st["interval"]
+                out.append(s)
+        return out
+
+    # one transaction across workers: a source is handed to exactly one of them
+    return coordination.update(KEY, take)
+
+
+def observe(source: str, new_events: int, error: bool = False) -> Dict[str, Any]:
+    """Record a finished poll of `source` and reschedule it."""
+    lo, hi, _ = _bounds()
+    quiet = float(os.getenv("POLL_QUIET_FACTOR", "1.5"))
+    now = time.time()
+
+    def record(states: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+        st = _state(states, source)
+        st["consecutive_errors"] = st["consecutive_errors"] + 1 if error else 0
+        st["interval"] = next_interval(st["interval"], new_events, error, lo, hi, quiet)
+        st["last_new"] = int(new_events)
+        st["last_polled"] = now
+        st["next_due"] = now + st["interval"]
+        return dict(st)
+
+    return coordination.update(KEY, record)
+
+
+def snapshot() -> Dict[str, Dict[str, Any]]:
+    now = time.time()
+    return {s: {**st, "next_due_in": round(max(0.0, st["next_due"] - now), 1)} for s, st in _load().items()}
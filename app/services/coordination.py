@@ -0,0 +1,165 @@
+"""
+Cross-process coordination for API workers on one box (SQLite in storage/).
+
+- `LeaderLease`: a named lease with a TTL; whoever holds an unexpired lease is the leader,
+  and a follower takes over once the leader stops renewing (e.g. the process died)
+- `publish` / `read`: small JSON blobs the leader shares with the other workers
+- `update`: read-modify-write of one blob under a write lock, for state several workers change
+- `transaction` / `query`: direct access to the same DB for read-modify-write state (poll jobs)
+"""
+
+import os
+import json
+import time
+import uuid
+import socket
+import sqlite3
+import threading
+import contextlib
+from pathlib import Path
+from typing import Optional, Dict, Any, Iterator, List, Callable
+
+BACKEND_ROOT = Path(__file__).resolve().parents[2]
+DEFAULT_PATH = BACKEND_ROOT / "storage" / "coordination.db"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS leases (
+    name       TEXT PRIMARY KEY,
+    holder     TEXT NOT NULL,
+    expires_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS shared (
+    key        TEXT PRIMARY KEY,
+    value      TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS poll_jobs (
+    id          TEXT PRIMARY KEY,
+    status      TEXT NOT NULL,
+    sources     TEXT NOT NULL,
+    fetch_ids   TEXT,
+    runner      TEXT,
+    created_at  REAL NOT NULL,
+    started_at  REAL,
+    finished_at REAL,
+    result      TEXT,
+    error       TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_poll_jobs_status ON poll_jobs (status, created_at);
+"""
+
+_local = threading.local()
+
+
+def _db_path() -> Path:
+    return Path(os.getenv("COORDINATION_DB_PATH") or DEFAULT_PATH)
+
+
+def _conn() -> sqlite3.Connection:
+    path = _db_path()
+    cache = getattr(_local, "conns", None)
+    if cache is None:
+        cache = _local.conns = {}
+    conn = cache.get(str(path))
+    if conn is None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(str(path), timeout=30, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(_SCHEMA)
+        cache[str(path)] = conn
+    return conn
+
+
+@contextlib.contextmanager
+def transaction() -> Iterator[sqlite3.Connection]:
+    """BEGIN IMMEDIATE ... COMMIT on this thread's connection; rolled back if the body raises."""
+    conn = _conn()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        yield conn
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    conn.execute("COMMIT")
+
+
+def query(sql: str, params: tuple = ()) -> List[tuple]:
+    return _conn().execute(sql, params).fetchall()
+
+
+def worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class LeaderLease:
+    def __init__(self, name: str, ttl: float, holder: Optional[str] = None):
+        self.name = name
+        self.ttl = ttl
+        self.holder = holder or f"{worker_id()}:{uuid.uuid4().hex[:6]}"
+        self.is_leader = False
+
+    def try_acquire(self) -> bool:
+        """Acquire or renew the lease. Returns True while this process is the leader."""
+        now = time.time()
+        try:
+            with transaction() as conn:
+                row = conn.execute("SELECT holder, expires_at FROM leases WHERE name = ?", (self.name,)).fetchone()
+                acquired = row is None or row[0] == self.holder or row[1] < now
+                if acquired:
+                    conn.execute(
+                        "INSERT INTO leases (name, holder, expires_at) VALUES (?, ?, ?) "
+                        "ON CONFLICT(name) DO UPDATE SET holder = excluded.holder, expires_at = excluded.expires_at",
+                        (self.name, self.holder, now + self.ttl),
+                    )
+        except Exception:
+            # the renewal may not have landed: stop acting as leader until one succeeds
+            self.is_leader = False
+            raise
+        if acquired and not self.is_leader:
+            print(f"[coordination] {self.holder} is now leader for '{self.name}'")
+        self.is_leader = acquired
+        return acquired
+
+    def release(self) -> None:
+        _conn().execute("DELETE FROM leases WHERE name = ? AND holder = ?", (self.name, self.holder))
+        self.is_leader = False
+
+    def info(self) -> Dict[str, Any]:
+        row = _conn().execute("SELECT holder, expires_at FROM leases WHERE name = ?", (self.name,)).fetchone()
+        return {
+            "name": self.name,
+            "me": self.holder,
+            "is_leader": bool(row and row[0] == self.holder and row[1] >= time.time()),
+            "leader": row[0] if row else None,
+            "expires_at": row[1] if row else None,
+        }
+
+
+def publish(key: str, value: Any) -> None:
+    _conn().execute(
+        "INSERT INTO shared (key, value, updated_at) VALUES (?, ?, ?) "
+        "ON CONFLICT(key) DO UPDATE SET value = excluded.value, updated_at = excluded.updated_at",
+        (key, json.dumps(value, default=str), time.time()),
+    )
+
+
+def read(key: str, default: Any = None) -> Any:
+    row = _conn().execute("SELECT value FROM shared WHERE key = ?", (key,)).fetchone()
+    return json.loads(row[0]) if row else default
+
+
+def update(key: str, fn: Callable[[Dict[str, Any]], Any]) -> Any:
+    """Apply `fn` to the dict stored at `key` (empty if missing) and store it, in one transaction.
+
+    Returns what `fn` returns. Concurrent updates of the key from other workers are serialized.
+    """
+    with transaction() as conn:
+        row = conn.execute("SELECT value FROM shared WHERE key = ?", (key,)).fetchone()
+        value = json.loads(row[0]) if row else {}
+        out = fn(value)
+        conn.execute(
+            "INSERT INTO shared (key, value, updated_at) VALUES (?, ?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET value = excluded.value, updated_at = excluded.updated_at",
+            (key, json.dumps(value, default=str), time.time()),
+        )
+    return out
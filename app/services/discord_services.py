@@ -1,9 +1,55 @@
 import os
+import time
+import threading
 import requests
+from requests.adapters import HTTPAdapter
 from datetime import datetime, timedelta, timezone
 from typing import List, Dict, Optional
+from backend.app.services import resilience
 
-DISCORD_API_BASE = "https://discord.com/api/v10"
+DISCORD_API_BASE = os.getenv("DISCORD_API_BASE", "https://discord.com/api/v10").rstrip("/")
+
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+# per-channel time before which the rate-limit bucket is exhausted (from X-RateLimit-* headers)
+_bucket_ready_at: Dict[str, float] = {}
+_bucket_lock = threading.Lock()
+
+
+def _get_session() -> requests.Session:
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                size = int(os.getenv("DISCORD_POOL_SIZE", "10"))
+                s = requests.Session()
+                adapter = HTTPAdapter(pool_connections=size, pool_maxsize=size)
+                s.mount("https://", adapter)
+                s.mount("http://", adapter)
+                _session = s
+    return _session
+
+
+def _wait_for_bucket(channel_id: str) -> None:
+    with _bucket_lock:
+        ready_at = _bucket_ready_at.get(channel_id, 0.0)
+    delay = ready_at - time.time()
+    if delay > 0:
+        left = resilience.remaining()
+        if left is not None and left < delay:
+            raise resilience.DeadlineExceeded(f"discord channel {channel_id} rate limited for {delay:.1f}s")
+        time.sleep(delay)
+
+
+def _note_rate_limit(channel_id: str, resp: requests.Response) -> None:
+    try:
+        remaining = resp.headers.get("X-RateLimit-Remaining")
+        reset_after = float(resp.headers.get("X-RateLimit-Reset-After") or 0)
+    except ValueError:
+        return
+    if remaining is not None and remaining.strip() == "0" and reset_after > 0:
+        with _bucket_lock:
+            _bucket_ready_at[channel_id] = time.time() + reset_after
 
 
 def _get_token() -> str:
@@ -32,7 +78,7 @@ def fetch_recent_messages(limit: int = 20) -> List[Dict]:
     for channel_id in _get_channels():
         url = f"{DISCORD_API_BASE}/channels/{channel_id}/messages?limit={limit}"
         try:
-            resp = requests.get(url, headers=_auth_headers(), timeout=10)
+            resp = _get_session().get(url, headers=_auth_headers(), timeout=resilience.timeout(10))
             resp.raise_for_status()
             msgs = resp.json()
             for m in msgs:
@@ -54,17 +100,29 @@ def fetch_recent_messages(limit: int = 20) -> List[Dict]:
     return out
 
 
-def send_message(channel_id: str, content: str) -> Dict:
+def send_message(channel_id: str, content: str, max_rate_limit_retries: int = 3) -> Dict:
+    """Post a message; waits out the channel's rate-limit bucket and retries 429s after `retry_after`."""
     url = f"{DISCORD_API_BASE}/channels/{channel_id}/messages"
     try:
-        resp = requests.post(
-            url,
-            headers={**_auth_headers(), "Content-Type": "application/json"},
-            json={"content": content},
-            timeout=10,
-        )
-        resp.raise_for_status()
-        return resp.json()
+        for attempt in range(max_rate_limit_retries + 1):
+            _wait_for_bucket(channel_id)
+            resp = _get_session().post(
+                url,
+                headers={**_auth_headers(), "Content-Type": "application/json"},
+                json={"content": content},
+                timeout=resilience.timeout(10),
+            )
+            _note_rate_limit(channel_id, resp)
+            if resp.status_code == 429 and attempt < max_rate_limit_retries:
+                try:
+                    retry_after = float(resp.json().get("retry_after", 1))
+                except ValueError:
+                    retry_after = float(resp.headers.get("Retry-After") or 1)
+                with _bucket_lock:
+                    _bucket_ready_at[channel_id] = time.time() + retry_after
+                continue
+            resp.raise_for_status()
+            return resp.json()
     except Exception as e:
         print(f"[discord] send error: {e}")
         raise
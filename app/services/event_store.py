@@ -0,0 +1,298 @@
+"""
+Durable local event store (SQLite, WAL mode).
+
+- Events are keyed by (source, event id); re-inserting a seen event is a no-op
+- Indexed by (source, thread_id, ts) for per-thread lookups, and by (ts, source, event_id)
+  for time ranges and keyset-paginated inbox reads
+- `compact()` drops events older than the retention window
+- Per-thread fingerprints (last event id + state hash) let the poller skip unchanged threads
+- Drafts computed by the poller are kept per thread with the state hash they were built from;
+  new events for a thread drop its draft
+"""
+
+import os
+import json
+import time
+import base64
+import sqlite3
+import hashlib
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Optional, Dict, Any, List, Iterable, Tuple
+
+from backend.app.services import tracing
+
+BACKEND_ROOT = Path(__file__).resolve().parents[2]
+DEFAULT_PATH = BACKEND_ROOT / "storage" / "events.db"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    source      TEXT NOT NULL,
+    event_id    TEXT NOT NULL,
+    thread_id   TEXT NOT NULL,
+    ts          REAL NOT NULL,
+    ingested_at REAL NOT NULL,
+    data        TEXT NOT NULL,
+    PRIMARY KEY (source, event_id)
+);
+CREATE INDEX IF NOT EXISTS idx_events_thread ON events (source, thread_id, ts);
+CREATE INDEX IF NOT EXISTS idx_events_page ON events (ts, source, event_id);
+CREATE INDEX IF NOT EXISTS idx_events_source_page ON events (source, ts, event_id);
+CREATE TABLE IF NOT EXISTS thread_fingerprints (
+    source        TEXT NOT NULL,
+    thread_id     TEXT NOT NULL,
+    last_event_id TEXT NOT NULL,
+    state_hash    TEXT NOT NULL,
+    updated_at    REAL NOT NULL,
+    PRIMARY KEY (source, thread_id)
+);
+CREATE TABLE IF NOT EXISTS thread_drafts (
+    source     TEXT NOT NULL,
+    thread_id  TEXT NOT NULL,
+    state_hash TEXT NOT NULL,
+    model      TEXT NOT NULL,
+    max_words  INTEGER NOT NULL,
+    data       TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    PRIMARY KEY (source, thread_id)
+);
+"""
+
+
+def to_epoch(value: Any, strict: bool = False) -> float:
+    """Epoch seconds of a datetime, number or ISO string. Unparseable values are "now",
+    or a ValueError when `strict` (query bounds: a typo must not silently mean "from now")."""
+    if isinstance(value, datetime):
+        dt = value
+    elif isinstance(value, (int, float)):
+        return float(value)
+    elif isinstance(value, str) and value:
+        try:
+            dt = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        except ValueError:
+            if strict:
+                raise ValueError(f"invalid timestamp: {value!r}")
+            return time.time()
+    elif strict:
+        raise ValueError(f"invalid timestamp: {value!r}")
+    else:
+        return time.time()
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.timestamp()
+
+
+def encode_cursor(ts: float, source: str, event_id: str) -> str:
+    raw = json.dumps([ts, source, event_id]).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[float, str, str]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        ts, source, event_id = json.loads(raw)
+        return float(ts), str(source), str(event_id)
+    except Exception:
+        raise ValueError("invalid cursor")
+
+
+def _json_default(o: Any) -> Any:
+    if isinstance(o, datetime):
+        return o.isoformat()
+    return str(o)
+
+
+def event_key(e: Dict[str, Any]) -> str:
+    if e.get("id") is not None:
+        return str(e["id"])
+    blob = json.dumps(e, sort_keys=True, default=_json_default)
+    return hashlib.sha1(blob.encode("utf-8")).hexdigest()
+
+
+class EventStore:
+    def __init__(self, path: Optional[Path] = None):
+        self.path = Path(path or os.getenv("EVENT_STORE_PATH") or DEFAULT_PATH)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        conn = self._conn()
+        conn.executescript(_SCHEMA)
+        conn.commit()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.path), timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    # ---- writes ----
+    @tracing.traced("event_store.insert_events")
+    def insert_events(self, source: str, events: Iterable[Dict[str, Any]]) -> int:
+        """Insert events, ignoring ones already stored. Returns the number of new rows."""
+        now = time.time()
+        rows = []
+        for e in events:
+            tid = e.get("thread_id") or f"{source}-{e.get('id', 'oneoff')}"
+            rows.append((source, event_key(e), str(tid), to_epoch(e.get("timestamp")), now,
+                         json.dumps(e, default=_json_default)))
+        if not rows:
+            return 0
+        conn = self._conn()
+        new = 0
+        changed = set()
+        with conn:
+            for row in rows:
+                cur = conn.execute(
+                    "INSERT OR IGNORE INTO events (source, event_id, thread_id, ts, ingested_at, data) VALUES (?, ?, ?, ?, ?, ?)",
+                    row,
+                )
+                if cur.rowcount:
+                    new += 1
+                    changed.add(row[2])
+            if changed:
+                ids = list(changed)
+                for i in range(0, len(ids), 500):
+                    chunk = ids[i:i + 500]
+                    conn.execute(
+                        f"DELETE FROM thread_drafts WHERE source = ? AND thread_id IN ({','.join('?' * len(chunk))})",
+                        (source, *chunk),
+                    )
+        return new
+
+    def compact(self, retention_days: Optional[float] = None) -> int:
+        """Delete events older than the retention window and checkpoint the WAL."""
+        if retention_days is None:
+            retention_days = float(os.getenv("EVENT_RETENTION_DAYS", "30"))
+        cutoff = time.time() - retention_days * 86400
+        conn = self._conn()
+        with conn:
+            cur = conn.execute("DELETE FROM events WHERE ts < ?", (cutoff,))
+            conn.execute("DELETE FROM thread_fingerprints WHERE updated_at < ?", (cutoff,))
+            conn.execute("DELETE FROM thread_drafts WHERE created_at < ?", (cutoff,))
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        return cur.rowcount
+
+    def set_fingerprint(self, source: str, thread_id: str, last_event_id: str, state_hash: str) -> None:
+        conn = self._conn()
+        with conn:
+            conn.execute(
+                "INSERT INTO thread_fingerprints (source, thread_id, last_event_id, state_hash, updated_at) "
+                "VALUES (?, ?, ?, ?, ?) ON CONFLICT(source, thread_id) DO UPDATE SET "
+                "last_event_id = excluded.last_event_id, state_hash = excluded.state_hash, updated_at = excluded.updated_at",
+                (source, str(thread_id), str(last_event_id), state_hash, time.time()),
+            )
+
+    def get_fingerprints(self, source: str, thread_ids: Iterable[str]) -> Dict[str, Dict[str, str]]:
+        ids = [str(t) for t in thread_ids]
+        out: Dict[str, Dict[str, str]] = {}
+        for i in range(0, len(ids), 500):
+            chunk = ids[i:i + 500]
+            marks = ",".join("?" * len(chunk))
+            for tid, last_id, h in self._conn().execute(
+                f"SELECT thread_id, last_event_id, state_hash FROM thread_fingerprints WHERE source = ? AND thread_id IN ({marks})",
+                (source, *chunk),
+            ):
+                out[tid] = {"last_event_id": last_id, "state_hash": h}
+        return out
+
+    def save_draft(self, source: str, thread_id: str, state_hash: str, draft: Dict[str, Any],
+                   max_words: int) -> None:
+        conn = self._conn()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO thread_drafts (source, thread_id, state_hash, model, max_words, data, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (source, str(thread_id), state_hash, str(draft.get("model") or ""), int(max_words),
+                 json.dumps(draft, default=_json_default), time.time()),
+            )
+
+    def get_draft(self, source: str, thread_id: str) -> Optional[Dict[str, Any]]:
+        """The stored draft of a thread with its `state_hash`, `max_words` and `created_at`, or None."""
+        row = self._conn().execute(
+            "SELECT data, state_hash, max_words, created_at FROM thread_drafts WHERE source = ? AND thread_id = ?",
+            (source, str(thread_id)),
+        ).fetchone()
+        if row is None:
+            return None
+        return {**json.loads(row[0]), "state_hash": row[1], "max_words": row[2], "created_at": row[3]}
+
+    # ---- reads ----
+    def _rows(self, sql: str, args: tuple) -> List[Dict[str, Any]]:
+        return [json.loads(r[0]) for r in self._conn().execute(sql, args)]
+
+    @tracing.traced("event_store.get_thread")
+    def get_thread(self, source: str, thread_id: str, last: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Events of one thread in time order; `last` keeps only the most recent N (served from the thread index)."""
+        if last:
+            rows = self._rows(
+                "SELECT data FROM events WHERE source = ? AND thread_id = ? ORDER BY ts DESC LIMIT ?",
+                (source, str(thread_id), int(last)),
+            )
+            return rows[::-1]
+        return self._rows(
+            "SELECT data FROM events WHERE source = ? AND thread_id = ? ORDER BY ts",
+            (source, str(thread_id)),
+        )
+
+    def page(self, source: Optional[str] = None, since: Optional[Any] = None,
+             cursor: Optional[str] = None, limit: int = 50) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """One page of events, newest first, using keyset pagination. Returns (events, next_cursor)."""
+        clauses, args = [], []
+        if source:
+            clauses.append("source = ?"); args.append(source)
+        if since is not None:
+            clauses.append("ts >= ?"); args.append(to_epoch(since, strict=True))
+        if cursor:
+            ts, src, eid = decode_cursor(cursor)
+            clauses.append("(ts, source, event_id) < (?, ?, ?)"); args.extend([ts, src, eid])
+        sql = "SELECT data, ts, source, event_id FROM events"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY ts DESC, source DESC, event_id DESC LIMIT ?"
+        args.append(int(limit) + 1)
+        rows = self._conn().execute(sql, tuple(args)).fetchall()
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            last = rows[-1]
+            next_cursor = encode_cursor(last[1], last[2], last[3])
+        return [json.loads(r[0]) for r in rows], next_cursor
+
+    def query(self, source: Optional[str] = None, since: Optional[Any] = None,
+              until: Optional[Any] = None, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Events in [since, until), newest first."""
+        clauses, args = [], []
+        if source:
+            clauses.append("source = ?"); args.append(source)
+        if since is not None:
+            clauses.append("ts >= ?"); args.append(to_epoch(since, strict=True))
+        if until is not None:
+            clauses.append("ts < ?"); args.append(to_epoch(until, strict=True))
+        sql = "SELECT data FROM events"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY ts DESC"
+        if limit:
+            sql += " LIMIT ?"; args.append(int(limit))
+        return self._rows(sql, tuple(args))
+
+    def count(self, source: Optional[str] = None) -> int:
+        if source:
+            return self._conn().execute("SELECT COUNT(*) FROM events WHERE source = ?", (source,)).fetchone()[0]
+        return self._conn().execute("SELECT COUNT(*) FROM events").fetchone()[0]
+
+
+_store: Optional[EventStore] = None
+_store_lock = threading.Lock()
+
+
+def get_store() -> EventStore:
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = EventStore()
+    return _store
@@ -0,0 +1,213 @@
+"""
+Shared GitHub REST client.
+
+- One pooled ``requests.Session`` for every GitHub call in the backend
+- ETag / Last-Modified conditional GETs; a 304 is served from the local cache
+  and does not count against the rate limit
+- Rate-limit budget tracking from the ``X-RateLimit-*`` response headers
+"""
+
+import os
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Dict, Any, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from backend.app.services import resilience, metrics, tracing
+
+GITHUB_API = os.getenv("GITHUB_API_URL", "https://api.github.com")
+
+
+class GitHubResponse:
+    """Minimal response wrapper so cached (304) and fresh replies look the same to callers."""
+
+    def __init__(self, status_code: int, data: Any, headers: Dict[str, str], url: str,
+                 from_cache: bool = False, raw: Optional[requests.Response] = None):
+        self.status_code = status_code
+        self.headers = requests.structures.CaseInsensitiveDict(headers)
+        self.url = url
+        self.from_cache = from_cache
+        self._data = data
+        self._raw = raw
+
+    def json(self) -> Any:
+        return self._data
+
+    @property
+    def text(self) -> str:
+        if self._raw is not None:
+            return self._raw.text
+        return json.dumps(self._data)
+
+    @property
+    def links(self) -> Dict[str, Dict[str, str]]:
+        # parsed from the stored headers, so cached and 304 replies keep the original page links
+        out: Dict[str, Dict[str, str]] = {}
+        for link in requests.utils.parse_header_links(self.headers.get("Link") or ""):
+            out[link.get("rel") or link.get("url")] = link
+        return out
+
+    def raise_for_status(self) -> None:
+        if self._raw is not None and not self.from_cache:
+            self._raw.raise_for_status()
+
+
+class RateLimitTracker:
+    """Keeps the most recent rate-limit headers seen per GitHub resource (core, graphql, search...)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._resources: Dict[str, Dict[str, Any]] = {}
+        self.requests = 0
+        self.not_modified = 0
+        self.served_from_cache = 0
+
+    def record(self, headers: Dict[str, str], status_code: int) -> None:
+        with self._lock:
+            self.requests += 1
+            if status_code == 304:
+                self.not_modified += 1
+            if "X-RateLimit-Remaining" not in headers:
+                return
+            resource = headers.get("X-RateLimit-Resource", "core")
+            try:
+                self._resources[resource] = {
+                    "limit": int(headers.get("X-RateLimit-Limit", 0)),
+                    "remaining": int(headers.get("X-RateLimit-Remaining", 0)),
+                    "used": int(headers.get("X-RateLimit-Used", 0)),
+                    "reset_at": int(headers.get("X-RateLimit-Reset", 0)),
+                }
+            except ValueError:
+                pass
+
+    def record_cache_hit(self) -> None:
+        metrics.CACHE_REQUESTS.inc(cache="github_etag", result="hit")
+        with self._lock:
+            self.served_from_cache += 1
+
+    def exhausted(self, resource: str = "core") -> bool:
+        with self._lock:
+            r = self._resources.get(resource)
+        if not r:
+            return False
+        return r["remaining"] <= 0 and r["reset_at"] > time.time()
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "not_modified": self.not_modified,
+                "served_from_cache": self.served_from_cache,
+                "resources": {k: dict(v) for k, v in self._resources.items()},
+            }
+
+
+class GitHubClient:
+    def __init__(self, base_url: str = GITHUB_API, cache_size: Optional[int] = None,
+                 pool_size: Optional[int] = None, session: Optional[requests.Session] = None):
+        self.base_url = base_url.rstrip("/")
+        self.cache_size = cache_size or int(os.getenv("GITHUB_ETAG_CACHE_SIZE", "512"))
+        pool_size = pool_size or int(os.getenv("GITHUB_POOL_SIZE", "16"))
+        self.session = session or requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.rate_limit = RateLimitTracker()
+        # key -> (etag, last_modified, data, headers incl. Link)
+        self._cache: "OrderedDict[Tuple, Tuple[Optional[str], Optional[str], Any, Dict[str, str]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _url(self, path_or_url: str) -> str:
+        if path_or_url.startswith("http://") or path_or_url.startswith("https://"):
+            return path_or_url
+        return f"{self.base_url}/{path_or_url.lstrip('/')}"
+
+    def _default_headers(self) -> Dict[str, str]:
+        hdrs = {"Accept": "application/vnd.github+json"}
+        token = os.getenv("GITHUB_TOKEN")
+        if token:
+            hdrs["Authorization"] = f"token {token}"
+        return hdrs
+
+    def _cache_get(self, key: Tuple):
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is not None:
+                self._cache.move_to_end(key)
+            return entry
+
+    def _cache_put(self, key: Tuple, entry) -> None:
+        with self._lock:
+            self._cache[key] = entry
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    @tracing.traced("github.get")
+    def get(self, path_or_url: str, params: Optional[Dict[str, Any]] = None,
+            headers: Optional[Dict[str, str]] = None, timeout: float = 15) -> GitHubResponse:
+        """Conditional GET. Returns the cached body on 304 (or when the rate limit is exhausted)."""
+        url = self._url(path_or_url)
+        hdrs = {**self._default_headers(), **(headers or {})}
+        key = (url, tuple(sorted((params or {}).items())), hdrs.get("Authorization"), hdrs.get("Accept"))
+        cached = self._cache_get(key)
+
+        if cached is not None and self.rate_limit.exhausted():
+            self.rate_limit.record_cache_hit()
+            return GitHubResponse(200, cached[2], cached[3], url, from_cache=True)
+
+        if cached is not None:
+            etag, last_modified = cached[0], cached[1]
+            if etag:
+                hdrs["If-None-Match"] = etag
+            elif last_modified:
+                hdrs["If-Modified-Since"] = last_modified
+
+        r = self.session.get(url, params=params, headers=hdrs, timeout=resilience.timeout(timeout))
+        self.rate_limit.record(r.headers, r.status_code)
+
+        if r.status_code == 304 and cached is not None:
+            self.rate_limit.record_cache_hit()
+            return GitHubResponse(200, cached[2], dict(cached[3]), url, from_cache=True, raw=r)
+
+        try:
+            data = r.json() if r.content else None
+        except ValueError:
+            data = None
+        metrics.CACHE_REQUESTS.inc(cache="github_etag", result="miss")
+        if r.status_code == 200 and (r.headers.get("ETag") or r.headers.get("Last-Modified")):
+            self._cache_put(key, (r.headers.get("ETag"), r.headers.get("Last-Modified"), data, dict(r.headers)))
+        return GitHubResponse(r.status_code, data, dict(r.headers), url, raw=r)
+
+    def request(self, method: str, path_or_url: str, headers: Optional[Dict[str, str]] = None,
+                timeout: float = 30, **kwargs) -> requests.Response:
+        """Non-cached request (POST/PUT/PATCH/DELETE) over the pooled session."""
+        hdrs = {**self._default_headers(), **(headers or {})}
+        r = self.session.request(method, self._url(path_or_url), headers=hdrs, timeout=resilience.timeout(timeout), **kwargs)
+        self.rate_limit.record(r.headers, r.status_code)
+        return r
+
+    def clear_cache(self) -> None:
+        with self._lock:
+            self._cache.clear()
+
+
+_client: Optional[GitHubClient] = None
+_client_lock = threading.Lock()
+
+
+def get_client() -> GitHubClient:
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = GitHubClient()
+    return _client
+
+
+def get_rate_limit_stats() -> Dict[str, Any]:
+    return get_client().rate_limit.snapshot()
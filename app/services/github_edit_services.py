@@ -3,14 +3,13 @@ import base64
 import json
 import typing
 import logging
-from typing import Optional, Dict, Any, List
-
-import requests
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Dict, Any, List, Union
 
 from backend.app.services import llm
+from backend.app.services.github_client import get_client, GITHUB_API
 
 LOG = logging.getLogger(__name__)
-GITHUB_API = "https://api.github.com"
 
 
 def _gh_headers():
@@ -30,7 +29,7 @@ def _repo_owner_and_name(repo_full: str) -> (str, str):
 def get_default_branch(repo_full: Optional[str] = None) -> str:
     repo_full = repo_full or os.getenv("GITHUB_REPOS")
     owner, name = _repo_owner_and_name(repo_full)
-    r = requests.get(f"{GITHUB_API}/repos/{owner}/{name}", headers=_gh_headers())
+    r = get_client().get(f"repos/{owner}/{name}", headers=_gh_headers())
     r.raise_for_status()
     return r.json().get("default_branch", "main")
 
@@ -38,7 +37,7 @@ def get_default_branch(repo_full: Optional[str] = None) -> str:
 def list_commits(repo_full: Optional[str] = None, per_page: int = 20) -> List[Dict[str, Any]]:
     repo_full = repo_full or os.getenv("GITHUB_REPOS")
     owner, name = _repo_owner_and_name(repo_full)
-    r = requests.get(f"{GITHUB_API}/repos/{owner}/{name}/commits?per_page={per_page}", headers=_gh_headers())
+    r = get_client().get(f"repos/{owner}/{name}/commits", params={"per_page": per_page}, headers=_gh_headers())
     r.raise_for_status()
     return r.json()
 
@@ -50,7 +49,7 @@ def get_file_contents(path: str, repo_full: Optional[str] = None, ref: Optional[
     params = {}
     if ref:
         params["ref"] = ref
-    r = requests.get(url, headers=_gh_headers(), params=params)
+    r = get_client().get(url, headers=_gh_headers(), params=params)
     r.raise_for_status()
     data = r.json()
     content = ""
@@ -65,11 +64,11 @@ def create_branch(branch_name: str, from_branch: Optional[str] = None, repo_full
     repo_full = repo_full or os.getenv("GITHUB_REPOS")
     owner, name = _repo_owner_and_name(repo_full)
     base = from_branch or get_default_branch(repo_full)
-    r = requests.get(f"{GITHUB_API}/repos/{owner}/{name}/git/ref/heads/{base}", headers=_gh_headers())
+    r = get_client().get(f"repos/{owner}/{name}/git/ref/heads/{base}", headers=_gh_headers())
     r.raise_for_status()
     base_sha = r.json()["object"]["sha"]
     payload = {"ref": f"refs/heads/{branch_name}", "sha": base_sha}
-    r2 = requests.post(f"{GITHUB_API}/repos/{owner}/{name}/git/refs", headers=_gh_headers(), json=payload)
+    r2 = get_client().request("POST", f"repos/{owner}/{name}/git/refs", headers=_gh_headers(), json=payload)
     r2.raise_for_status()
     return r2.json()
 
@@ -82,7 +81,7 @@ def update_file(path: str, content: str, message: str, branch: str, sha: Optiona
     payload: Dict[str, Any] = {"message": message, "content": b64, "branch": branch}
     if sha:
         payload["sha"] = sha
-    r = requests.put(url, headers=_gh_headers(), json=payload)
+    r = get_client().request("PUT", url, headers=_gh_headers(), json=payload)
     r.raise_for_status()
     return r.json()
 
@@ -92,14 +91,16 @@ def create_pull_request(title: str, head_branch: str, base_branch: Optional[str]
     owner, name = _repo_owner_and_name(repo_full)
     base = base_branch or get_default_branch(repo_full)
     payload = {"title": title, "head": head_branch, "base": base, "body": body}
-    r = requests.post(f"{GITHUB_API}/repos/{owner}/{name}/pulls", headers=_gh_headers(), json=payload)
+    r = get_client().request("POST", f"repos/{owner}/{name}/pulls", headers=_gh_headers(), json=payload)
     r.raise_for_status()
     return r.json()
 
 
 def suggest_code_changes_via_llm(file_path: str, file_content: str, instructions: str, max_words: int = 400) -> Dict[str, Any]:
     state = f"FILE_PATH: {file_path}\n\nCURRENT_FILE_CONTENT:\n{file_content}\n\nINSTRUCTIONS:\n{instructions}"
-    draft = llm.draft_message_from_state(state, platform="github", tone="helpful", max_words=max_words)
+    # whole files can be large; they get their own (bigger) token budget
+    draft = llm.draft_message_from_state(state, platform="github", tone="helpful", max_words=max_words,
+                                         state_budget=int(os.getenv("LLM_CODE_TOKEN_BUDGET", "12000")))
     suggestion = draft.get("body", "")
     return {"suggestion": suggestion, "model": draft.get("model", "")}
 
@@ -119,6 +120,7 @@ def apply_llm_suggestion_as_file_update(
     current = file_info["content"]
     sha = file_info.get("sha")
 
+    base_branch = base_branch or get_default_branch(repo_full)
     branch = new_branch or f"shadowshift/auto-{os.urandom(3).hex()}"
     create_branch(branch, from_branch=base_branch, repo_full=repo_full)
 
@@ -128,11 +130,7 @@ def apply_llm_suggestion_as_file_update(
     if not suggestion:
         raise RuntimeError("LLM returned empty suggestion")
 
-    # Heuristic: if suggestion looks like a full file, use it directly; else append suggestion as patch comment.
-    if _looks_like_code_file(suggestion):
-        updated_content = suggestion
-    else:
-        updated_content = _apply_plain_text_suggestion_to_file(current, suggestion)
+    updated_content = _updated_content(current, suggestion)
 
     commit_msg = pr_title or f"chore: apply shadowshift suggestion to {path}"
     update_resp = update_file(path=path, content=updated_content, message=commit_msg, branch=branch, sha=sha, repo_full=repo_full)
@@ -141,6 +139,111 @@ def apply_llm_suggestion_as_file_update(
     return {"update": update_resp, "pull_request": pr, "suggestion": suggestion_obj}
 
 
+def apply_llm_suggestions_batch(
+    paths: List[str],
+    repo_full: Optional[str],
+    instructions: Union[str, Dict[str, str]],
+    new_branch: Optional[str] = None,
+    pr_title: Optional[str] = None,
+    base_branch: Optional[str] = None,
+    max_workers: Optional[int] = None,
+) -> Dict[str, Any]:
+    """
+    Apply LLM suggestions to many files and open one PR with a single commit.
+    `instructions` is either shared by all paths or a {path: instructions} mapping.
+    File reads and LLM calls run concurrently; the commit is built via the Git Data API
+    (trees -> commits -> refs) instead of one contents PUT per file. Paths with an empty
+    suggestion are skipped and paths whose read or LLM call failed are reported in `failed`;
+    both are listed in the PR body.
+    """
+    if not paths:
+        raise ValueError("paths cannot be empty")
+    # a repeated path would be read and suggested twice and appear twice in the tree
+    paths = list(dict.fromkeys(paths))
+    repo_full = repo_full or os.getenv("GITHUB_REPOS")
+    owner, name = _repo_owner_and_name(repo_full)
+    client = get_client()
+    workers = max_workers or int(os.getenv("GITHUB_EDIT_WORKERS", "4"))
+
+    base = base_branch or get_default_branch(repo_full)
+    r = client.get(f"repos/{owner}/{name}/git/ref/heads/{base}", headers=_gh_headers())
+    r.raise_for_status()
+    base_sha = r.json()["object"]["sha"]
+    r = client.get(f"repos/{owner}/{name}/git/commits/{base_sha}", headers=_gh_headers())
+    r.raise_for_status()
+    base_tree = r.json()["tree"]["sha"]
+
+    def _instr(p: str) -> str:
+        return instructions.get(p, "") if isinstance(instructions, dict) else instructions
+
+    def _suggest(p: str):
+        # one unreadable file or failed LLM call must not sink the whole batch
+        try:
+            f = get_file_contents(p, repo_full=repo_full, ref=base_sha)
+            return f, suggest_code_changes_via_llm(f["path"], f["content"], _instr(p)), None
+        except Exception as e:
+            LOG.warning("suggestion for %s failed: %s", p, e)
+            return None, None, str(e)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(_suggest, paths))
+
+    tree: List[Dict[str, Any]] = []
+    skipped: List[str] = []
+    failed: Dict[str, str] = {}
+    for p, (f, sug, err) in zip(paths, results):
+        if err is not None:
+            failed[p] = err
+            continue
+        text = (sug.get("suggestion") or "").strip()
+        if not text:
+            skipped.append(p)
+            continue
+        tree.append({"path": p, "mode": "100644", "type": "blob", "content": _updated_content(f["content"], text)})
+    if not tree:
+        raise RuntimeError(f"no suggestions to apply (empty: {skipped}, failed: {failed})")
+
+    commit_msg = pr_title or f"chore: apply shadowshift suggestions to {len(tree)} file(s)"
+    r = client.request("POST", f"repos/{owner}/{name}/git/trees", headers=_gh_headers(),
+                       json={"base_tree": base_tree, "tree": tree})
+    r.raise_for_status()
+    new_tree = r.json()["sha"]
+    r = client.request("POST", f"repos/{owner}/{name}/git/commits", headers=_gh_headers(),
+                       json={"message": commit_msg, "tree": new_tree, "parents": [base_sha]})
+    r.raise_for_status()
+    commit = r.json()
+
+    branch = new_branch or f"shadowshift/auto-{os.urandom(3).hex()}"
+    r = client.request("POST", f"repos/{owner}/{name}/git/refs", headers=_gh_headers(),
+                       json={"ref": f"refs/heads/{branch}", "sha": commit["sha"]})
+    r.raise_for_status()
+
+    suggestions = {p: sug for p, (_, sug, _) in zip(paths, results) if sug is not None}
+    models = sorted({s.get("model") or "" for s in suggestions.values()} - {""})
+    body = "Applied ShadowShift suggestions to:\n" + "\n".join(f"- {t['path']}" for t in tree)
+    if skipped:
+        body += "\n\nSkipped (empty suggestion):\n" + "\n".join(f"- {p}" for p in skipped)
+    if failed:
+        body += "\n\nFailed:\n" + "\n".join(f"- {p}: {e}" for p, e in failed.items())
+    body += f"\n\nLLM model: {', '.join(models)}"
+    pr = create_pull_request(title=pr_title or commit_msg, head_branch=branch, base_branch=base, body=body, repo_full=repo_full)
+    return {
+        "commit": commit,
+        "pull_request": pr,
+        "paths": [t["path"] for t in tree],
+        "skipped": skipped,
+        "failed": failed,
+        "suggestions": suggestions,
+    }
+
+
+def _updated_content(current: str, suggestion: str) -> str:
+    # Heuristic: if suggestion looks like a full file, use it directly; else append suggestion as patch comment.
+    if _looks_like_code_file(suggestion):
+        return suggestion
+    return _apply_plain_text_suggestion_to_file(current, suggestion)
+
+
 def _looks_like_code_file(text: str) -> bool:
     lines = text.strip().splitlines()
     if not lines:
@@ -180,3 +283,19 @@ def generate_pr_for_path(path: str, instructions: str, repo_full: Optional[str]
     except Exception as e:
         LOG.exception("generate_pr_for_path failed")
         return {"ok": False, "error": str(e)}
+
+
+def generate_pr_for_paths(paths: List[str], instructions: Union[str, Dict[str, str]], repo_full: Optional[str] = None, new_branch: Optional[str] = None, pr_title: Optional[str] = None):
+    try:
+        repo_full = repo_full or os.getenv("GITHUB_REPOS")
+        res = apply_llm_suggestions_batch(
+            paths=paths,
+            repo_full=repo_full,
+            instructions=instructions,
+            new_branch=new_branch,
+            pr_title=pr_title,
+        )
+        return {"ok": True, "result": res}
+    except Exception as e:
+        LOG.exception("generate_pr_for_paths failed")
+        return {"ok": False, "error": str(e)}
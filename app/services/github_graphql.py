@@ -0,0 +1,198 @@
+"""
+Batched GitHub GraphQL fetcher.
+
+One query covers many repositories (aliased ``r0``, ``r1``...) and pulls, per repo:
+- recent commits on the default branch
+- pull request reviews and their review comments
+- issue comments
+Connections that have more pages are re-queried with their ``endCursor`` until exhausted
+or ``max_pages`` is reached. Output uses the scheduler's event shape.
+"""
+
+import os
+import json
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Dict, Any, List, Callable
+
+from backend.app.services.github_client import get_client
+
+_LAST_RATE_LIMIT: Dict[str, Any] = {}
+
+_COMMIT_FIELDS = "oid message committedDate author { name user { login } }"
+_REVIEW_FIELDS = (
+    "id body submittedAt author { login } "
+    "comments(first: %(n)d) { nodes { id body createdAt path author { login } } }"
+)
+_ISSUE_COMMENT_FIELDS = "id body createdAt author { login }"
+
+
+def get_last_rate_limit() -> Dict[str, Any]:
+    return dict(_LAST_RATE_LIMIT)
+
+
+def _lit(value: str) -> str:
+    # JSON string escaping is valid GraphQL string literal syntax
+    return json.dumps(value)
+
+
+def _after(cursor: Optional[str]) -> str:
+    return f", after: {_lit(cursor)}" if cursor else ""
+
+
+def _repo_fragment(alias: str, repo: str, conns: Dict[str, Optional[str]], since: str, page_size: int) -> str:
+    owner, name = repo.split("/", 1)
+    parts = ["nameWithOwner"]
+    if "commits" in conns:
+        parts.append(
+            "defaultBranchRef { target { ... on Commit { "
+            f"history(first: {page_size}, since: {_lit(since)}{_after(conns['commits'])}) "
+            f"{{ pageInfo {{ hasNextPage endCursor }} nodes {{ {_COMMIT_FIELDS} }} }} }} }} }}"
+        )
+    if "pulls" in conns:
+        parts.append(
+            f"pullRequests(first: {page_size}, orderBy: {{field: UPDATED_AT, direction: DESC}}{_after(conns['pulls'])}) "
+            "{ pageInfo { hasNextPage endCursor } nodes { number title updatedAt "
+            f"reviews(last: {page_size}) {{ nodes {{ {_REVIEW_FIELDS % {'n': page_size}} }} }} }} }}"
+        )
+    if "issues" in conns:
+        parts.append(
+            f"issues(first: {page_size}, orderBy: {{field: UPDATED_AT, direction: DESC}}, "
+            f"filterBy: {{since: {_lit(since)}}}{_after(conns['issues'])}) "
+            "{ pageInfo { hasNextPage endCursor } nodes { number title updatedAt "
+            f"comments(last: {page_size}) {{ nodes {{ {_ISSUE_COMMENT_FIELDS} }} }} }} }}"
+        )
+    return f"{alias}: repository(owner: {_lit(owner)}, name: {_lit(name)}) {{ {' '.join(parts)} }}"
+
+
+def build_query(pending: Dict[str, Dict[str, Any]], since: str, page_size: int) -> str:
+    frags = [_repo_fragment(alias, p["repo"], p["conns"], since, page_size) for alias, p in pending.items()]
+    return "query { rateLimit { cost remaining resetAt } " + " ".join(frags) + " }"
+
+
+def _post_graphql(query: str) -> Dict[str, Any]:
+    token = os.getenv("GITHUB_TOKEN")
+    if not token:
+        raise RuntimeError("GITHUB_TOKEN not set")
+    r = get_client().request("POST", "graphql", headers={"Authorization": f"bearer {token}"},
+                             json={"query": query}, timeout=30)
+    r.raise_for_status()
+    return r.json()
+
+
+def _ts(value: Optional[str]) -> Optional[datetime]:
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except Exception:
+        return None
+
+
+def _login(node: Dict[str, Any]) -> str:
+    return ((node or {}).get("author") or {}).get("login") or "unknown"
+
+
+def _event(eid: str, thread_id: str, actor: str, text: str, ts: datetime, kind: str) -> Dict[str, Any]:
+    return {"id": eid, "thread_id": thread_id, "actor": actor, "text": text or "",
+            "timestamp": ts, "source": "github", "kind": kind}
+
+
+def _parse_repo(repo: str, data: Dict[str, Any], cutoff: datetime, out: List[Dict[str, Any]]) -> Dict[str, str]:
+    """Append events for one repo block; returns {connection: endCursor} for connections with more pages."""
+    nxt: Dict[str, str] = {}
+
+    history = ((((data.get("defaultBranchRef") or {}).get("target")) or {}).get("history"))
+    if history is not None:
+        for c in history.get("nodes") or []:
+            ts = _ts(c.get("committedDate"))
+            if ts is None or ts < cutoff:
+                continue
+            author = c.get("author") or {}
+            actor = (author.get("user") or {}).get("login") or author.get("name") or "unknown"
+            out.append(_event(c.get("oid"), repo, actor, c.get("message"), ts, "commit"))
+        if (history.get("pageInfo") or {}).get("hasNextPage"):
+            nxt["commits"] = history["pageInfo"]["endCursor"]
+
+    pulls = data.get("pullRequests")
+    if pulls is not None:
+        stale = False
+        for pr in pulls.get("nodes") or []:
+            updated = _ts(pr.get("updatedAt"))
+            if updated is not None and updated < cutoff:
+                stale = True  # ordered by UPDATED_AT desc: nothing newer on later pages
+                continue
+            tid = f"{repo}#{pr.get('number')}"
+            for rv in ((pr.get("reviews") or {}).get("nodes") or []):
+                ts = _ts(rv.get("submittedAt"))
+                if ts is not None and ts >= cutoff and (rv.get("body") or "").strip():
+                    out.append(_event(rv.get("id"), tid, _login(rv), rv.get("body"), ts, "review"))
+                for cm in ((rv.get("comments") or {}).get("nodes") or []):
+                    ts = _ts(cm.get("createdAt"))
+                    if ts is None or ts < cutoff:
+                        continue
+                    text = f"{cm.get('path')}: {cm.get('body')}" if cm.get("path") else cm.get("body")
+                    out.append(_event(cm.get("id"), tid, _login(cm), text, ts, "review_comment"))
+        if not stale and (pulls.get("pageInfo") or {}).get("hasNextPage"):
+            nxt["pulls"] = pulls["pageInfo"]["endCursor"]
+
+    issues = data.get("issues")
+    if issues is not None:
+        for iss in issues.get("nodes") or []:
+            tid = f"{repo}#{iss.get('number')}"
+            for cm in ((iss.get("comments") or {}).get("nodes") or []):
+                ts = _ts(cm.get("createdAt"))
+                if ts is None or ts < cutoff:
+                    continue
+                out.append(_event(cm.get("id"), tid, _login(cm), cm.get("body"), ts, "issue_comment"))
+        if (issues.get("pageInfo") or {}).get("hasNextPage"):
+            nxt["issues"] = issues["pageInfo"]["endCursor"]
+
+    return nxt
+
+
+def fetch_recent_activity(
+    repos: Optional[List[str]] = None,
+    newer_than_min: Optional[int] = None,
+    page_size: int = 20,
+    max_pages: int = 5,
+    batch_size: Optional[int] = None,
+    post: Optional[Callable[[str], Dict[str, Any]]] = None,
+) -> List[Dict[str, Any]]:
+    """Commits, PR reviews/review comments and issue comments for `repos` since the cutoff."""
+    if repos is None:
+        repos = [r.strip() for r in os.getenv("GITHUB_REPOS", "").split(",") if r.strip()]
+    if newer_than_min is None:
+        newer_than_min = int(os.getenv("GITHUB_NEWER_THAN_MIN", "1440"))
+    batch_size = batch_size or int(os.getenv("GITHUB_GRAPHQL_BATCH", "20"))
+    post = post or _post_graphql
+    repos = [r for r in repos if "/" in r]
+    if not repos:
+        return []
+
+    cutoff = datetime.now(timezone.utc) - timedelta(minutes=newer_than_min)
+    since = cutoff.strftime("%Y-%m-%dT%H:%M:%SZ")
+    events: List[Dict[str, Any]] = []
+
+    for start in range(0, len(repos), batch_size):
+        chunk = repos[start:start + batch_size]
+        pending = {f"r{i}": {"repo": repo, "conns": {"commits": None, "pulls": None, "issues": None}}
+                   for i, repo in enumerate(chunk)}
+        for _ in range(max_pages):
+            if not pending:
+                break
+            resp = post(build_query(pending, since, page_size))
+            for err in resp.get("errors") or []:
+                print("[github:graphql] error", err.get("message"))
+            data = resp.get("data") or {}
+            if data.get("rateLimit"):
+                _LAST_RATE_LIMIT.update(data["rateLimit"])
+            nxt_pending: Dict[str, Dict[str, Any]] = {}
+            for alias, p in pending.items():
+                block = data.get(alias)
+                if not block:
+                    continue
+                more = _parse_repo(p["repo"], block, cutoff, events)
+                if more:
+                    nxt_pending[alias] = {"repo": p["repo"], "conns": more}
+            pending = nxt_pending
+    return events
@@ -1,7 +1,8 @@
 # github_remote_fetch.py
-import os,sys, tempfile,subprocess,shutil,base64,json,re
+import os,sys,base64,json,re
 from typing import Optional,Dict,List,Any
-import requests
+from backend.app.services.github_client import get_client
+from backend.app.services import repo_mirror
 GITHUB_API="https://api.github.com"
 def _token_headers():
     token=os.getenv("GITHUB_TOKEN") or ""
@@ -20,10 +21,10 @@ def repo_full_from_url(url:str)->str:
 def list_repo_tree(repo_url:str, branch:Optional[str]=None)->List[Dict[str,Any]]:
     repo_full=repo_full_from_url(repo_url)
     if not branch:
-        r=requests.get(f"{GITHUB_API}/repos/{repo_full}",headers=_token_headers(),timeout=15)
+        r=get_client().get(f"repos/{repo_full}",headers=_token_headers(),timeout=15)
         r.raise_for_status()
         branch=r.json().get("default_branch","main")
-    r=requests.get(f"{GITHUB_API}/repos/{repo_full}/git/trees/{branch}?recursive=1",headers=_token_headers(),timeout=30)
+    r=get_client().get(f"repos/{repo_full}/git/trees/{branch}",params={"recursive":1},headers=_token_headers(),timeout=30)
     if r.status_code==200:
         data=r.json()
         return data.get("tree",[])
@@ -33,7 +34,7 @@ def get_file_via_api(repo_url:str,path:str,ref:Optional[str]=None)->Dict[str,Any
     params={}
     if ref:
         params["ref"]=ref
-    r=requests.get(f"{GITHUB_API}/repos/{repo_full}/contents/{path}",headers=_token_headers(),params=params,timeout=20)
+    r=get_client().get(f"repos/{repo_full}/contents/{path}",headers=_token_headers(),params=params,timeout=20)
     if r.status_code==200:
         data=r.json()
         content=""
@@ -46,28 +47,19 @@ def get_file_via_api(repo_url:str,path:str,ref:Optional[str]=None)->Dict[str,Any
         raise FileNotFoundError(f"{path} not found in {repo_full} ref={ref}")
     r.raise_for_status()
 def clone_and_read(repo_url:str,path:str,branch:Optional[str]=None)->Dict[str,Any]:
-    td=tempfile.mkdtemp(prefix="ghclone_")
-    try:
-        cmd=["git","clone","--depth","1"]
-        if branch:
-            cmd+=["--branch",branch]
-        cmd+=[repo_url,td]
-        subprocess.check_call(cmd,stdout=subprocess.DEVNULL,stderr=subprocess.DEVNULL)
-        fp=os.path.join(td,path)
-        if not os.path.exists(fp):
-            raise FileNotFoundError(path)
-        with open(fp,"r",encoding="utf-8",errors="ignore") as f:
-            content=f.read()
-        return {"path":path,"content":content,"sha":None,"raw":None}
-    finally:
-        shutil.rmtree(td,ignore_errors=True)
+    return repo_mirror.get_cache().read_file(repo_url,path,ref=branch)
 def fetch_file(repo_url:str,path:str,branch:Optional[str]=None)->Dict[str,Any]:
     try:
         return get_file_via_api(repo_url,path,ref=branch)
     except Exception:
         return clone_and_read(repo_url,path,branch)
+def list_repo_tree_local(repo_url:str,branch:Optional[str]=None)->List[Dict[str,Any]]:
+    return repo_mirror.get_cache().list_tree(repo_url,ref=branch)
 def fetch_candidates_under_services(repo_url:str,branch:Optional[str]=None)->List[str]:
-    tree=list_repo_tree(repo_url,branch=branch)
+    try:
+        tree=list_repo_tree_local(repo_url,branch=branch)
+    except Exception:
+        tree=list_repo_tree(repo_url,branch=branch)
     paths=[t["path"] for t in tree if t.get("path","").startswith("backend/app/services/")]
     return paths
 if __name__=="__main__":
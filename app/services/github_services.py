@@ -1,44 +1,93 @@
-import os, requests
+import os, time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
 from pathlib import Path
+from typing import Dict, Any, List, Optional
 from dotenv import load_dotenv
 load_dotenv(Path(__file__).resolve().parents[2] / ".env")
 
+from backend.app.services.github_client import get_client
+from backend.app.services import resilience
+
+_LAST_REPO_STATS: Dict[str, Dict[str, Any]] = {}
+
+def get_repo_stats() -> Dict[str, Dict[str, Any]]:
+    stats = _LAST_REPO_STATS
+    return {k: dict(v) for k, v in stats.items()}
+
+def _commit_to_event(repo: str, c: Dict[str, Any]) -> Dict[str, Any]:
+    commit = c.get("commit", {})
+    author = commit.get("author", {})
+    date_str = author.get("date")
+    try:
+        ts = datetime.fromisoformat(date_str.replace("Z","+00:00")) if date_str else datetime.now(timezone.utc)
+    except Exception:
+        ts = datetime.now(timezone.utc)
+    return {
+        "id": c.get("sha"),
+        "thread_id": repo,
+        "actor": author.get("name") or "unknown",
+        "text": commit.get("message",""),
+        "timestamp": ts,
+        "source": "github",
+    }
+
+def _fetch_repo(repo: str, headers: Dict[str, str], since: str, cutoff: datetime, limit: int) -> Dict[str, Any]:
+    """Fetch up to `limit` commits newer than `cutoff`, following Link: rel="next" pages."""
+    client = get_client()
+    started = time.perf_counter()
+    events: List[Dict[str, Any]] = []
+    pages, cached_pages, error = 0, 0, None
+    url: Optional[str] = f"repos/{repo}/commits"
+    params: Optional[Dict[str, Any]] = {"since": since, "per_page": max(1, min(limit, 100))}
+    try:
+        while url and len(events) < limit:
+            resp = client.get(url, params=params, headers=headers, timeout=15)
+            pages += 1
+            cached_pages += int(resp.from_cache)
+            if resp.status_code != 200:
+                error = f"{resp.status_code}: {resp.text[:200]}"
+                print(f"[github] {repo} error {error}")
+                break
+            for c in resp.json() or []:
+                ev = _commit_to_event(repo, c)
+                if ev["timestamp"] < cutoff: continue
+                events.append(ev)
+                if len(events) >= limit: break
+            # the next link already carries per_page/since
+            url, params = resp.links.get("next", {}).get("url"), None
+    except Exception as ex:
+        error = str(ex)
+        print("[github] error", repo, ex)
+    return {
+        "repo": repo, "events": events, "pages": pages, "cached_pages": cached_pages,
+        "latency_ms": round((time.perf_counter() - started) * 1000, 1), "error": error,
+    }
+
 def fetch_recent_commits(limit_per_repo: int = 20):
+    global _LAST_REPO_STATS
     TOKEN = os.getenv("GITHUB_TOKEN")
     REPOS = os.getenv("GITHUB_REPOS", "")
     NEWER_THAN_MIN = int(os.getenv("GITHUB_NEWER_THAN_MIN", "1440"))
+    WORKERS = int(os.getenv("GITHUB_POLL_WORKERS", "8"))
     if not TOKEN or not REPOS:
         print("[github] missing token or repos")
         return []
     headers = {"Authorization": f"token {TOKEN}"}
     repos = [r.strip() for r in REPOS.split(",") if r.strip()]
     cutoff = datetime.now(timezone.utc) - timedelta(minutes=NEWER_THAN_MIN)
-    events = []
-    for repo in repos:
-        url = f"https://api.github.com/repos/{repo}/commits"
-        try:
-            resp = requests.get(url, headers=headers, timeout=15)
-            if resp.status_code != 200:
-                print(f"[github] {repo} error {resp.status_code}: {resp.text}")
-                continue
-            for c in resp.json()[:limit_per_repo]:
-                commit = c.get("commit", {})
-                author = commit.get("author", {})
-                date_str = author.get("date")
-                try:
-                    ts = datetime.fromisoformat(date_str.replace("Z","+00:00")) if date_str else datetime.now(timezone.utc)
-                except Exception:
-                    ts = datetime.now(timezone.utc)
-                if ts < cutoff: continue
-                events.append({
-                    "id": c.get("sha"),
-                    "thread_id": repo,
-                    "actor": author.get("name") or "unknown",
-                    "text": commit.get("message",""),
-                    "timestamp": ts,
-                    "source": "github",
-                })
-        except Exception as ex:
-            print("[github] error", repo, ex)
+    # `since` is floored to the hour so consecutive polls send the same URL and
+    # get a cheap 304 from the ETag cache; the exact cutoff is applied per commit.
+    since = cutoff.replace(minute=0, second=0, microsecond=0).strftime("%Y-%m-%dT%H:%M:%SZ")
+    with ThreadPoolExecutor(max_workers=max(1, min(WORKERS, len(repos)))) as pool:
+        futures = [resilience.submit(pool, _fetch_repo, r, headers, since, cutoff, limit_per_repo) for r in repos]
+        results = [f.result() for f in futures]
+    events, stats = [], {}
+    for res in results:
+        repo_events = res.pop("events")
+        res["commits"] = len(repo_events)
+        events.extend(repo_events)
+        stats[res.pop("repo")] = res
+    # swapped in whole: get_repo_stats() never sees a half-filled dict
+    _LAST_REPO_STATS = stats
     return events
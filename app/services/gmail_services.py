@@ -1,15 +1,24 @@
 import os
+import threading
 from typing import List, Dict, Optional
 
 import base64
 from email.mime.text import MIMEText
 from email.utils import formatdate
 
-from google.oauth2.credentials import Credentials
-from googleapiclient.discovery import build
-from googleapiclient.errors import HttpError
+_local = threading.local()
 
 def _get_service():
+    """Gmail API client, built once per thread (the underlying httplib2 transport is not thread-safe)."""
+    service = getattr(_local, "service", None)
+    if service is None:
+        service = _local.service = _build_service()
+    return service
+
+def _build_service():
+    # the Google client libraries are slow to import; load them with the first Gmail call
+    from google.oauth2.credentials import Credentials
+    from googleapiclient.discovery import build
     refresh_token = os.getenv("GMAIL_REFRESH_TOKEN")
     client_id = os.getenv("CLIENT_ID")
     client_secret = os.getenv("CLIENT_SECRET")
@@ -20,9 +29,12 @@ def _get_service():
         refresh_token=refresh_token,
         client_id=client_id,
         client_secret=client_secret,
-        token_uri="https://oauth2.googleapis.com/token",
+        token_uri=os.getenv("GMAIL_TOKEN_URI", "https://oauth2.googleapis.com/token"),
     )
-    return build("gmail", "v1", credentials=creds, cache_discovery=False)
+    # GMAIL_API_ENDPOINT points the client at another host (e.g. the load-test fakes)
+    endpoint = os.getenv("GMAIL_API_ENDPOINT")
+    return build("gmail", "v1", credentials=creds, cache_discovery=False,
+                 client_options={"api_endpoint": endpoint} if endpoint else None)
 
 def _header(headers: List[Dict], name: str) -> Optional[str]:
     for h in headers or []:
@@ -106,6 +118,7 @@ def send_gmail(
     in_reply_to: Optional[str] = None,
     html: bool = False,
 ) -> Dict:
+    from googleapiclient.errors import HttpError
     service = _get_service()
     try:
         mime = MIMEText(body, _subtype=("html" if html else "plain"), _charset="utf-8")
@@ -1,11 +1,32 @@
 from dotenv import load_dotenv
 load_dotenv()
-from typing import Optional, Dict, Any
-import os, json, re, time
-from openai import OpenAI
+from typing import Optional, Dict, Any, List, TYPE_CHECKING
+from collections import deque
+import os, json, re, time, copy, queue, hashlib, threading
+from concurrent.futures import Future
+import requests
+from backend.app.services import prompts, resilience, metrics, tracing
+if TYPE_CHECKING:
+    from openai import OpenAI
 DEFAULT_LLM_MODEL = os.getenv("LLM_MODEL", "gpt-4o-mini")
-_client: Optional[OpenAI] = None
-def get_client() -> OpenAI:
+_client: Optional["OpenAI"] = None
+# per-call usage for cost / latency dashboards (see get_llm_stats)
+_USAGE_LOCK = threading.Lock()
+_USAGE_TOTALS: Dict[str, Dict[str, Any]] = {}
+_USAGE_RECENT: deque = deque(maxlen=200)
+# single-flight: identical concurrent completions share one request (LLM_COALESCE=0 disables)
+_INFLIGHT_LOCK = threading.Lock()
+_INFLIGHT: Dict[str, "_Flight"] = {}
+_COALESCE = {"hits": 0, "misses": 0}
+LLM_SECONDS = metrics.histogram("shadowshift_llm_request_seconds", "LLM completion latency",
+                                ("kind", "model", "outcome"))
+LLM_TOKENS = metrics.counter("shadowshift_llm_tokens_total", "LLM tokens by type", ("kind", "model", "type"))
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Optional[Dict[str, Any]] = None
+        self.error: Optional[BaseException] = None
+def get_client() -> "OpenAI":
     global _client
     if _client is None:
         api_key = os.getenv("OPENAI_API_KEY")
@@ -13,42 +34,282 @@ def get_client() -> OpenAI:
             raise RuntimeError("OPENAI_API_KEY not set")
         if os.getenv("LLM_OFFLINE") == "1":
             return None
-        _client = OpenAI(api_key=api_key)
+        from openai import OpenAI   # ~0.7s to import; only needed once a draft is requested
+        _client = OpenAI(api_key=api_key, base_url=os.getenv("OPENAI_BASE_URL") or None)
     return _client
+class LLMBackend:
+    """Runs one chat completion; returns an OpenAI-shaped response (dict or SDK object with `choices`)."""
+    name = "base"
+    default_model = DEFAULT_LLM_MODEL
+    def chat(self, model: str, messages: List[Dict[str, str]]) -> Any:
+        raise NotImplementedError
+    def info(self) -> Dict[str, Any]:
+        return {"name": self.name, "default_model": self.default_model}
+class OpenAIBackend(LLMBackend):
+    name = "openai"
+    def __init__(self):
+        # JSON mode makes the reply a bare object; turned off for models that reject response_format
+        self.json_mode = os.getenv("LLM_JSON_MODE", "1") == "1"
+    def chat(self, model: str, messages: List[Dict[str, str]]) -> Any:
+        client = get_client()
+        timeout = resilience.timeout(float(os.getenv("LLM_TIMEOUT_SECONDS", "60")))
+        if self.json_mode:
+            try:
+                return client.chat.completions.create(model=model, messages=messages, timeout=timeout,
+                                                      response_format={"type": "json_object"})
+            except Exception as e:
+                if "response_format" not in str(e):
+                    raise
+                print("[llm] JSON mode not supported, falling back to plain completions:", e)
+                self.json_mode = False
+        return client.chat.completions.create(model=model, messages=messages, timeout=timeout)
+    def info(self) -> Dict[str, Any]:
+        return {**super().info(), "json_mode": self.json_mode}
+class LocalBackend(LLMBackend):
+    """
+    Local CPU inference through an OpenAI-compatible server (llama.cpp server, vLLM, Ollama...).
+    Requests queued within LLM_LOCAL_BATCH_WAIT_MS are rendered with a chat template and sent as
+    one /v1/completions call with a list of prompts (up to LLM_LOCAL_BATCH_SIZE), so concurrent
+    drafts share a single generation pass.
+    """
+    name = "local"
+    def __init__(self, base_url: Optional[str] = None, model: Optional[str] = None,
+                 batch_size: Optional[int] = None, batch_wait_ms: Optional[float] = None,
+                 max_tokens: Optional[int] = None, timeout: float = 120.0, session: Any = None):
+        self.base_url = (base_url or os.getenv("LLM_LOCAL_URL", "http://127.0.0.1:8080/v1")).rstrip("/")
+        self.default_model = model or os.getenv("LLM_LOCAL_MODEL", "local")
+        self.batch_size = batch_size or int(os.getenv("LLM_LOCAL_BATCH_SIZE", "8"))
+        self.batch_wait = (batch_wait_ms if batch_wait_ms is not None else float(os.getenv("LLM_LOCAL_BATCH_WAIT_MS", "20"))) / 1000
+        self.max_tokens = max_tokens or int(os.getenv("LLM_LOCAL_MAX_TOKENS", "512"))
+        self.timeout = timeout
+        self.session = session or requests.Session()
+        self._queue: "queue.Queue" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self.stats = {"requests": 0, "batches": 0, "max_batch": 0}
+    @staticmethod
+    def render(messages: List[Dict[str, str]]) -> str:
+        # ChatML, understood by most small instruct models served locally
+        parts = [f"<|im_start|>{m['role']}\n{m['content']}<|im_end|>\n" for m in messages]
+        return "".join(parts) + "<|im_start|>assistant\n"
+    def chat(self, model: str, messages: List[Dict[str, str]]) -> Any:
+        fut: Future = Future()
+        self._queue.put((model, self.render(messages), fut))
+        self._ensure_thread()
+        return {"choices": [{"message": {"content": fut.result(timeout=resilience.timeout(self.timeout))}}]}
+    def _ensure_thread(self) -> None:
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="llm-local-batcher", daemon=True)
+                self._thread.start()
+    def _run(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.batch_wait
+            while len(batch) < self.batch_size:
+                left = deadline - time.monotonic()
+                if left <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=left))
+                except queue.Empty:
+                    break
+            by_model: Dict[str, List[Any]] = {}
+            for item in batch:
+                by_model.setdefault(item[0], []).append(item)
+            for model, items in by_model.items():
+                self._generate(model, items)
+    def _generate(self, model: str, items: List[Any]) -> None:
+        self.stats["requests"] += len(items)
+        self.stats["batches"] += 1
+        self.stats["max_batch"] = max(self.stats["max_batch"], len(items))
+        try:
+            r = self.session.post(f"{self.base_url}/completions", timeout=resilience.timeout(self.timeout), json={
+                "model": model, "prompt": [p for _, p, _ in items], "max_tokens": self.max_tokens,
+                "temperature": float(os.getenv("LLM_LOCAL_TEMPERATURE", "0.3")), "stop": ["<|im_end|>"],
+            })
+            r.raise_for_status()
+            texts: Dict[int, str] = {}
+            for i, c in enumerate(r.json().get("choices", [])):
+                texts[int(c.get("index", i))] = c.get("text", "")
+            for i, (_, _, fut) in enumerate(items):
+                if i in texts:
+                    fut.set_result(texts[i])
+                else:
+                    fut.set_exception(RuntimeError("local LLM returned no choice for prompt"))
+        except Exception as e:
+            for _, _, fut in items:
+                if not fut.done():
+                    fut.set_exception(e)
+    def info(self) -> Dict[str, Any]:
+        return {**super().info(), "url": self.base_url, "batch_size": self.batch_size, **self.stats}
+BACKENDS = {"openai": OpenAIBackend, "local": LocalBackend}
+_backend: Optional[LLMBackend] = None
+_backend_lock = threading.Lock()
+def get_backend() -> LLMBackend:
+    """Backend chosen by LLM_BACKEND (openai | local); LLM_OFFLINE=1 still short-circuits every call."""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                name = os.getenv("LLM_BACKEND", "openai")
+                if name not in BACKENDS:
+                    raise RuntimeError(f"unknown LLM_BACKEND {name!r}; expected one of {sorted(BACKENDS)}")
+                _backend = BACKENDS[name]()
+    return _backend
+def set_backend(backend: Optional[LLMBackend]) -> None:
+    global _backend
+    _backend = backend
+# characters that matter when matching braces; everything else is skipped by the regex engine
+_JSON_SCAN = re.compile(r'[{}"\\]')
+_TRAILING_COMMA = re.compile(r",\s*([}\]])")
+_MAX_JSON_CANDIDATES = 8
+def _match_brace(text: str, start: int) -> Optional[int]:
+    """Index of the brace closing the object opened at `start` (strings and escapes respected), or None."""
+    depth, in_str, escaped = 0, False, -1
+    for m in _JSON_SCAN.finditer(text, start):
+        i = m.start()
+        if i == escaped:
+            continue
+        c = text[i]
+        if in_str:
+            if c == "\\":
+                escaped = i + 1
+            elif c == '"':
+                in_str = False
+        elif c == '"':
+            in_str = True
+        elif c == "{":
+            depth += 1
+        elif c == "}":
+            depth -= 1
+            if depth == 0:
+                return i
+    return None
 def _extract_json_from_text(text: str) -> Optional[Dict[str, Any]]:
+    """First balanced JSON object in `text` (single pass per candidate, linear in the text length)."""
     text = text.strip()
-    if text.startswith("```") and "json" in text.splitlines()[0].lower():
-        text = "\n".join(text.splitlines()[1:-1])
-    m = re.search(r"(\{(?:[^{}]|(?1))*\})", text, flags=re.DOTALL)
-    if not m:
-        m = re.search(r"(\{[\s\S]*\})", text, flags=re.DOTALL)
-    if not m:
-        return None
-    candidate = m.group(1)
-    try:
-        return json.loads(candidate)
-    except Exception:
+    if text.startswith("{"):
+        # JSON mode: the whole reply is the object
         try:
-            candidate_clean = re.sub(r",\s*}", "}", re.sub(r",\s*]", "]", candidate))
-            return json.loads(candidate_clean)
-        except Exception:
+            parsed = json.loads(text)
+            if isinstance(parsed, dict):
+                return parsed
+        except ValueError:
+            pass
+    start = text.find("{")
+    for _ in range(_MAX_JSON_CANDIDATES):
+        if start < 0:
+            return None
+        end = _match_brace(text, start)
+        if end is None:
             return None
-def _chat_json(system: str, user: str, model: Optional[str] = None, retries: int = 1, delay: float = 0.5) -> Dict[str, Any]:
+        candidate = text[start:end + 1]
+        for attempt in (candidate, _TRAILING_COMMA.sub(r"\1", candidate)):
+            try:
+                parsed = json.loads(attempt)
+                if isinstance(parsed, dict):
+                    return parsed
+            except ValueError:
+                pass
+        start = text.find("{", start + 1)
+    return None
+def _record_usage(kind: str, model: str, messages: List[Dict[str, str]], resp: Any, content: str,
+                  latency_ms: float, error: Optional[str] = None) -> None:
+    usage = getattr(resp, "usage", None) if resp is not None else None
+    if isinstance(resp, dict):
+        usage = resp.get("usage")
+    def _u(key, default=0):
+        if usage is None:
+            return default
+        v = usage.get(key) if isinstance(usage, dict) else getattr(usage, key, None)
+        return default if v is None else v
+    details = _u("prompt_tokens_details", None)
+    cached = (details.get("cached_tokens") if isinstance(details, dict) else getattr(details, "cached_tokens", 0)) or 0
+    rec = {
+        "kind": kind, "model": model, "at": time.time(), "latency_ms": round(latency_ms, 1),
+        "prompt_tokens": _u("prompt_tokens", None) or prompts.count_message_tokens(messages, model),
+        "completion_tokens": _u("completion_tokens", None) or prompts.count_tokens(content, model),
+        "cached_tokens": int(cached), "usage_source": "provider" if usage is not None else "local", "error": error,
+    }
+    LLM_SECONDS.observe(latency_ms / 1000, kind=kind, model=model, outcome="error" if error else "ok")
+    if not error:
+        for k in ("prompt_tokens", "completion_tokens", "cached_tokens"):
+            LLM_TOKENS.inc(rec[k], kind=kind, model=model, type=k[:-len("_tokens")])
+    with _USAGE_LOCK:
+        _USAGE_RECENT.append(rec)
+        t = _USAGE_TOTALS.setdefault(f"{kind}:{model}", {"calls": 0, "errors": 0, "prompt_tokens": 0,
+                                                          "completion_tokens": 0, "cached_tokens": 0, "latency_ms": 0.0})
+        t["calls"] += 1
+        t["errors"] += 1 if error else 0
+        for k in ("prompt_tokens", "completion_tokens", "cached_tokens", "latency_ms"):
+            t[k] += rec[k]
+def get_llm_stats(recent: int = 20) -> Dict[str, Any]:
+    with _USAGE_LOCK:
+        totals = {k: {**v, "avg_latency_ms": round(v["latency_ms"] / v["calls"], 1) if v["calls"] else 0.0}
+                  for k, v in _USAGE_TOTALS.items()}
+        out = {"totals": totals, "recent": list(_USAGE_RECENT)[-recent:] if recent else []}
+    with _INFLIGHT_LOCK:
+        out["coalescing"] = {**_COALESCE, "in_flight": len(_INFLIGHT)}
+    out["backend"] = get_backend().info()
+    return out
+def _chat_json(system: str, user: str, model: Optional[str] = None, retries: int = 1, delay: float = 0.5,
+               kind: str = "chat") -> Dict[str, Any]:
+    """Chat completion parsed as JSON. Concurrent calls with the same prompt and model wait for the first one."""
+    if os.getenv("LLM_OFFLINE") == "1" or os.getenv("LLM_COALESCE", "1") != "1":
+        return _chat_json_once(system, user, model, retries, delay, kind)
+    key = hashlib.sha256(json.dumps([model or get_backend().default_model, system, user]).encode("utf-8")).hexdigest()
+    with _INFLIGHT_LOCK:
+        flight = _INFLIGHT.get(key)
+        leader = flight is None
+        if leader:
+            flight = _INFLIGHT[key] = _Flight()
+        _COALESCE["misses" if leader else "hits"] += 1
+    metrics.CACHE_REQUESTS.inc(cache="llm_coalesce", result="miss" if leader else "hit")
+    if not leader:
+        flight.done.wait()
+        if flight.error is not None:
+            raise flight.error
+        return copy.deepcopy(flight.result)
+    try:
+        flight.result = _chat_json_once(system, user, model, retries, delay, kind)
+        return copy.deepcopy(flight.result)
+    except BaseException as e:
+        flight.error = e
+        raise
+    finally:
+        with _INFLIGHT_LOCK:
+            _INFLIGHT.pop(key, None)
+        flight.done.set()
+def _chat_json_once(system: str, user: str, model: Optional[str] = None, retries: int = 1, delay: float = 0.5,
+                    kind: str = "chat") -> Dict[str, Any]:
     if os.getenv("LLM_OFFLINE") == "1":
         return {"subject": "Draft", "body": "Hi,\n\nOn it.\n\n—ShadowShift"}
-    client = get_client()
-    mdl = model or DEFAULT_LLM_MODEL
+    backend = get_backend()
+    mdl = model or backend.default_model
+    messages = [
+        {"role": "system", "content": system},
+        {"role": "user", "content": user},
+    ]
+    breaker = resilience.get_breaker("llm")
+    hedge_after = float(os.getenv("LLM_HEDGE_AFTER_MS", "0")) / 1000
+    def _complete():
+        if hedge_after > 0:
+            return resilience.hedged(lambda: backend.chat(mdl, messages), hedge_after)
+        return backend.chat(mdl, messages)
+    with resilience.deadline(float(os.getenv("LLM_DEADLINE_SECONDS", "90"))):
+        return _complete_with_retries(_complete, breaker, kind, mdl, messages, retries, delay)
+def _complete_with_retries(complete, breaker, kind: str, mdl: str, messages: List[Dict[str, str]],
+                           retries: int, delay: float) -> Dict[str, Any]:
     attempt = 0
     while True:
         attempt += 1
+        started = time.perf_counter()
+        resp = None
         try:
-            resp = client.chat.completions.create(
-                model=mdl,
-                messages=[
-                    {"role": "system", "content": system},
-                    {"role": "user", "content": user},
-                ],
-            )
+            resilience.check_deadline()
+            with tracing.span("llm.chat", kind=kind, model=mdl, attempt=attempt):
+                resp = breaker.call(complete)
             choices = getattr(resp, "choices", None) or resp.get("choices", [])
             if not choices:
                 content = ""
@@ -61,14 +322,28 @@ def _chat_json(system: str, user: str, model: Optional[str] = None, retries: int
                 else:
                     content = getattr(msg, "content", "") or ""
             content = (content or "").strip()
+            _record_usage(kind, mdl, messages, resp, content, (time.perf_counter() - started) * 1000)
             parsed = _extract_json_from_text(content)
             if parsed is not None:
                 return parsed
             return {"subject": "Draft", "body": content or "Hi,\n\nThanks,\n"}
         except Exception as e:
-            if attempt > retries:
+            if resp is None:
+                _record_usage(kind, mdl, messages, None, "", (time.perf_counter() - started) * 1000, error=str(e)[:200])
+            if attempt > retries or isinstance(e, (resilience.CircuitOpenError, resilience.DeadlineExceeded)):
                 raise
-            time.sleep(delay)
+            resilience.sleep_backoff(attempt, base=delay)
+# static instructions + output format: the shared prompt prefix of every draft call
+EMAIL_SYSTEM = (
+    "You are ShadowShift's email drafting assistant. Input is a serialized conversation state. "
+    "Return ONLY a strict JSON object with keys: subject, body. No extra prose.\n"
+    'Return JSON:\n{"subject": "...", "body": "..."}'
+)
+MESSAGE_SYSTEM = (
+    "You are ShadowShift's messaging assistant (Discord/GitHub). "
+    "Return ONLY a strict JSON object with key: body. No extra prose.\n"
+    'Return JSON:\n{"body": "..."}'
+)
 def draft_email_from_state(
     state: str,
     recipient: Optional[str] = None,
@@ -77,26 +352,18 @@ def draft_email_from_state(
     language: str = "en",
     max_words: int = 180,
     model: Optional[str] = None,
+    state_budget: Optional[int] = None,
 ) -> Dict[str, Any]:
     if os.getenv("LLM_OFFLINE") == "1":
         return {"subject": "Draft reply", "body": "Hi,\n\nOn it.\n\n—ShadowShift", "model": "offline"}
-    user = f"""Language: {language}
-Style: {style} | Tone: {tone} | Max words: {max_words}
-Recipient: {recipient or "unknown"}
-
-STATE:
-{state}
-
-Return JSON:
-{{"subject": "...", "body": "..."}}"""
-    data = _chat_json(
-        "You are ShadowShift's email drafting assistant. Input is a serialized conversation state. Return ONLY a strict JSON object with keys: subject, body. No extra prose.",
-        user,
-        model,
-        retries=2,
-        delay=0.5,
-    )
-    data["model"] = model or DEFAULT_LLM_MODEL
+    mdl = model or get_backend().default_model
+    system, user = (m["content"] for m in prompts.build_messages(
+        EMAIL_SYSTEM,
+        f"Language: {language}\nStyle: {style} | Tone: {tone} | Max words: {max_words}\nRecipient: {recipient or 'unknown'}",
+        state, state_budget, mdl,
+    ))
+    data = _chat_json(system, user, model, retries=2, delay=0.5, kind="email")
+    data["model"] = mdl
     return data
 def draft_message_from_state(
     state: str,
@@ -105,21 +372,15 @@ def draft_message_from_state(
     language: str = "en",
     max_words: int = 120,
     model: Optional[str] = None,
+    state_budget: Optional[int] = None,
 ) -> Dict[str, Any]:
     if os.getenv("LLM_OFFLINE") == "1":
         return {"subject": "", "body": "Acknowledged. I'll follow up soon.", "model": "offline"}
-    user = f"""Platform: {platform} | Tone: {tone} | Language: {language} | Max words: {max_words}
-
-STATE:
-{state}
-
-Return JSON:
-{{"body": "..."}}"""
-    data = _chat_json(
-        "You are ShadowShift's messaging assistant (Discord/GitHub). Return ONLY a strict JSON object with key: body. No extra prose.",
-        user,
-        model,
-        retries=2,
-        delay=0.5,
-    )
-    return {"subject": "", "body": (data.get("body") or data.get("text") or "").strip(), "model": model or DEFAULT_LLM_MODEL}
+    mdl = model or get_backend().default_model
+    system, user = (m["content"] for m in prompts.build_messages(
+        MESSAGE_SYSTEM,
+        f"Platform: {platform} | Tone: {tone} | Language: {language} | Max words: {max_words}",
+        state, state_budget, mdl,
+    ))
+    data = _chat_json(system, user, model, retries=2, delay=0.5, kind="message")
+    return {"subject": "", "body": (data.get("body") or data.get("text") or "").strip(), "model": mdl}
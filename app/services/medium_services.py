@@ -2,7 +2,6 @@ import os
 import secrets
 import urllib.parse
 import requests
-import feedparser
 from typing import List, Dict
 
 CLIENT_ID = os.getenv("MEDIUM_CLIENT_ID", "")
@@ -43,6 +42,7 @@ def exchange_code_for_token(code: str) -> dict:
 def fetch_articles_by_username(username: str, limit: int = 20) -> List[Dict]:
     if not username:
         return []
+    import feedparser
     feed_url = f"https://medium.com/feed/@{username}"
     d = feedparser.parse(feed_url)
     out = []
@@ -0,0 +1,216 @@
+"""
+Unified outbound sender for Discord and Gmail.
+
+- One code path per provider (`discord_services.send_message`, `gmail_services.send_gmail`)
+  over persistent, pooled clients
+- Idempotency keys (SQLite in storage/): a retried send with the same key returns the
+  first result instead of sending twice; a concurrent duplicate is rejected
+- `send_bulk` fans messages out with bounded concurrency, paced per provider
+  (OUTBOUND_<PROVIDER>_PER_SECOND) on top of the providers' own rate-limit handling
+"""
+
+import os
+import json
+import time
+import asyncio
+import hashlib
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Optional, Dict, Any, List
+
+from backend.app.services import tracing
+
+BACKEND_ROOT = Path(__file__).resolve().parents[2]
+DEFAULT_PATH = BACKEND_ROOT / "storage" / "outbound.db"
+PROVIDERS = ("discord", "gmail")
+REQUIRED = {"discord": ("channel_id", "content"), "gmail": ("to", "body")}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sends (
+    key         TEXT PRIMARY KEY,
+    fingerprint TEXT NOT NULL,
+    status      TEXT NOT NULL,
+    result      TEXT,
+    error       TEXT,
+    created_at  REAL NOT NULL,
+    updated_at  REAL NOT NULL
+);
+"""
+
+
+class IdempotencyConflict(RuntimeError):
+    """The key is in use: by a send still in flight, or by a different message."""
+
+
+class IdempotencyStore:
+    def __init__(self, path: Optional[Path] = None, pending_ttl: float = 300):
+        self.path = Path(path or os.getenv("OUTBOUND_DB_PATH") or DEFAULT_PATH)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.pending_ttl = pending_ttl
+        self._local = threading.local()
+        self._conn().executescript(_SCHEMA)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.path), timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def begin(self, key: str, fingerprint: str) -> Optional[Dict[str, Any]]:
+        """Reserve `key`. Returns the stored result if the message was already sent, else None."""
+        now = time.time()
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT fingerprint, status, result, updated_at FROM sends WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                if row[0] != fingerprint:
+                    raise IdempotencyConflict(f"idempotency key {key!r} was used for a different message")
+                if row[1] == "sent":
+                    conn.execute("COMMIT")
+                    return json.loads(row[2])
+                if row[1] == "pending" and now - row[3] < self.pending_ttl:
+                    raise IdempotencyConflict(f"a send with idempotency key {key!r} is already in flight")
+            # new key, a failed attempt, or a pending one whose sender died
+            conn.execute(
+                "INSERT INTO sends (key, fingerprint, status, created_at, updated_at) VALUES (?, ?, 'pending', ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET status = 'pending', error = NULL, updated_at = excluded.updated_at",
+                (key, fingerprint, now, now),
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return None
+
+    def complete(self, key: str, result: Dict[str, Any]) -> None:
+        self._conn().execute("UPDATE sends SET status = 'sent', result = ?, updated_at = ? WHERE key = ?",
+                             (json.dumps(result, default=str), time.time(), key))
+
+    def fail(self, key: str, error: str) -> None:
+        self._conn().execute("UPDATE sends SET status = 'failed', error = ?, updated_at = ? WHERE key = ?",
+                             (error[:500], time.time(), key))
+
+    def purge(self, older_than_seconds: float = 7 * 86400) -> int:
+        cur = self._conn().execute("DELETE FROM sends WHERE updated_at < ?", (time.time() - older_than_seconds,))
+        return cur.rowcount
+
+
+class Pacer:
+    """Spaces calls at least 1/rate seconds apart across threads."""
+
+    def __init__(self, per_second: float):
+        self.interval = 1.0 / per_second if per_second > 0 else 0.0
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self) -> None:
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next)
+            self._next = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+_store: Optional[IdempotencyStore] = None
+_store_lock = threading.Lock()
+_PACERS: Dict[str, Pacer] = {}
+
+
+def get_store() -> IdempotencyStore:
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = IdempotencyStore()
+    return _store
+
+
+def _pacer(provider: str) -> Pacer:
+    with _store_lock:
+        if provider not in _PACERS:
+            default = {"discord": "5", "gmail": "2"}[provider]
+            _PACERS[provider] = Pacer(float(os.getenv(f"OUTBOUND_{provider.upper()}_PER_SECOND", default)))
+        return _PACERS[provider]
+
+
+def _fingerprint(message: Dict[str, Any]) -> str:
+    body = {k: v for k, v in message.items() if k != "idempotency_key"}
+    return hashlib.sha256(json.dumps(body, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+def _deliver(message: Dict[str, Any]) -> Dict[str, Any]:
+    provider = message["provider"]
+    with tracing.span("outbound.pace", provider=provider):
+        _pacer(provider).wait()
+    with tracing.span("outbound.send", provider=provider):
+        return _send_now(provider, message)
+
+
+def _send_now(provider: str, message: Dict[str, Any]) -> Dict[str, Any]:
+    if provider == "discord":
+        from backend.app.services import discord_services
+        res = discord_services.send_message(message["channel_id"], message["content"])
+        return {"ok": True, "provider": "discord", "message_id": res.get("id")}
+    from backend.app.services import gmail_services
+    res = gmail_services.send_gmail(
+        to=message["to"],
+        subject=message.get("subject", ""),
+        body=message["body"],
+        thread_id=message.get("thread_id"),
+        in_reply_to=message.get("in_reply_to"),
+        html=bool(message.get("html", False)),
+    )
+    return {"ok": True, "provider": "gmail", "message_id": res.get("id"), "thread_id": res.get("threadId")}
+
+
+def send(message: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Send one message: {"provider": "discord", "channel_id", "content"} or
+    {"provider": "gmail", "to", "subject", "body", ...}, optionally with "idempotency_key".
+    """
+    if message.get("provider") not in PROVIDERS:
+        raise ValueError(f"provider must be one of {PROVIDERS}")
+    missing = [f for f in REQUIRED[message["provider"]] if not message.get(f)]
+    if missing:
+        raise ValueError(f"{message['provider']} message is missing {', '.join(missing)}")
+    key = message.get("idempotency_key")
+    if not key:
+        return {**_deliver(message), "replayed": False}
+    store = get_store()
+    previous = store.begin(key, _fingerprint(message))
+    if previous is not None:
+        return {**previous, "replayed": True}
+    try:
+        result = _deliver(message)
+    except Exception as e:
+        store.fail(key, str(e))
+        raise
+    store.complete(key, result)
+    return {**result, "replayed": False}
+
+
+async def send_async(message: Dict[str, Any]) -> Dict[str, Any]:
+    return await asyncio.to_thread(send, message)
+
+
+async def send_bulk(messages: List[Dict[str, Any]], concurrency: Optional[int] = None) -> Dict[str, Any]:
+    """Send many messages concurrently; one failure does not stop the others."""
+    sem = asyncio.Semaphore(concurrency or int(os.getenv("OUTBOUND_CONCURRENCY", "4")))
+
+    async def one(i: int, m: Dict[str, Any]) -> Dict[str, Any]:
+        async with sem:
+            try:
+                return {"index": i, **await send_async(m)}
+            except Exception as e:
+                return {"index": i, "ok": False, "provider": m.get("provider"), "error": str(e)}
+
+    results = await asyncio.gather(*(one(i, m) for i, m in enumerate(messages)))
+    sent = sum(1 for r in results if r.get("ok"))
+    return {"sent": sent, "failed": len(results) - sent, "results": list(results)}
@@ -0,0 +1,229 @@
+"""
+Poll job handles for /poll/now and /poll/jobs/{id}.
+
+Jobs are rows in the coordination DB, so any API worker can answer /poll/jobs/{id}.
+
+- In-process mode: single-flight across workers; polls run one at a time. A trigger joins a
+  queued or running poll that covers its sources, widens a queued one, or else queues behind
+  the running poll. Only the poller leader runs polls: a job triggered on another worker stays
+  queued until the leader picks it up on its next tick. A job left 'running' by a runner that
+  lost the lease is requeued by the new leader.
+- Worker mode (POLL_MODE=worker): the job records the fetch job ids it queued, and its status
+  is read from the shared work queue.
+"""
+
+import os
+import json
+import time
+import uuid
+import asyncio
+import threading
+from typing import Optional, Dict, Any, List
+
+from backend.app.services import scheduler, poll_pipeline, work_queue, coordination
+
+MAX_JOBS = 50
+
+_runner_lock = threading.Lock()
+_runner: Optional[threading.Thread] = None
+
+
+def _timeout() -> float:
+    # an active job older than this belongs to a leader that died mid-poll; it is failed, not joined
+    return float(os.getenv("POLL_JOB_TIMEOUT_SECONDS", "900"))
+
+
+def trigger(wait: bool = False, sources: Optional[List[str]] = None) -> Dict[str, Any]:
+    """Queue a poll of `sources` (default: all), or join one that covers them. Returns the job handle."""
+    sources = list(sources or scheduler.SOURCES)
+    if poll_pipeline.poll_mode() == "worker":
+        return {**_enqueue_fetches(sources), "joined": False}
+
+    now = time.time()
+    with coordination.transaction() as conn:
+        conn.execute(
+            "UPDATE poll_jobs SET status = 'failed', finished_at = ?, error = 'timed out' "
+            "WHERE fetch_ids IS NULL AND status IN ('queued', 'running') AND COALESCE(started_at, created_at) < ?",
+            (now, now - _timeout()),
+        )
+        active = conn.execute(
+            "SELECT id, status, sources FROM poll_jobs WHERE fetch_ids IS NULL AND status IN ('queued', 'running') "
+            "ORDER BY created_at"
+        ).fetchall()
+        job_id = _joinable(conn, active, sources)
+        joined = job_id is not None
+        if not joined:
+            job_id, joined = uuid.uuid4().hex[:12], False
+            conn.execute("INSERT INTO poll_jobs (id, status, sources, created_at) VALUES (?, 'queued', ?, ?)",
+                         (job_id, json.dumps(sources), now))
+            _prune(conn)
+    if scheduler.is_poller():
+        kick()
+    job = _wait(job_id) if wait else get_job(job_id)
+    return {**job, "joined": joined}
+
+
+def _joinable(conn, active: List[tuple], sources: List[str]) -> Optional[str]:
+    """An active job that will poll every one of `sources`; a queued job is widened to cover them."""
+    for job_id, _, job_sources in active:
+        if set(sources) <= set(json.loads(job_sources)):
+            return job_id
+    for job_id, status, job_sources in active:
+        if status == "queued":
+            merged = list(dict.fromkeys(json.loads(job_sources) + sources))
+            conn.execute("UPDATE poll_jobs SET sources = ? WHERE id = ?", (json.dumps(merged), job_id))
+            return job_id
+    # only a running poll of other sources: queue ours behind it
+    return None
+
+
+def _enqueue_fetches(sources: List[str]) -> Dict[str, Any]:
+    ids = poll_pipeline.enqueue_poll(sources)
+    job_id = uuid.uuid4().hex[:12]
+    with coordination.transaction() as conn:
+        conn.execute("INSERT INTO poll_jobs (id, status, sources, fetch_ids, created_at) VALUES (?, 'queued', ?, ?, ?)",
+                     (job_id, json.dumps(sources), json.dumps(ids), time.time()))
+        _prune(conn)
+    return get_job(job_id)
+
+
+def _prune(conn) -> None:
+    conn.execute(
+        "DELETE FROM poll_jobs WHERE (fetch_ids IS NOT NULL OR status NOT IN ('queued', 'running')) "
+        "AND id NOT IN (SELECT id FROM poll_jobs ORDER BY created_at DESC LIMIT ?)",
+        (MAX_JOBS,),
+    )
+
+
+def kick() -> None:
+    """Run the queued jobs on a background thread of this process (the poller leader)."""
+    global _runner
+    with _runner_lock:
+        if _runner is None:
+            try:
+                _requeue_orphans()
+            except Exception as ex:
+                print(f"[poll_jobs] could not requeue orphaned jobs: {ex}")
+            _runner = threading.Thread(target=_run_queued, name="poll-jobs", daemon=True)
+            _runner.start()
+
+
+def _requeue_orphans() -> None:
+    # called with no runner in this process, so its own 'running' rows are orphans; the lease holder
+    # also takes back the rows of runners that lost the lease (they may have died mid-poll)
+    where, params = "runner = ?", (coordination.worker_id(),)
+    if scheduler.holds_poller_lease():
+        where, params = "1 = 1", ()
+    with coordination.transaction() as conn:
+        conn.execute("UPDATE poll_jobs SET status = 'queued', runner = NULL, started_at = NULL "
+                     f"WHERE fetch_ids IS NULL AND status = 'running' AND {where}", params)
+
+
+def _run_queued() -> None:
+    global _runner
+    try:
+        while True:
+            with _runner_lock:
+                try:
+                    job = _claim()
+                except Exception as ex:
+                    print(f"[poll_jobs] could not claim a job: {ex}")
+                    job = None
+                if job is None:
+                    _runner = None
+                    return
+            try:
+                _run(*job)
+            except Exception as ex:
+                # e.g. "database is locked" while recording the result: keep serving the queue
+                print(f"[poll_jobs] job {job[0]} failed: {ex}")
+                try:
+                    _finish(job[0], "failed", None, f"could not record result: {ex}")
+                except Exception:
+                    pass
+    finally:
+        # however the loop ends, a later kick() must be able to start a new runner
+        with _runner_lock:
+            if _runner is threading.current_thread():
+                _runner = None
+
+
+def _claim() -> Optional[tuple]:
+    with coordination.transaction() as conn:
+        row = conn.execute(
+            "SELECT id, sources FROM poll_jobs WHERE fetch_ids IS NULL AND status = 'queued' ORDER BY created_at LIMIT 1"
+        ).fetchone()
+        if row is None:
+            return None
+        conn.execute("UPDATE poll_jobs SET status = 'running', runner = ?, started_at = ? WHERE id = ?",
+                     (coordination.worker_id(), time.time(), row[0]))
+    return row[0], json.loads(row[1])
+
+
+def _run(job_id: str, sources: List[str]) -> None:
+    try:
+        result = asyncio.run(scheduler.poll(sources))
+    except Exception as ex:
+        _finish(job_id, "failed", None, str(ex))
+        return
+    _finish(job_id, "done", json.dumps(result, default=str), None)
+
+
+def _finish(job_id: str, status: str, result: Optional[str], error: Optional[str]) -> None:
+    # a no-op when the job was requeued from under us and claimed by another runner
+    with coordination.transaction() as conn:
+        conn.execute("UPDATE poll_jobs SET status = ?, result = ?, error = ?, finished_at = ? "
+                     "WHERE id = ? AND runner = ?",
+                     (status, result, error, time.time(), job_id, coordination.worker_id()))
+
+
+def _wait(job_id: str, interval: float = 0.2, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+    deadline = time.time() + (timeout if timeout is not None else _timeout())
+    while True:
+        job = get_job(job_id)
+        if job is None or job["status"] not in ("queued", "running"):
+            return job
+        if time.time() >= deadline:
+            break
+        time.sleep(interval)
+    with coordination.transaction() as conn:
+        conn.execute("UPDATE poll_jobs SET status = 'failed', finished_at = ?, error = 'timed out' "
+                     "WHERE id = ? AND status IN ('queued', 'running')", (time.time(), job_id))
+    return get_job(job_id)
+
+
+def get_job(job_id: str) -> Optional[Dict[str, Any]]:
+    rows = coordination.query(
+        "SELECT id, status, sources, fetch_ids, runner, created_at, started_at, finished_at, result, error "
+        "FROM poll_jobs WHERE id = ?", (job_id,)
+    )
+    if not rows:
+        return None
+    row = rows[0]
+    job = {"job_id": row[0], "status": row[1], "sources": json.loads(row[2]), "runner": row[4],
+           "created_at": row[5], "started_at": row[6], "finished_at": row[7],
+           "result": json.loads(row[8]) if row[8] else None, "error": row[9]}
+    if row[3] is not None:
+        job.update(_queue_status(json.loads(row[3])))
+    return job
+
+
+def _queue_status(fetch_ids: Dict[str, int]) -> Dict[str, Any]:
+    q = work_queue.get_queue()
+    fetches = {s: q.get(i) for s, i in fetch_ids.items()}
+    fetches = {s: f for s, f in fetches.items() if f}
+    # purged fetch jobs finished long ago
+    statuses = {f["status"] for f in fetches.values()} or {"done"}
+    if statuses <= {"done"}:
+        status = "done"
+    elif "failed" in statuses and statuses <= {"done", "failed"}:
+        status = "failed"
+    elif statuses & {"leased"} or "done" in statuses:
+        status = "running"
+    else:
+        status = "queued"
+    return {
+        "status": status,
+        "fetches": {s: {"id": f["id"], "status": f["status"], "result": f["result"], "error": f["error"]}
+                    for s, f in fetches.items()},
+    }
@@ -0,0 +1,157 @@
+"""
+Staged polling pipeline backed by the persistent work queue.
+
+    fetch (per source) -> normalize (per fetch) -> classify (AIStub, per fetch) -> draft (LLM, per thread)
+
+Each stage consumes jobs from `work_queue` and enqueues the next stage, so stages can run
+in separate worker processes with their own concurrency (see backend/app/worker.py).
+The changed threads of one fetch are classified in a single batch and, like the in-process
+poll, only the DRAFT_BUDGET_PER_POLL most urgent ones are drafted. Draft jobs are
+deduplicated per thread while pending.
+"""
+
+import os
+import asyncio
+import threading
+from typing import Optional, Dict, Any, List, Callable
+
+from backend.app.services import event_store, work_queue, adaptive_schedule
+from backend.app.services import scheduler
+
+STAGES = ("fetch", "normalize", "classify", "draft")
+
+def enqueue_poll(sources: Optional[List[str]] = None) -> Dict[str, int]:
+    """Queue one fetch per source. A source with a pending fetch joins it: its existing job id is returned."""
+    q = work_queue.get_queue()
+    return {s: q.enqueue("fetch", {"source": s}, dedup_key=s) for s in sources or scheduler.SOURCES}
+
+
+def handle_fetch(payload: Dict[str, Any]) -> Dict[str, Any]:
+    source = payload["source"]
+    try:
+        events = asyncio.run(scheduler.fetch_source(source))
+    except Exception:
+        adaptive_schedule.observe(source, 0, error=True)
+        raise
+    new = event_store.get_store().insert_events(source, events)
+    adaptive_schedule.observe(source, new)
+    threads = scheduler.group_by_thread(source, events)
+    if threads:
+        work_queue.get_queue().enqueue("normalize", {"source": source, "thread_ids": list(threads)})
+    return {"found": len(events), "new": new, "threads": len(threads)}
+
+
+def handle_normalize(payload: Dict[str, Any]) -> Dict[str, Any]:
+    source, tids = payload["source"], payload["thread_ids"]
+    store = event_store.get_store()
+    fps = store.get_fingerprints(source, tids)
+    changed, unchanged = [], 0
+    for tid in tids:
+        rows = store.get_thread(source, tid, last=5)
+        if not rows:
+            continue
+        fp = fps.get(tid)
+        last_key = event_store.event_key(rows[-1])
+        if fp and fp["last_event_id"] == last_key:
+            unchanged += 1
+            continue
+        state = scheduler.thread_state(rows)
+        h = scheduler.state_hash(state)
+        if fp and fp["state_hash"] == h:
+            store.set_fingerprint(source, tid, last_key, h)
+            unchanged += 1
+            continue
+        changed.append({"thread_id": tid, "state": state, "last_event_id": last_key, "state_hash": h})
+    if changed:
+        work_queue.get_queue().enqueue("classify", {"source": source, "threads": changed})
+    return {"changed": len(changed), "unchanged": unchanged}
+
+
+def handle_classify(payload: Dict[str, Any]) -> Dict[str, Any]:
+    source = payload["source"]
+    threads = [{**t, "source": source} for t in payload["threads"]]
+    preds = scheduler.classify_states([t["state"] for t in threads])
+    allowed = set(scheduler.draft_actions())
+    wanted: List[Dict[str, Any]] = []
+    skipped: Dict[str, int] = {}
+    for thread, pred in zip(threads, preds):
+        if pred["action"] in allowed:
+            wanted.append({**thread, **pred})
+        else:
+            skipped[pred["action"]] = skipped.get(pred["action"], 0) + 1
+            _remember(thread)
+    # most urgent, then most confident, first; deferred threads keep no fingerprint and are retried next poll
+    wanted.sort(key=lambda t: (scheduler.DRAFT_PRIORITY[t["action"]], -float(t.get("confidence", 0))))
+    picked = wanted[:scheduler.draft_budget()]
+    q = work_queue.get_queue()
+    for thread in picked:
+        # reply_urgent drafts are claimed before reply, reply before follow_up
+        priority = len(scheduler.DRAFT_PRIORITY) - scheduler.DRAFT_PRIORITY[thread["action"]]
+        q.enqueue("draft", thread, priority=priority, dedup_key=f"{source}:{thread['thread_id']}")
+    return {"classified": len(threads), "queued": len(picked), "skipped": skipped,
+            "deferred": len(wanted) - len(picked)}
+
+
+def handle_draft(payload: Dict[str, Any]) -> Dict[str, Any]:
+    draft = scheduler.draft_for_state(payload["source"], payload["state"])
+    _remember(payload)
+    scheduler.DRAFTED.inc(source=payload["source"])
+    scheduler.save_draft(payload["source"], payload["thread_id"], payload["state"], draft)
+    return {"thread_id": payload["thread_id"], **draft}
+
+
+def _remember(payload: Dict[str, Any]) -> None:
+    if payload.get("last_event_id") and payload.get("state_hash"):
+        event_store.get_store().set_fingerprint(payload["source"], payload["thread_id"],
+                                                payload["last_event_id"], payload["state_hash"])
+
+
+HANDLERS: Dict[str, Callable[[Dict[str, Any]], Dict[str, Any]]] = {
+    "fetch": handle_fetch,
+    "normalize": handle_normalize,
+    "classify": handle_classify,
+    "draft": handle_draft,
+}
+
+
+def run_stage(stage: str, owner: str, stop: threading.Event, idle_sleep: float = 1.0,
+              lease_seconds: float = 300) -> None:
+    """Claim and process `stage` jobs until `stop` is set."""
+    q = work_queue.get_queue()
+    handler = HANDLERS[stage]
+    while not stop.is_set():
+        job = q.claim(stage, owner, lease_seconds=lease_seconds)
+        if job is None:
+            stop.wait(idle_sleep)
+            continue
+        try:
+            done = q.ack(job["id"], owner, handler(job["payload"]))
+        except Exception as ex:
+            print(f"[worker:{stage}] job {job['id']} failed: {ex}")
+            done = q.fail(job["id"], owner, str(ex))
+        if not done:
+            print(f"[worker:{stage}] lost the lease on job {job['id']}; result dropped")
+
+
+def drain(stages: Optional[List[str]] = None, owner: str = "drain") -> int:
+    """Process every ready job in stage order in the calling thread (tests / one-shot runs)."""
+    q = work_queue.get_queue()
+    done = 0
+    progressed = True
+    while progressed:
+        progressed = False
+        for stage in stages or STAGES:
+            job = q.claim(stage, owner)
+            while job is not None:
+                try:
+                    q.ack(job["id"], owner, HANDLERS[stage](job["payload"]))
+                except Exception as ex:
+                    q.fail(job["id"], owner, str(ex))
+                done += 1
+                progressed = True
+                job = q.claim(stage, owner)
+    return done
+
+
+def poll_mode() -> str:
+    return os.getenv("POLL_MODE", "inprocess")
@@ -0,0 +1,99 @@
+"""
+Sampling profiler for the running API process.
+
+A background thread samples every thread's stack (`sys._current_frames`) at a fixed
+interval and aggregates them as folded stacks ("thread;outer;...;inner count"), the input
+format of flamegraph.pl, speedscope and inferno. Only one profile runs at a time.
+"""
+
+import sys
+import time
+import threading
+from collections import Counter
+from typing import Optional, Dict, Any
+
+_lock = threading.Lock()
+_active: Optional["SamplingProfiler"] = None
+
+
+class SamplingProfiler:
+    def __init__(self, interval: float = 0.01, max_depth: int = 64):
+        self.interval = interval
+        self.max_depth = max_depth
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.started_at: Optional[float] = None
+        self.stopped_at: Optional[float] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self.started_at = time.time()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.stopped_at = time.time()
+
+    def _run(self) -> None:
+        me = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                parts = []
+                while frame is not None and len(parts) < self.max_depth:
+                    code = frame.f_code
+                    parts.append(f"{code.co_name} ({code.co_filename.rsplit('/', 1)[-1]}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                parts.append(names.get(ident, str(ident)))
+                self.stacks[";".join(reversed(parts))] += 1
+            self.samples += 1
+
+    def folded(self) -> str:
+        return "".join(f"{stack} {n}\n" for stack, n in self.stacks.most_common())
+
+    def info(self) -> Dict[str, Any]:
+        end = self.stopped_at or time.time()
+        return {
+            "running": self.stopped_at is None,
+            "interval_ms": self.interval * 1000,
+            "samples": self.samples,
+            "seconds": round(end - (self.started_at or end), 2),
+            "unique_stacks": len(self.stacks),
+        }
+
+
+def start(interval_ms: float = 10) -> Dict[str, Any]:
+    global _active
+    with _lock:
+        if _active is not None and _active.stopped_at is None:
+            raise RuntimeError("a profile is already running")
+        _active = SamplingProfiler(interval=max(1.0, interval_ms) / 1000)
+        _active.start()
+        return _active.info()
+
+
+def stop() -> Optional[SamplingProfiler]:
+    """Stop the running profile and return it (None if none was started)."""
+    with _lock:
+        prof = _active
+    if prof is not None and prof.stopped_at is None:
+        prof.stop()
+    return prof
+
+
+def status() -> Optional[Dict[str, Any]]:
+    with _lock:
+        return _active.info() if _active is not None else None
+
+
+def profile_for(seconds: float, interval_ms: float = 10) -> SamplingProfiler:
+    """Profile the process for a fixed window (blocks the caller)."""
+    start(interval_ms)
+    time.sleep(seconds)
+    return stop()
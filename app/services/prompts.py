@@ -0,0 +1,101 @@
+"""
+Prompt building for LLM drafts.
+
+- The system message holds everything that does not change between calls (role, output
+  format), and the user message starts with the small per-call parameters and ends with
+  the state, so consecutive requests share the longest possible prefix (provider-side
+  prompt caching keys on it)
+- Tokens are counted locally: with `tiktoken` when it is installed, otherwise ~4 chars/token
+- `fit_state` trims state text to a token budget (LLM_STATE_TOKEN_BUDGET): thread states
+  drop their oldest messages first, anything else is cut in the middle
+"""
+
+import os
+import math
+from functools import lru_cache
+from typing import Optional, List, Dict
+
+try:
+    import tiktoken
+except ImportError:  # optional: fall back to a character estimate
+    tiktoken = None
+
+CHARS_PER_TOKEN = 4
+TRUNCATION_MARK = "\n...[{n} tokens truncated]...\n"
+
+
+@lru_cache(maxsize=16)
+def _encoding(model: Optional[str]):
+    if tiktoken is None:
+        return None
+    try:
+        return tiktoken.encoding_for_model(model or "gpt-4o-mini")
+    except Exception:
+        return tiktoken.get_encoding("cl100k_base")
+
+
+def count_tokens(text: str, model: Optional[str] = None) -> int:
+    if not text:
+        return 0
+    enc = _encoding(model)
+    if enc is None:
+        return math.ceil(len(text) / CHARS_PER_TOKEN)
+    return len(enc.encode(text, disallowed_special=()))
+
+
+def count_message_tokens(messages: List[Dict[str, str]], model: Optional[str] = None) -> int:
+    # ~4 tokens of framing per chat message
+    return sum(count_tokens(m.get("content", ""), model) + 4 for m in messages) + 2
+
+
+def state_budget() -> int:
+    return int(os.getenv("LLM_STATE_TOKEN_BUDGET", "3000"))
+
+
+def _cut_middle(text: str, budget: int, model: Optional[str]) -> str:
+    """Keep the first third and the last two thirds of the budget (instructions usually come last)."""
+    total = count_tokens(text, model)
+    if total <= budget:
+        return text
+    budget = max(0, budget - count_tokens(TRUNCATION_MARK.format(n=total), model))
+    enc = _encoding(model)
+    head_n, tail_n = budget // 3, budget - budget // 3
+    if enc is None:
+        head = text[:head_n * CHARS_PER_TOKEN]
+        tail = text[len(text) - tail_n * CHARS_PER_TOKEN:] if tail_n else ""
+    else:
+        ids = enc.encode(text, disallowed_special=())
+        head = enc.decode(ids[:head_n])
+        tail = enc.decode(ids[len(ids) - tail_n:]) if tail_n else ""
+    return head + TRUNCATION_MARK.format(n=total - budget) + tail
+
+
+def fit_state(state: str, budget: Optional[int] = None, model: Optional[str] = None) -> str:
+    """Trim `state` to at most ~`budget` tokens."""
+    budget = budget or state_budget()
+    if count_tokens(state, model) <= budget:
+        return state
+    lines = state.splitlines()
+    if len(lines) > 2 and lines[0].startswith("[Thread:"):
+        # build_state output: header line, then one line per message, oldest first
+        header, msgs = lines[0], lines[1:]
+        dropped = 0
+        def _joined() -> str:
+            note = f" ({dropped} older message(s) omitted)" if dropped else ""
+            return "\n".join([header + note, *msgs])
+        while len(msgs) > 1 and count_tokens(_joined(), model) > budget:
+            msgs.pop(0)
+            dropped += 1
+        state = _joined()
+        if count_tokens(state, model) <= budget:
+            return state
+    return _cut_middle(state, budget, model)
+
+
+def build_messages(system: str, params: str, state: str, budget: Optional[int] = None,
+                   model: Optional[str] = None) -> List[Dict[str, str]]:
+    """[system, user] with the stable text first and the (budgeted) state last."""
+    return [
+        {"role": "system", "content": system},
+        {"role": "user", "content": f"{params}\n\nSTATE:\n{fit_state(state, budget, model)}"},
+    ]
@@ -0,0 +1,235 @@
+"""
+Persistent bare-mirror cache for remote git repositories.
+
+- One ``git clone --mirror`` per repo under ``storage/mirrors``; later uses run an
+  incremental ``git fetch`` (throttled by REPO_MIRROR_FETCH_TTL seconds)
+- File reads go through a long-lived ``git cat-file --batch`` process per mirror
+- Tree listings come from ``git ls-tree`` in the same shape as GitHub's trees API
+- Mirrors are evicted least-recently-used first once the cache exceeds REPO_MIRROR_MAX_MB;
+  sizes are measured after a clone/fetch (the only time they change), so reads never walk the
+  cache, and a mirror with a read in progress is never evicted
+"""
+
+import os
+import re
+import time
+import shutil
+import hashlib
+import threading
+import contextlib
+import subprocess
+from pathlib import Path
+from typing import Optional, Dict, Any, List, Tuple, Iterator
+
+BACKEND_ROOT = Path(__file__).resolve().parents[2]
+DEFAULT_ROOT = BACKEND_ROOT / "storage" / "mirrors"
+
+_LAST_USED = ".shadowshift-last-used"
+
+
+def _git(args: List[str], cwd: Optional[Path] = None, timeout: float = 300) -> str:
+    res = subprocess.run(["git", *args], cwd=cwd, capture_output=True, text=True, timeout=timeout)
+    if res.returncode != 0:
+        raise RuntimeError(f"git {' '.join(args)} failed: {res.stderr.strip()}")
+    return res.stdout
+
+
+def _dir_size(path: Path) -> int:
+    total = 0
+    for dirpath, _, files in os.walk(path):
+        for f in files:
+            try:
+                total += os.lstat(os.path.join(dirpath, f)).st_size
+            except OSError:
+                pass
+    return total
+
+
+class _CatFile:
+    """Wraps `git cat-file --batch` so many blob reads share one process."""
+
+    def __init__(self, git_dir: Path):
+        self.proc = subprocess.Popen(
+            ["git", "cat-file", "--batch"], cwd=git_dir,
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+        )
+
+    def read(self, spec: str) -> Optional[Tuple[str, bytes]]:
+        self.proc.stdin.write(spec.encode("utf-8") + b"\n")
+        self.proc.stdin.flush()
+        header = self.proc.stdout.readline().decode("utf-8", errors="replace").rstrip("\n")
+        if not header or header.endswith(" missing") or header.endswith(" ambiguous"):
+            return None
+        sha, _, size = header.split(" ")
+        data = self.proc.stdout.read(int(size))
+        self.proc.stdout.read(1)  # trailing newline
+        return sha, data
+
+    def close(self):
+        try:
+            self.proc.stdin.close()
+            self.proc.wait(timeout=5)
+        except Exception:
+            self.proc.kill()
+
+
+class MirrorCache:
+    def __init__(self, root: Optional[Path] = None, max_bytes: Optional[int] = None, fetch_ttl: Optional[float] = None):
+        self.root = Path(root or os.getenv("REPO_MIRROR_DIR") or DEFAULT_ROOT)
+        self.max_bytes = max_bytes if max_bytes is not None else int(os.getenv("REPO_MIRROR_MAX_MB", "2048")) * 1024 * 1024
+        self.fetch_ttl = fetch_ttl if fetch_ttl is not None else float(os.getenv("REPO_MIRROR_FETCH_TTL", "60"))
+        self._lock = threading.Lock()
+        self._repo_locks: Dict[str, threading.Lock] = {}
+        self._cat: Dict[str, _CatFile] = {}
+        self._fetched_at: Dict[str, float] = {}
+        self._sizes: Dict[str, int] = {}
+        self._in_use: Dict[str, int] = {}
+
+    # ---- paths / bookkeeping ----
+    def mirror_path(self, repo_url: str) -> Path:
+        slug = re.sub(r"[^A-Za-z0-9._-]+", "_", repo_url.rstrip("/").split("/")[-1].removesuffix(".git"))[:40]
+        digest = hashlib.sha1(repo_url.encode("utf-8")).hexdigest()[:12]
+        return self.root / f"{slug}-{digest}.git"
+
+    def _repo_lock(self, key: str) -> threading.Lock:
+        with self._lock:
+            return self._repo_locks.setdefault(key, threading.Lock())
+
+    def _touch(self, path: Path) -> None:
+        (path / _LAST_USED).write_text(str(time.time()))
+
+    def _last_used(self, path: Path) -> float:
+        try:
+            return float((path / _LAST_USED).read_text())
+        except Exception:
+            return 0.0
+
+    @contextlib.contextmanager
+    def _using(self, key: str) -> Iterator[None]:
+        with self._lock:
+            self._in_use[key] = self._in_use.get(key, 0) + 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._in_use[key] -= 1
+                if not self._in_use[key]:
+                    del self._in_use[key]
+
+    def _drop_cat(self, key: str) -> None:
+        cat = self._cat.pop(key, None)
+        if cat is not None:
+            cat.close()
+
+    # ---- sync ----
+    def ensure(self, repo_url: str, force_fetch: bool = False) -> Path:
+        """Clone the mirror on first use, otherwise fetch if older than the TTL."""
+        path = self.mirror_path(repo_url)
+        key = str(path)
+        synced = False
+        with self._repo_lock(key):
+            if not (path / "HEAD").exists():
+                self.root.mkdir(parents=True, exist_ok=True)
+                shutil.rmtree(path, ignore_errors=True)
+                _git(["clone", "--mirror", "--quiet", repo_url, str(path)])
+                synced = True
+            elif force_fetch or time.time() - self._fetched_at.get(key, 0) >= self.fetch_ttl:
+                _git(["fetch", "--prune", "--quiet", "origin"], cwd=path)
+                self._drop_cat(key)  # pick up new packs
+                synced = True
+            if synced:
+                self._fetched_at[key] = time.time()
+                self._sizes[key] = _dir_size(path)
+            self._touch(path)
+        if synced:
+            self.evict(keep=path)
+        return path
+
+    def evict(self, keep: Optional[Path] = None) -> List[str]:
+        """Delete least-recently-used mirrors not in use until the cache fits in max_bytes."""
+        if not self.root.exists():
+            return []
+        mirrors = [p for p in self.root.iterdir() if p.is_dir()]
+        for p in mirrors:
+            if str(p) not in self._sizes:
+                # left by an earlier process: measured once
+                self._sizes[str(p)] = _dir_size(p)
+        total = sum(self._sizes[str(p)] for p in mirrors)
+        removed: List[str] = []
+        for p in sorted(mirrors, key=self._last_used):
+            if total <= self.max_bytes:
+                break
+            key = str(p)
+            if keep is not None and p == keep:
+                continue
+            with self._repo_lock(key):
+                with self._lock:
+                    if self._in_use.get(key):
+                        continue
+                self._drop_cat(key)
+                shutil.rmtree(p, ignore_errors=True)
+                self._fetched_at.pop(key, None)
+                total -= self._sizes.pop(key, 0)
+            removed.append(p.name)
+        return removed
+
+    # ---- reads ----
+    def read_file(self, repo_url: str, file_path: str, ref: Optional[str] = None) -> Dict[str, Any]:
+        spec = f"{ref or 'HEAD'}:{file_path.lstrip('/')}"
+        with self._using(str(self.mirror_path(repo_url))):
+            path = self.ensure(repo_url)
+            found = self._cat_read(path, spec)
+            if found is None:
+                # ref or file may be newer than our last fetch
+                path = self.ensure(repo_url, force_fetch=True)
+                found = self._cat_read(path, spec)
+        if found is None:
+            raise FileNotFoundError(f"{file_path} not found in {repo_url} ref={ref}")
+        sha, data = found
+        return {"path": file_path, "content": data.decode("utf-8", errors="ignore"), "sha": sha, "raw": None}
+
+    def _cat_read(self, path: Path, spec: str) -> Optional[Tuple[str, bytes]]:
+        key = str(path)
+        with self._repo_lock(key):
+            cat = self._cat.get(key)
+            if cat is None or cat.proc.poll() is not None:
+                cat = self._cat[key] = _CatFile(path)
+            return cat.read(spec)
+
+    def list_tree(self, repo_url: str, ref: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Recursive tree listing shaped like GitHub's `git/trees/{ref}?recursive=1` entries."""
+        ref = ref or "HEAD"
+        with self._using(str(self.mirror_path(repo_url))):
+            path = self.ensure(repo_url)
+            try:
+                out = _git(["ls-tree", "-r", "-t", "-l", "-z", ref], cwd=path)
+            except RuntimeError:
+                path = self.ensure(repo_url, force_fetch=True)
+                out = _git(["ls-tree", "-r", "-t", "-l", "-z", ref], cwd=path)
+        tree: List[Dict[str, Any]] = []
+        for entry in out.split("\0"):
+            if not entry:
+                continue
+            meta, name = entry.split("\t", 1)
+            mode, typ, sha, size = meta.split()
+            item: Dict[str, Any] = {"path": name, "mode": mode, "type": typ, "sha": sha}
+            if size != "-":
+                item["size"] = int(size)
+            tree.append(item)
+        return tree
+
+    def close(self) -> None:
+        with self._lock:
+            keys = list(self._cat)
+        for k in keys:
+            self._drop_cat(k)
+
+
+_cache: Optional[MirrorCache] = None
+
+
+def get_cache() -> MirrorCache:
+    global _cache
+    if _cache is None:
+        _cache = MirrorCache()
+    return _cache
@@ -0,0 +1,255 @@
+"""
+Shared resilience helpers for outbound provider calls (Gmail, Discord, GitHub, LLM).
+
+- `CircuitBreaker`: per-provider breaker; after `failure_threshold` consecutive failures
+  calls fail fast for `reset_timeout` seconds, then one trial call decides whether to close
+- `deadline(seconds)`: sets a deadline for the current context; `timeout(default)` caps
+  HTTP timeouts to the time left, and `check_deadline()` stops retry loops that ran out
+- `backoff(attempt)`: exponential backoff with full jitter
+- `hedged(fn)`: starts a second copy of a slow call and returns whichever finishes first
+"""
+
+import os
+import time
+import random
+import threading
+import contextvars
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, Future, FIRST_COMPLETED, wait
+from typing import Optional, Dict, Any, Callable, TypeVar, Tuple, Type
+
+T = TypeVar("T")
+
+
+class CircuitOpenError(RuntimeError):
+    pass
+
+
+class DeadlineExceeded(TimeoutError):
+    pass
+
+
+class CircuitBreaker:
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._state = "closed"
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_running = False
+        self.stats = {"successes": 0, "failures": 0, "rejected": 0, "opened": 0}
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self) -> str:
+        if self._state == "open" and time.monotonic() - self._opened_at >= self.reset_timeout:
+            self._state = "half_open"
+            self._trial_running = False
+        return self._state
+
+    def allow(self) -> bool:
+        """May a call go through now? In half-open state only one trial call is let through."""
+        with self._lock:
+            state = self._current_state()
+            if state == "closed":
+                return True
+            if state == "half_open" and not self._trial_running:
+                self._trial_running = True
+                return True
+            self.stats["rejected"] += 1
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.stats["successes"] += 1
+            self._failures = 0
+            self._state = "closed"
+            self._trial_running = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.stats["failures"] += 1
+            self._failures += 1
+            if self._state == "half_open" or self._failures >= self.failure_threshold:
+                if self._state != "open":
+                    self.stats["opened"] += 1
+                self._state = "open"
+                self._opened_at = time.monotonic()
+                self._trial_running = False
+
+    def call(self, fn: Callable[..., T], *args, **kwargs) -> T:
+        if not self.allow():
+            raise CircuitOpenError(f"circuit '{self.name}' is open")
+        try:
+            result = fn(*args, **kwargs)
+        except Exception:
+            self.record_failure()
+            raise
+        self.record_success()
+        return result
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            state = self._current_state()
+            retry_in = max(0.0, self.reset_timeout - (time.monotonic() - self._opened_at)) if state == "open" else 0.0
+            return {"state": state, "consecutive_failures": self._failures, "retry_in": round(retry_in, 1), **self.stats}
+
+
+_BREAKERS: Dict[str, CircuitBreaker] = {}
+_BREAKERS_LOCK = threading.Lock()
+
+
+def get_breaker(name: str) -> CircuitBreaker:
+    """Breaker for one provider; BREAKER_FAILURES / BREAKER_RESET_SECONDS set the thresholds."""
+    with _BREAKERS_LOCK:
+        br = _BREAKERS.get(name)
+        if br is None:
+            br = _BREAKERS[name] = CircuitBreaker(
+                name,
+                failure_threshold=int(os.getenv("BREAKER_FAILURES", "5")),
+                reset_timeout=float(os.getenv("BREAKER_RESET_SECONDS", "30")),
+            )
+        return br
+
+
+def breakers_snapshot() -> Dict[str, Dict[str, Any]]:
+    with _BREAKERS_LOCK:
+        breakers = list(_BREAKERS.values())
+    return {b.name: b.snapshot() for b in breakers}
+
+
+# ---- deadlines ----
+_DEADLINE: contextvars.ContextVar = contextvars.ContextVar("deadline", default=None)
+
+
+@contextmanager
+def deadline(seconds: Optional[float]):
+    """Deadline for everything run in this context; an outer, earlier deadline wins."""
+    if seconds is None:
+        yield
+        return
+    new = time.monotonic() + seconds
+    current = _DEADLINE.get()
+    token = _DEADLINE.set(new if current is None else min(current, new))
+    try:
+        yield
+    finally:
+        _DEADLINE.reset(token)
+
+
+def remaining() -> Optional[float]:
+    d = _DEADLINE.get()
+    return None if d is None else d - time.monotonic()
+
+
+def check_deadline() -> None:
+    left = remaining()
+    if left is not None and left <= 0:
+        raise DeadlineExceeded("deadline exceeded")
+
+
+def timeout(default: float) -> float:
+    """`default`, capped to the time left before the deadline."""
+    left = remaining()
+    if left is None:
+        return default
+    if left <= 0:
+        raise DeadlineExceeded("deadline exceeded")
+    return min(default, left)
+
+
+def submit(pool: ThreadPoolExecutor, fn: Callable[..., T], *args, **kwargs) -> "Future[T]":
+    """`pool.submit` that carries the caller's deadline into the worker thread."""
+    ctx = contextvars.copy_context()
+    return pool.submit(ctx.run, fn, *args, **kwargs)
+
+
+# ---- retries ----
+def backoff(attempt: int, base: float = 0.5, cap: float = 8.0) -> float:
+    """Full-jitter exponential backoff for retry number `attempt` (1-based)."""
+    return random.uniform(0, min(cap, base * (2 ** (attempt - 1))))
+
+
+def sleep_backoff(attempt: int, base: float = 0.5, cap: float = 8.0) -> None:
+    """Sleep before the next retry, never past the deadline."""
+    delay = backoff(attempt, base, cap)
+    left = remaining()
+    if left is not None and left <= delay:
+        raise DeadlineExceeded("deadline exceeded before retry")
+    time.sleep(delay)
+
+
+def retry(fn: Callable[[], T], retries: int = 2, base: float = 0.5, cap: float = 8.0,
+          retry_on: Tuple[Type[BaseException], ...] = (Exception,)) -> T:
+    attempt = 0
+    while True:
+        attempt += 1
+        check_deadline()
+        try:
+            return fn()
+        except CircuitOpenError:
+            raise
+        except retry_on:
+            if attempt > retries:
+                raise
+            sleep_backoff(attempt, base, cap)
+
+
+# ---- hedging ----
+_HEDGE_POOL = ThreadPoolExecutor(max_workers=int(os.getenv("HEDGE_POOL_SIZE", "16")), thread_name_prefix="hedge")
+_HEDGE_STATS = {"calls": 0, "hedged": 0, "hedge_won": 0}
+_HEDGE_LOCK = threading.Lock()
+
+
+def _hedge_count(key: str) -> None:
+    with _HEDGE_LOCK:
+        _HEDGE_STATS[key] += 1
+
+
+def hedge_stats() -> Dict[str, int]:
+    with _HEDGE_LOCK:
+        return dict(_HEDGE_STATS)
+
+
+def hedged(fn: Callable[[], T], hedge_after: float, max_hedges: int = 1) -> T:
+    """
+    Run `fn`; if it has not finished after `hedge_after` seconds start another copy (up to
+    `max_hedges` extra copies). The first successful result wins; the others finish in the
+    background and are ignored.
+    """
+    _hedge_count("calls")
+    pending: Dict[Future, int] = {submit(_HEDGE_POOL, fn): 0}
+    started = 1
+    last_error: Optional[BaseException] = None
+    while pending:
+        can_hedge = started <= max_hedges
+        left = remaining()
+        wait_for = hedge_after if can_hedge else left
+        if left is not None and wait_for is not None:
+            wait_for = max(0.0, min(wait_for, left))
+        done, _ = wait(list(pending), timeout=wait_for, return_when=FIRST_COMPLETED)
+        if not done:
+            left = remaining()
+            if left is not None and left <= 0:
+                raise DeadlineExceeded("deadline exceeded waiting for hedged call")
+            _hedge_count("hedged")
+            pending[submit(_HEDGE_POOL, fn)] = started
+            started += 1
+            continue
+        for f in done:
+            copy = pending.pop(f)
+            if f.exception() is None:
+                if copy > 0:
+                    _hedge_count("hedge_won")
+                return f.result()
+            last_error = f.exception()
+        if not pending and started <= max_hedges:
+            # every copy failed fast: use a remaining hedge slot as a retry
+            pending[submit(_HEDGE_POOL, fn)] = started
+            started += 1
+    raise last_error
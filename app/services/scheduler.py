@@ -1,22 +1,58 @@
-import os, asyncio, time
-from typing import Dict, Any, List, Tuple
+import os, asyncio, time, atexit, heapq, threading, hashlib
+from pathlib import Path
+from typing import Dict, Any, List, Tuple, Optional
 from datetime import datetime
-import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
 
-from backend.app.services import gmail_services, github_services
+from backend.app.services import gmail_services, discord_services, github_services, github_client, github_graphql, event_store, coordination, adaptive_schedule, resilience, metrics, tracing
 from backend.app.services.llm import draft_email_from_state, draft_message_from_state
 from backend.app.pipelines.build_dataset_fast import build_state
 
 _LAST_STATS: Dict[str, Any] = {
     "started_at": None, "finished_at": None,
     "gmail_found": 0, "discord_found": 0, "github_found": 0,
-    "drafted": 0, "errors": [],
+    "gmail_new": 0, "discord_new": 0, "github_new": 0,
+    "drafted": 0, "skipped_by_action": {}, "unchanged_skipped": 0, "deferred": 0, "errors": [],
 }
-_LAST_EVENTS: Dict[str, List[Dict[str, Any]]] = {"gmail": [], "discord": [], "github": []}
+SOURCES = ("gmail", "discord", "github")
+FETCH_SECONDS = metrics.histogram("shadowshift_fetch_seconds", "Source fetch duration", ("source", "outcome"))
+DRAFTED = metrics.counter("shadowshift_drafted_threads_total", "Threads drafted by the poller", ("source",))
+ERRORS = metrics.counter("shadowshift_errors_total", "Errors by component", ("component",))
+MODEL_PATH = Path(__file__).resolve().parents[2] / "storage" / "ai_stub.joblib"
+# lower rank drafts first; actions missing here are not drafted by the poller
+DRAFT_PRIORITY = {"reply_urgent": 0, "reply": 1, "follow_up": 2}
+_MODEL = None
+_MODEL_LOCK = threading.Lock()
+_LAST_COMPACTED = 0.0
+_LEASE: Optional[coordination.LeaderLease] = None
 
-def get_poll_stats() -> Dict[str, Any]: return dict(_LAST_STATS)
-def get_last_events() -> Dict[str, List[Dict[str, Any]]]:
-    return {k: list(v) for k, v in _LAST_EVENTS.items()}
+def _collect_stats() -> Dict[str, Any]:
+    return {**_LAST_STATS,
+            "github_rate_limit": github_client.get_rate_limit_stats(),
+            "github_repos": github_services.get_repo_stats(),
+            "github_graphql_rate_limit": github_graphql.get_last_rate_limit(),
+            "intervals": adaptive_schedule.snapshot()}
+def is_poller() -> bool:
+    # no lease when the built-in scheduler is not running (tests, one-shot scripts): poll here
+    return _LEASE is None or _LEASE.is_leader
+def holds_poller_lease() -> bool:
+    return _LEASE is not None and _LEASE.is_leader
+def get_poll_stats() -> Dict[str, Any]:
+    # followers serve the stats the leader published after its last poll
+    stats = None
+    if _LEASE is not None and not _LEASE.is_leader:
+        stats = coordination.read("poll_stats")
+    stats = stats or _collect_stats()
+    stats["leader"] = _LEASE.info() if _LEASE is not None else None
+    if os.getenv("POLL_MODE", "inprocess") == "worker":
+        from backend.app.services import work_queue
+        stats["queue"] = work_queue.get_queue().stats()
+    return stats
+def get_thread_events(source: str, thread_id: str, last: int = None) -> List[Dict[str, Any]]:
+    return event_store.get_store().get_thread(source, thread_id, last=last)
+def get_inbox_page(source: str = None, since: str = None, cursor: str = None, limit: int = 50) -> Dict[str, Any]:
+    events, next_cursor = event_store.get_store().page(source=source, since=since, cursor=cursor, limit=limit)
+    return {"events": events, "next_cursor": next_cursor}
 
 async def fetch_new_gmail() -> List[Dict]:
     try:
@@ -36,7 +72,7 @@ async def fetch_new_gmail() -> List[Dict]:
         return events
     except Exception as ex:
         print("[poll:gmail] error", ex)
-        return []
+        raise
 
 async def fetch_new_discord() -> List[Dict]:
     import aiohttp
@@ -45,12 +81,15 @@ async def fetch_new_discord() -> List[Dict]:
     headers = {"Authorization": f"Bot {token}", "Content-Type": "application/json"}
     channel_ids = [x.strip() for x in channel_ids_raw.split(",") if x.strip()]
     out: List[Dict] = []
+    failed = 0
     async with aiohttp.ClientSession(headers=headers) as session:
         for cid in channel_ids:
-            url = f"https://discord.com/api/v10/channels/{cid}/messages?limit=20"
+            url = f"{discord_services.DISCORD_API_BASE}/channels/{cid}/messages?limit=20"
             try:
-                async with session.get(url) as r:
+                # capped to the fetch deadline, like the requests-based fetchers
+                async with session.get(url, timeout=aiohttp.ClientTimeout(total=resilience.timeout(20))) as r:
                     if r.status != 200:
+                        failed += 1
                         print("[poll:discord]", cid, r.status, await r.text()); continue
                     for m in await r.json():
                         out.append({
@@ -62,70 +101,276 @@ async def fetch_new_discord() -> List[Dict]:
                             "source": "discord",
                         })
             except Exception as ex:
+                failed += 1
                 print("[poll:discord] error", cid, ex)
+    if channel_ids and failed == len(channel_ids):
+        raise RuntimeError(f"all {failed} discord channel fetches failed")
     return out
 
 async def fetch_new_github() -> List[Dict]:
-    try: return github_services.fetch_recent_commits(limit_per_repo=30)
+    try:
+        if os.getenv("GITHUB_USE_GRAPHQL") == "1":
+            return github_graphql.fetch_recent_activity()
+        return github_services.fetch_recent_commits(limit_per_repo=30)
     except Exception as ex:
-        print("[poll:github] error", ex); return []
+        print("[poll:github] error", ex); raise
+
+@tracing.traced("thread_state")
+def thread_state(rows: List[Dict]) -> str:
+    import pandas as pd
+    df = pd.DataFrame(rows)
+    if "ts" not in df.columns and "timestamp" in df.columns:
+        df["ts"] = pd.to_datetime(df["timestamp"], errors="coerce", utc=True)
+        df["ts"] = df["ts"].fillna(pd.Timestamp.utcnow())
+    if "actor" not in df.columns:
+        df["actor"] = df.get("author") or "other"
+    if "text" not in df.columns:
+        df["text"] = df.get("snippet") or ""
+    df = df.sort_values("ts").reset_index(drop=True)
+    return build_state(df, N=5)
+
+def draft_max_words() -> int:
+    # same default as /draft/from-thread so poller drafts can be served there as-is
+    return int(os.getenv("DRAFT_MAX_WORDS", "180"))
+
+@tracing.traced("draft")
+def draft_for_state(source: str, state: str, max_words: Optional[int] = None,
+                    model: Optional[str] = None) -> Dict[str, Any]:
+    max_words = max_words or draft_max_words()
+    if source == "gmail":
+        return draft_email_from_state(state=state, recipient=None, max_words=max_words, model=model)
+    return draft_message_from_state(state=state, platform=source, max_words=max_words, model=model)
 
-async def _draft_for_events(source: str, events: List[Dict]) -> Tuple[int, List[str]]:
-    errs, drafted = [], 0
-    if not events: return 0, errs
+def save_draft(source: str, thread_id: str, state: str, draft: Dict[str, Any],
+               max_words: Optional[int] = None) -> None:
+    event_store.get_store().save_draft(source, thread_id, state_hash(state), draft, max_words or draft_max_words())
+
+def cached_draft(source: str, thread_id: str, state: str, max_words: Optional[int] = None,
+                 model: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """A stored draft built from exactly this thread state (and model / length, when given)."""
+    d = event_store.get_store().get_draft(source, thread_id)
+    if d is None or d["state_hash"] != state_hash(state):
+        return None
+    if d["max_words"] != (max_words or draft_max_words()):
+        return None
+    if model and d.get("model") != model:
+        return None
+    return d
+
+def group_by_thread(source: str, events: List[Dict]) -> Dict[str, List[Dict]]:
     by_thread: Dict[str, List[Dict]] = {}
     for e in events:
         tid = e.get("thread_id") or f"{source}-{e.get('id','oneoff')}"
-        by_thread.setdefault(tid, []).append(e)
-    for tid, rows in by_thread.items():
+        by_thread.setdefault(str(tid), []).append(e)
+    return by_thread
+
+def last_event_key(rows: List[Dict]) -> str:
+    last = max(rows, key=lambda e: event_store.to_epoch(e.get("timestamp")))
+    return event_store.event_key(last)
+
+def state_hash(state: str) -> str:
+    return hashlib.sha1(state.encode("utf-8")).hexdigest()
+
+def set_model(model) -> None:
+    """Share an already-loaded AIStub (the API loads one at startup)."""
+    global _MODEL
+    _MODEL = model
+
+def get_model():
+    global _MODEL
+    if _MODEL is None and MODEL_PATH.exists():
+        with _MODEL_LOCK:
+            if _MODEL is None:
+                from backend.app.models.ai_stub import AIStub
+                _MODEL = AIStub.load(MODEL_PATH)
+    return _MODEL
+
+@tracing.traced("classify")
+def classify_states(states: List[str]) -> List[Dict[str, Any]]:
+    model = get_model()
+    if model is None or not states:
+        return [{"action": "reply", "confidence": 0.5} for _ in states]
+    return model.batch_predict(states)
+
+def draft_actions() -> List[str]:
+    raw = os.getenv("DRAFT_ACTIONS", ",".join(DRAFT_PRIORITY))
+    return [a.strip() for a in raw.split(",") if a.strip() in DRAFT_PRIORITY]
+
+def draft_budget() -> int:
+    return int(os.getenv("DRAFT_BUDGET_PER_POLL", "20"))
+
+async def _draft_prioritized(fetched: Dict[str, List[Dict]]) -> Dict[str, Any]:
+    """Classify every fetched thread in one batch, then draft the most urgent ones within the LLM budget."""
+    budget = draft_budget()
+    allowed = set(draft_actions())
+    skip_unchanged = os.getenv("POLL_SKIP_UNCHANGED", "1") == "1"
+    store = event_store.get_store()
+    out: Dict[str, Any] = {"drafted": 0, "skipped": {}, "unchanged": 0, "deferred": 0, "errors": []}
+    # (source, thread_id, state, last_event_key, state_hash)
+    threads: List[Tuple[str, str, str, str, str]] = []
+    for source, events in fetched.items():
+        groups = group_by_thread(source, events)
+        fps: Dict[str, Dict[str, str]] = {}
+        if skip_unchanged and groups:
+            try: fps = store.get_fingerprints(source, groups.keys())
+            except Exception as ex: out["errors"].append(f"fingerprints:{ex}")
+        for tid, rows in groups.items():
+            fp = fps.get(tid)
+            try:
+                # the stored tail, not just this poll's rows: /draft/from-thread looks drafts up by its
+                # state and the worker pipeline fingerprints it, so both modes agree on what changed
+                stored = store.get_thread(source, tid, last=5)
+                last_key = event_store.event_key(stored[-1]) if stored else last_event_key(rows)
+                if fp and fp["last_event_id"] == last_key:
+                    out["unchanged"] += 1
+                    continue
+                state = thread_state(stored or rows)
+                h = state_hash(state)
+                if fp and fp["state_hash"] == h:
+                    out["unchanged"] += 1
+                    store.set_fingerprint(source, tid, last_key, h)
+                    continue
+                threads.append((source, tid, state, last_key, h))
+            except Exception as ex:
+                out["errors"].append(f"{source}:{tid}:{ex}")
+    try:
+        preds = classify_states([t[2] for t in threads])
+    except Exception as ex:
+        out["errors"].append(f"classify:{ex}")
+        preds = [{"action": "reply", "confidence": 0.5} for _ in threads]
+
+    def _remember(i: int) -> None:
+        # only threads that were fully handled; deferred/failed ones are retried next poll
+        source, tid, _, last_key, h = threads[i]
+        try: store.set_fingerprint(source, tid, last_key, h)
+        except Exception as ex: out["errors"].append(f"fingerprints:{ex}")
+
+    heap: List[Tuple[int, float, int]] = []
+    for i, pred in enumerate(preds):
+        action = pred.get("action")
+        if action not in allowed:
+            out["skipped"][action] = out["skipped"].get(action, 0) + 1
+            _remember(i)
+            continue
+        heapq.heappush(heap, (DRAFT_PRIORITY[action], -float(pred.get("confidence", 0)), i))
+
+    picked = [heapq.heappop(heap)[2] for _ in range(min(budget, len(heap)))]
+    out["deferred"] = len(heap)
+    # DRAFT_CONCURRENCY > 1 lets a batching backend (LLM_BACKEND=local) draft several threads in one pass;
+    # drafts are still submitted in priority order
+    with ThreadPoolExecutor(max_workers=max(1, int(os.getenv("DRAFT_CONCURRENCY", "1")))) as pool:
+        futures = [(i, resilience.submit(pool, draft_for_state, threads[i][0], threads[i][2])) for i in picked]
+        for i, fut in futures:
+            source, tid, state = threads[i][:3]
+            try:
+                draft = fut.result()
+                out["drafted"] += 1
+                DRAFTED.inc(source=source)
+                _remember(i)
+                save_draft(source, tid, state, draft)
+            except Exception as ex:
+                ERRORS.inc(component="draft")
+                out["errors"].append(f"{source}:{tid}:{ex}")
+    return out
+
+FETCHERS = {"gmail": fetch_new_gmail, "discord": fetch_new_discord, "github": fetch_new_github}
+
+async def fetch_source(source: str) -> List[Dict]:
+    """Run one fetcher behind its provider's circuit breaker and a POLL_FETCH_DEADLINE_SECONDS deadline."""
+    breaker = resilience.get_breaker(source)
+    if not breaker.allow():
+        FETCH_SECONDS.observe(0.0, source=source, outcome="circuit_open")
+        raise resilience.CircuitOpenError(f"circuit '{source}' is open")
+    started = time.perf_counter()
+    try:
+        with tracing.span("fetch", source=source), \
+                resilience.deadline(float(os.getenv("POLL_FETCH_DEADLINE_SECONDS", "60"))):
+            events = await FETCHERS[source]()
+    except Exception:
+        FETCH_SECONDS.observe(time.perf_counter() - started, source=source, outcome="error")
+        ERRORS.inc(component=f"fetch:{source}")
+        breaker.record_failure()
+        raise
+    FETCH_SECONDS.observe(time.perf_counter() - started, source=source, outcome="ok")
+    breaker.record_success()
+    return events
+
+def _store_events(by_source: Dict[str, List[Dict]]) -> None:
+    global _LAST_COMPACTED
+    try:
+        store = event_store.get_store()
+        for source, events in by_source.items():
+            _LAST_STATS[f"{source}_new"] = store.insert_events(source, events)
+        if time.time() - _LAST_COMPACTED > 3600:
+            store.compact()
+            _LAST_COMPACTED = time.time()
+    except Exception as ex:
+        _LAST_STATS["errors"].append(f"event_store:{ex}")
+
+async def poll(sources: Optional[List[str]] = None) -> Dict[str, Any]:
+    with tracing.span("poll", sources=",".join(sources or SOURCES)):
+        return await _poll(sources)
+
+async def _poll(sources: Optional[List[str]] = None) -> Dict[str, Any]:
+    sources = [s for s in (sources or SOURCES) if s in FETCHERS]
+    _LAST_STATS.update(started_at=time.strftime("%Y-%m-%d %H:%M:%S"), drafted=0, errors=[],
+                       skipped_by_action={}, unchanged_skipped=0, deferred=0,
+                       **{f"{s}_found": 0 for s in sources}, **{f"{s}_new": 0 for s in sources})
+    _LAST_STATS["polled"] = sources
+    fetched: Dict[str, List[Dict]] = {}
+    failed = set()
+    for s in sources:
         try:
-            df = pd.DataFrame(rows)
-            if "ts" not in df.columns and "timestamp" in df.columns:
-                df["ts"] = pd.to_datetime(df["timestamp"], errors="coerce", utc=True)
-                df["ts"] = df["ts"].fillna(pd.Timestamp.utcnow())
-            if "actor" not in df.columns:
-                df["actor"] = df.get("author") or "other"
-            if "text" not in df.columns:
-                df["text"] = df.get("snippet") or ""
-            df = df.sort_values("ts").reset_index(drop=True)
-            state = build_state(df, N=5)
-            if source == "gmail":
-                _ = draft_email_from_state(state=state, recipient=None, max_words=140)
-            else:
-                _ = draft_message_from_state(state=state, platform=source, max_words=140)
-            drafted += 1
+            fetched[s] = await fetch_source(s)
         except Exception as ex:
-            errs.append(f"{source}:{tid}:{ex}")
-    return drafted, errs
-
-async def poll() -> Dict[str, Any]:
-    _LAST_STATS.update(started_at=time.strftime("%Y-%m-%d %H:%M:%S"),
-                       gmail_found=0, discord_found=0, github_found=0,
-                       drafted=0, errors=[])
-    gmail_events  = await fetch_new_gmail()
-    discord_events= await fetch_new_discord()
-    github_events = await fetch_new_github()
-    _LAST_EVENTS["gmail"] = gmail_events
-    _LAST_EVENTS["discord"] = discord_events
-    _LAST_EVENTS["github"] = github_events
-    _LAST_STATS["gmail_found"]   = len(gmail_events)
-    _LAST_STATS["discord_found"] = len(discord_events)
-    _LAST_STATS["github_found"]  = len(github_events)
-    d1,e1 = await _draft_for_events("gmail", gmail_events)
-    d2,e2 = await _draft_for_events("discord", discord_events)
-    d3,e3 = await _draft_for_events("github", github_events)
-    _LAST_STATS["drafted"] = d1 + d2 + d3
-    _LAST_STATS["errors"] = [*e1, *e2, *e3]
+            fetched[s] = []
+            failed.add(s)
+            _LAST_STATS["errors"].append(f"{s}:fetch:{ex}")
+    _store_events(fetched)
+    for s in sources:
+        _LAST_STATS[f"{s}_found"] = len(fetched[s])
+        adaptive_schedule.observe(s, _LAST_STATS.get(f"{s}_new", 0), error=s in failed)
+    drafted = await _draft_prioritized(fetched)
+    _LAST_STATS["drafted"] = drafted["drafted"]
+    _LAST_STATS["skipped_by_action"] = drafted["skipped"]
+    _LAST_STATS["unchanged_skipped"] = drafted["unchanged"]
+    _LAST_STATS["deferred"] = drafted["deferred"]
+    _LAST_STATS["errors"].extend(drafted["errors"])
     _LAST_STATS["finished_at"] = time.strftime("%Y-%m-%d %H:%M:%S")
+    try: coordination.publish("poll_stats", _collect_stats())
+    except Exception as ex: print("[poll] could not publish stats", ex)
     return dict(_LAST_STATS)
 
-from apscheduler.schedulers.background import BackgroundScheduler
 def start_scheduler():
+    """Start polling in every worker; only the holder of the 'poller' lease actually polls."""
+    global _LEASE
+    if os.getenv("POLL_MODE", "inprocess") == "worker":
+        print("📅 POLL_MODE=worker: polling runs in backend.app.worker, not in the API process.")
+        return
     every = int(os.getenv("POLL_EVERY_SECONDS", "120"))
+    ttl = float(os.getenv("POLL_LEASE_TTL_SECONDS", "30"))
+    _LEASE = coordination.LeaderLease("poller", ttl=ttl)
+    from apscheduler.schedulers.background import BackgroundScheduler
     sch = BackgroundScheduler()
+    def _heartbeat():
+        # renews while leader; picks up leadership once the old leader's lease expires
+        try: _LEASE.try_acquire()
+        except Exception as e: print(f"[scheduler] lease error: {e}")
+    tick = float(os.getenv("POLL_TICK_SECONDS", "5"))
     def _job():
-        try: asyncio.run(poll())
+        if not _LEASE.is_leader: return
+        from backend.app.services import poll_jobs
+        # run /poll/now jobs queued by the other workers
+        poll_jobs.kick()
+        sources = adaptive_schedule.due(SOURCES)
+        if not sources: return
+        # same single-flight path as /poll/now, so a manual trigger never overlaps a scheduled poll
+        try: poll_jobs.trigger(wait=True, sources=sources)
         except Exception as e: _LAST_STATS["errors"].append(f"job:{e}")
-    sch.add_job(_job, "interval", seconds=every)
+    _heartbeat()
+    sch.add_job(_heartbeat, "interval", seconds=max(1.0, ttl / 3))
+    sch.add_job(_job, "interval", seconds=tick, max_instances=1, coalesce=True)
     sch.start()
-    print(f"📅 Scheduler started, polling every {every}s.")
+    atexit.register(lambda: _LEASE.is_leader and _LEASE.release())
+    role = "leader" if _LEASE.is_leader else "follower"
+    print(f"📅 Scheduler started ({role} {_LEASE.holder}), adaptive polling from {every}s per source.")
@@ -0,0 +1,147 @@
+"""
+Opt-in request tracing (TRACING_ENABLED=1, or POST /debug/tracing at runtime).
+
+- `span(name, **attrs)` opens a child of the current span (a context variable, so it
+  follows `await`, `asyncio.to_thread` and `resilience.submit` into worker threads)
+- A span without a parent is a trace root; when it ends the trace is kept if it is among
+  the slowest of the last TRACE_WINDOW_SECONDS (TRACE_KEEP traces)
+- When tracing is off `span()` returns a shared no-op context manager
+"""
+
+import os
+import time
+import heapq
+import itertools
+import threading
+import contextvars
+from functools import wraps
+from typing import Optional, Dict, Any, List, Callable
+
+_enabled = os.getenv("TRACING_ENABLED") == "1"
+_current: contextvars.ContextVar = contextvars.ContextVar("trace_span", default=None)
+_lock = threading.Lock()
+_slowest: List[Any] = []          # min-heap of (duration, seq, finished_at, root span)
+_seq = itertools.count()
+
+
+class _NoopSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **attrs) -> None:
+        pass
+
+
+_NOOP = _NoopSpan()
+
+
+class Span:
+    __slots__ = ("name", "attrs", "start", "end", "children", "parent", "_token")
+
+    def __init__(self, name: str, attrs: Dict[str, Any], parent: Optional["Span"]):
+        self.name = name
+        self.attrs = attrs
+        self.parent = parent
+        self.children: List["Span"] = []
+        self.start = 0.0
+        self.end: Optional[float] = None
+
+    def set(self, **attrs) -> None:
+        self.attrs.update(attrs)
+
+    def __enter__(self) -> "Span":
+        if self.parent is not None:
+            self.parent.children.append(self)
+        self._token = _current.set(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        self.end = time.perf_counter()
+        if exc is not None:
+            self.attrs["error"] = f"{exc_type.__name__}: {exc}"[:200]
+        _current.reset(self._token)
+        if self.parent is None:
+            _record(self)
+        return False
+
+    @property
+    def duration(self) -> float:
+        return ((self.end or time.perf_counter()) - self.start)
+
+    def to_dict(self, origin: Optional[float] = None) -> Dict[str, Any]:
+        origin = self.start if origin is None else origin
+        return {
+            "name": self.name,
+            "start_ms": round((self.start - origin) * 1000, 2),
+            "duration_ms": round(self.duration * 1000, 2),
+            "attrs": self.attrs,
+            "children": [c.to_dict(origin) for c in list(self.children)],
+        }
+
+
+def enabled() -> bool:
+    return _enabled
+
+
+def set_enabled(on: bool) -> None:
+    global _enabled
+    _enabled = bool(on)
+
+
+def span(name: str, **attrs):
+    if not _enabled:
+        return _NOOP
+    return Span(name, attrs, _current.get())
+
+
+def traced(name: Optional[str] = None) -> Callable:
+    """Decorator running the function inside `span(name)`."""
+    def deco(fn):
+        label = name or fn.__qualname__
+
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return fn(*args, **kwargs)
+            with span(label):
+                return fn(*args, **kwargs)
+        return wrapper
+    return deco
+
+
+def current() -> Optional[Span]:
+    return _current.get()
+
+
+def _record(root: Span) -> None:
+    keep = int(os.getenv("TRACE_KEEP", "50"))
+    window = float(os.getenv("TRACE_WINDOW_SECONDS", "600"))
+    now = time.time()
+    with _lock:
+        if _slowest and now - min(t[2] for t in _slowest) > window:
+            _slowest[:] = [t for t in _slowest if now - t[2] <= window]
+            heapq.heapify(_slowest)
+        item = (root.duration, next(_seq), now, root)
+        if len(_slowest) < keep:
+            heapq.heappush(_slowest, item)
+        elif item[0] > _slowest[0][0]:
+            heapq.heapreplace(_slowest, item)
+
+
+def slowest(limit: int = 10) -> List[Dict[str, Any]]:
+    """The slowest traces finished within the window, slowest first."""
+    window = float(os.getenv("TRACE_WINDOW_SECONDS", "600"))
+    now = time.time()
+    with _lock:
+        items = [t for t in _slowest if now - t[2] <= window]
+    items.sort(key=lambda t: t[0], reverse=True)
+    return [{**t[3].to_dict(), "finished_at": t[2]} for t in items[:limit]]
+
+
+def clear() -> None:
+    with _lock:
+        _slowest.clear()
@@ -0,0 +1,191 @@
+"""
+Persistent multi-stage work queue (SQLite, WAL mode).
+
+- Jobs belong to a stage (fetch, normalize, classify, draft...) and are claimed with a lease;
+  a job whose worker died is re-claimable once its lease expires
+- Optional `dedup_key`: at most one pending (ready/leased) job per (stage, key); enqueueing
+  again hands the newer payload to the job that is still ready
+- Failed jobs are retried with backoff up to `max_attempts`
+"""
+
+import os
+import json
+import time
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Optional, Dict, Any
+
+BACKEND_ROOT = Path(__file__).resolve().parents[2]
+DEFAULT_PATH = BACKEND_ROOT / "storage" / "queue.db"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id           INTEGER PRIMARY KEY AUTOINCREMENT,
+    stage        TEXT NOT NULL,
+    payload      TEXT NOT NULL,
+    dedup_key    TEXT,
+    priority     INTEGER NOT NULL DEFAULT 0,
+    status       TEXT NOT NULL DEFAULT 'ready',
+    attempts     INTEGER NOT NULL DEFAULT 0,
+    available_at REAL NOT NULL,
+    leased_until REAL,
+    lease_owner  TEXT,
+    created_at   REAL NOT NULL,
+    finished_at  REAL,
+    result       TEXT,
+    error        TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_claim ON jobs (stage, status, priority DESC, id);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_jobs_dedup ON jobs (stage, dedup_key)
+    WHERE dedup_key IS NOT NULL AND status IN ('ready', 'leased');
+"""
+
+
+class WorkQueue:
+    def __init__(self, path: Optional[Path] = None, max_attempts: int = 3):
+        self.path = Path(path or os.getenv("WORK_QUEUE_PATH") or DEFAULT_PATH)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_attempts = max_attempts
+        self._local = threading.local()
+        self._conn().executescript(_SCHEMA)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.path), timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def enqueue(self, stage: str, payload: Dict[str, Any], dedup_key: Optional[str] = None,
+                priority: int = 0, delay: float = 0.0) -> int:
+        """Add a job and return its id.
+
+        When a job with the same `dedup_key` is still ready, that job takes the newer payload
+        (and the higher priority) and its id is returned. A job already leased keeps the payload
+        it is running with; the stage re-enqueues on the next poll if its result went stale.
+        """
+        now = time.time()
+        body = json.dumps(payload, default=str)
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            cur = conn.execute(
+                "INSERT OR IGNORE INTO jobs (stage, payload, dedup_key, priority, available_at, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (stage, body, dedup_key, int(priority), now + delay, now),
+            )
+            if cur.rowcount:
+                job_id = cur.lastrowid
+            else:
+                job_id = conn.execute(
+                    "SELECT id FROM jobs WHERE stage = ? AND dedup_key = ? AND status IN ('ready', 'leased')",
+                    (stage, dedup_key),
+                ).fetchone()["id"]
+                conn.execute(
+                    "UPDATE jobs SET payload = ?, priority = MAX(priority, ?) WHERE id = ? AND status = 'ready'",
+                    (body, int(priority), job_id),
+                )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return job_id
+
+    def claim(self, stage: str, owner: str, lease_seconds: float = 300) -> Optional[Dict[str, Any]]:
+        """Lease the next ready job of `stage` (highest priority first), or None."""
+        now = time.time()
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT * FROM jobs WHERE stage = ? AND ("
+                " (status = 'ready' AND available_at <= ?) OR (status = 'leased' AND leased_until < ?)"
+                ") ORDER BY priority DESC, id LIMIT 1",
+                (stage, now, now),
+            ).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+            conn.execute(
+                "UPDATE jobs SET status = 'leased', lease_owner = ?, leased_until = ?, attempts = attempts + 1 WHERE id = ?",
+                (owner, now + lease_seconds, row["id"]),
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        job = dict(row)
+        job["payload"] = json.loads(job["payload"])
+        job["attempts"] += 1
+        return job
+
+    def ack(self, job_id: int, owner: str, result: Any = None) -> bool:
+        """Mark a leased job done. False when `owner` no longer holds the lease (it expired and was re-claimed)."""
+        cur = self._conn().execute(
+            "UPDATE jobs SET status = 'done', finished_at = ?, result = ?, leased_until = NULL "
+            "WHERE id = ? AND status = 'leased' AND lease_owner = ?",
+            (time.time(), json.dumps(result, default=str) if result is not None else None, job_id, owner),
+        )
+        return cur.rowcount > 0
+
+    def fail(self, job_id: int, owner: str, error: str, retry_delay: float = 5.0) -> bool:
+        """Retry a leased job with backoff, or fail it for good after `max_attempts`. False as in `ack`."""
+        conn = self._conn()
+        row = conn.execute("SELECT attempts FROM jobs WHERE id = ? AND status = 'leased' AND lease_owner = ?",
+                           (job_id, owner)).fetchone()
+        if row is None:
+            return False
+        if row["attempts"] < self.max_attempts:
+            cur = conn.execute(
+                "UPDATE jobs SET status = 'ready', available_at = ?, leased_until = NULL, error = ? "
+                "WHERE id = ? AND status = 'leased' AND lease_owner = ?",
+                (time.time() + retry_delay * (2 ** (row["attempts"] - 1)), error, job_id, owner),
+            )
+        else:
+            cur = conn.execute(
+                "UPDATE jobs SET status = 'failed', finished_at = ?, leased_until = NULL, error = ? "
+                "WHERE id = ? AND status = 'leased' AND lease_owner = ?",
+                (time.time(), error, job_id, owner),
+            )
+        return cur.rowcount > 0
+
+    def get(self, job_id: int) -> Optional[Dict[str, Any]]:
+        row = self._conn().execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        job["payload"] = json.loads(job["payload"])
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        out: Dict[str, Dict[str, int]] = {}
+        for r in self._conn().execute("SELECT stage, status, COUNT(*) AS n FROM jobs GROUP BY stage, status"):
+            out.setdefault(r["stage"], {})[r["status"]] = r["n"]
+        return out
+
+    def purge(self, older_than_seconds: float = 86400) -> int:
+        """Drop finished jobs older than the given age."""
+        cur = self._conn().execute(
+            "DELETE FROM jobs WHERE status IN ('done', 'failed') AND finished_at < ?",
+            (time.time() - older_than_seconds,),
+        )
+        return cur.rowcount
+
+
+_queue: Optional[WorkQueue] = None
+_queue_lock = threading.Lock()
+
+
+def get_queue() -> WorkQueue:
+    global _queue
+    if _queue is None:
+        with _queue_lock:
+            if _queue is None:
+                _queue = WorkQueue()
+    return _queue
+
@@ -0,0 +1,103 @@
+"""
+Standalone poll worker.
+
+Runs the fetch -> normalize -> classify -> draft pipeline outside the API process.
+Stages can be split across processes and scaled independently, e.g.:
+
+    python -m backend.app.worker                                  # all stages, adaptive per-source ticks
+    python -m backend.app.worker --stages fetch,normalize,classify
+    python -m backend.app.worker --stages draft --concurrency draft=4 --no-tick
+
+Run the API with POLL_MODE=worker so it only serves reads and enqueues work.
+"""
+
+import os
+import sys
+import signal
+import argparse
+import threading
+from pathlib import Path
+from typing import Dict
+
+ROOT = Path(__file__).resolve().parents[1]   # .../backend
+PROJECT_ROOT = ROOT.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from dotenv import load_dotenv  # noqa: E402
+load_dotenv(PROJECT_ROOT / ".env")
+load_dotenv(ROOT / ".env")
+
+from backend.app.services import poll_pipeline, coordination, work_queue, adaptive_schedule, scheduler  # noqa: E402
+
+
+def _parse_concurrency(raw: str) -> Dict[str, int]:
+    out: Dict[str, int] = {}
+    for part in (raw or "").split(","):
+        if "=" in part:
+            k, v = part.split("=", 1)
+            out[k.strip()] = max(1, int(v))
+    return out
+
+
+def _tick(lease: coordination.LeaderLease) -> None:
+    """Enqueue fetches for the due sources if this process holds the ticker lease."""
+    try:
+        if lease.try_acquire():
+            sources = adaptive_schedule.due(scheduler.SOURCES)
+            if sources:
+                poll_pipeline.enqueue_poll(sources)
+                work_queue.get_queue().purge()
+    except Exception as ex:
+        # e.g. a locked coordination DB: sit this tick out and try again on the next one
+        print(f"[worker] tick failed: {ex}")
+        lease.is_leader = False
+
+
+def main():
+    p = argparse.ArgumentParser(description="ShadowShift poll worker")
+    p.add_argument("--stages", default=",".join(poll_pipeline.STAGES))
+    p.add_argument("--concurrency", default=os.getenv("WORKER_CONCURRENCY", "draft=2"),
+                   help="per-stage thread counts, e.g. normalize=2,draft=4")
+    p.add_argument("--tick", type=float, default=float(os.getenv("POLL_TICK_SECONDS", "5")),
+                   help="how often to check which sources are due (intervals adapt per source)")
+    p.add_argument("--no-tick", action="store_true", help="do not enqueue periodic fetch jobs")
+    args = p.parse_args()
+
+    stages = [s.strip() for s in args.stages.split(",") if s.strip()]
+    unknown = set(stages) - set(poll_pipeline.STAGES)
+    if unknown:
+        raise SystemExit(f"unknown stages: {sorted(unknown)}")
+    concurrency = _parse_concurrency(args.concurrency)
+
+    stop = threading.Event()
+    signal.signal(signal.SIGINT, lambda *_: stop.set())
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+
+    threads = []
+    for stage in stages:
+        for i in range(concurrency.get(stage, 1)):
+            owner = f"{coordination.worker_id()}:{stage}:{i}"
+            t = threading.Thread(target=poll_pipeline.run_stage, args=(stage, owner, stop), name=owner, daemon=True)
+            t.start()
+            threads.append(t)
+    print(f"[worker] running stages {stages} with {len(threads)} thread(s)")
+
+    if not args.no_tick:
+        # one ticker across worker processes; fetch jobs are also deduplicated per source
+        lease = coordination.LeaderLease("poll-ticker", ttl=max(30.0, args.tick * 3))
+        while not stop.is_set():
+            _tick(lease)
+            stop.wait(args.tick)
+        if lease.is_leader:
+            lease.release()
+    else:
+        stop.wait()
+
+    for t in threads:
+        t.join()
+    print("[worker] stopped")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,446 @@
+"""
+Local fakes for the provider APIs the services call, for load tests.
+
+Implements only what `app/services/` uses:
+- Gmail: OAuth token refresh, users.messages list / get / send
+- Discord: GET/POST /channels/{id}/messages, X-RateLimit-* buckets, 429 + retry_after
+- GitHub REST: GET /repos/{owner}/{repo}[/commits] with ETag/304, Link pagination and
+  X-RateLimit-* headers (304s are free, as on github.com); POST /graphql for commit history
+- OpenAI: /v1/chat/completions (JSON draft replies, usage) and /v1/completions (prompt batches)
+
+Every provider has configurable latency (+ uniform jitter), error rate, a fixed-window rate
+limit and an arrival rate of new messages, settable at start-up or at runtime through
+POST /_fake/config. `start()` runs the server in a background thread; `service_env(url)`
+returns the env vars that point the services at it.
+"""
+
+import re
+import json
+import time
+import base64
+import random
+import asyncio
+import hashlib
+import threading
+import sys
+from pathlib import Path
+from datetime import datetime, timezone
+from typing import Optional, Dict, Any, List, Tuple
+
+ROOT = Path(__file__).resolve().parents[1]   # .../backend
+if str(ROOT.parent) not in sys.path:
+    sys.path.insert(0, str(ROOT.parent))
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response
+
+from backend.benchmarks import synthetic
+
+PROVIDERS = ("gmail", "discord", "github", "openai")
+DEFAULTS: Dict[str, Dict[str, float]] = {
+    # latency in ms; rate_limit = requests per window_s (0 = unlimited); arrival_per_s = new messages per second
+    "gmail":   {"latency_ms": 40, "jitter_ms": 30, "error_rate": 0.0, "rate_limit": 0, "window_s": 1, "arrival_per_s": 0.5},
+    "discord": {"latency_ms": 30, "jitter_ms": 20, "error_rate": 0.0, "rate_limit": 5, "window_s": 1, "arrival_per_s": 1.0},
+    "github":  {"latency_ms": 60, "jitter_ms": 40, "error_rate": 0.0, "rate_limit": 5000, "window_s": 3600, "arrival_per_s": 0.2},
+    "openai":  {"latency_ms": 400, "jitter_ms": 300, "error_rate": 0.0, "rate_limit": 0, "window_s": 60, "arrival_per_s": 0},
+}
+_ALIAS = re.compile(r'(\w+): repository\(owner: ("(?:[^"\\]|\\.)*"), name: ("(?:[^"\\]|\\.)*")\)')
+_SINCE = re.compile(r'since: ("(?:[^"\\]|\\.)*")')
+
+
+def _iso(ts: float) -> str:
+    return datetime.fromtimestamp(ts, timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+class FakeProviders:
+    """State shared by the fake endpoints: settings, rate-limit windows, stored messages and stats."""
+
+    def __init__(self, config: Optional[Dict[str, Dict[str, float]]] = None, seed: int = 0,
+                 threads: int = 5, channels: Tuple[str, ...] = ("1001", "1002"),
+                 repos: Tuple[str, ...] = ("acme/api", "acme/web"), initial: int = 5):
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.settings = {p: dict(DEFAULTS[p]) for p in PROVIDERS}
+        self.configure(config or {})
+        self.gmail_threads = [f"gt{i}" for i in range(threads)]
+        self.channels = list(channels)
+        self.repos = list(repos)
+        self.gmail: List[Dict[str, Any]] = []                     # oldest first
+        self.discord: Dict[str, List[Dict[str, Any]]] = {c: [] for c in self.channels}
+        self.commits: Dict[str, List[Dict[str, Any]]] = {r: [] for r in self.repos}
+        self.sent: List[Dict[str, Any]] = []
+        self._windows: Dict[str, List[float]] = {}               # bucket -> [window start, count]
+        self._last_arrival = {p: time.time() for p in PROVIDERS}
+        self._ids = 0
+        self.stats = {p: {"requests": 0, "errors": 0, "rate_limited": 0, "not_modified": 0} for p in PROVIDERS}
+        for p in ("gmail", "discord", "github"):
+            for _ in range(initial * {"gmail": threads, "discord": len(self.channels), "github": len(self.repos)}[p]):
+                self._add(p, time.time() - self.rng.uniform(0, 3600))
+
+    def configure(self, config: Dict[str, Dict[str, float]]) -> None:
+        for provider, values in config.items():
+            if provider not in self.settings:
+                raise ValueError(f"unknown provider {provider!r}")
+            unknown = set(values) - set(DEFAULTS[provider])
+            if unknown:
+                raise ValueError(f"unknown settings for {provider}: {sorted(unknown)}")
+            self.settings[provider].update({k: float(v) for k, v in values.items()})
+
+    # ---- data ----
+    def _next_id(self) -> int:
+        self._ids += 1
+        return self._ids
+
+    def _add(self, provider: str, ts: float) -> None:
+        text = synthetic.make_text(self.rng)
+        n = self._next_id()
+        if provider == "gmail":
+            body = base64.urlsafe_b64encode(text.encode("utf-8")).decode("ascii")
+            self.gmail.append({
+                "id": f"m{n}", "threadId": self.rng.choice(self.gmail_threads), "snippet": text[:100],
+                "internalDate": str(int(ts * 1000)),
+                "payload": {"mimeType": "text/plain", "body": {"data": body}, "headers": [
+                    {"name": "From", "value": f"user{self.rng.randint(1, 20)}@example.com"},
+                    {"name": "Subject", "value": text[:40]},
+                ]},
+            })
+        elif provider == "discord":
+            cid = self.rng.choice(self.channels)
+            self.discord[cid].append({"id": str(10 ** 17 + n), "channel_id": cid, "content": text,
+                                      "author": {"username": f"user{self.rng.randint(1, 20)}"},
+                                      "timestamp": datetime.fromtimestamp(ts, timezone.utc).isoformat()})
+        elif provider == "github":
+            repo = self.rng.choice(self.repos)
+            self.commits[repo].append({"sha": hashlib.sha1(f"{repo}{n}".encode()).hexdigest(),
+                                       "commit": {"message": text, "author": {"name": f"dev{self.rng.randint(1, 9)}",
+                                                                              "date": _iso(ts)}}})
+
+    def arrive(self, provider: str) -> None:
+        """Add the messages that 'arrived' since the last list call (Poisson-ish at arrival_per_s)."""
+        with self.lock:
+            now = time.time()
+            expected = (now - self._last_arrival[provider]) * self.settings[provider]["arrival_per_s"]
+            self._last_arrival[provider] = now
+            n = int(expected) + (1 if self.rng.random() < expected - int(expected) else 0)
+            for _ in range(n):
+                self._add(provider, now)
+
+    # ---- behaviour ----
+    def _take(self, bucket: str, limit: float, window: float, consume: bool = True) -> Tuple[bool, int, float]:
+        """(allowed, remaining, seconds until the window resets) for a fixed-window limiter."""
+        now = time.time()
+        with self.lock:
+            w = self._windows.get(bucket)
+            if w is None or now - w[0] >= window:
+                w = self._windows[bucket] = [now, 0]
+            reset_after = window - (now - w[0])
+            if limit and w[1] >= limit:
+                return not consume, 0, reset_after
+            w[1] += int(consume)
+            return True, max(0, int(limit - w[1])) if limit else 0, reset_after
+
+    async def gate(self, provider: str, bucket: Optional[str] = None, free: bool = False):
+        """Simulate latency, errors and rate limiting. Returns (error response or None, headers)."""
+        s = self.settings[provider]
+        with self.lock:
+            self.stats[provider]["requests"] += 1
+            delay = max(0.0, s["latency_ms"] + self.rng.uniform(-1, 1) * s["jitter_ms"]) / 1000
+            fail = self.rng.random() < s["error_rate"]
+        await asyncio.sleep(delay)
+        allowed, remaining, reset_after = self._take(bucket or provider, s["rate_limit"], s["window_s"], consume=not free)
+        headers = _rate_headers(provider, s["rate_limit"], remaining, reset_after, bucket or provider)
+        if not allowed:
+            with self.lock:
+                self.stats[provider]["rate_limited"] += 1
+            return _rate_limited(provider, reset_after, headers), headers
+        if fail:
+            with self.lock:
+                self.stats[provider]["errors"] += 1
+            return JSONResponse({"error": {"code": 503, "message": "fake provider error"}}, 503, headers=headers), headers
+        return None, headers
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self.lock:
+            return {"settings": {p: dict(v) for p, v in self.settings.items()},
+                    "stats": {p: dict(v) for p, v in self.stats.items()},
+                    "messages": {"gmail": len(self.gmail), "discord": sum(len(v) for v in self.discord.values()),
+                                 "github": sum(len(v) for v in self.commits.values()), "sent": len(self.sent)}}
+
+
+def _rate_headers(provider: str, limit: float, remaining: int, reset_after: float, bucket: str) -> Dict[str, str]:
+    if not limit:
+        return {}
+    if provider == "discord":
+        return {"X-RateLimit-Limit": str(int(limit)), "X-RateLimit-Remaining": str(remaining),
+                "X-RateLimit-Reset-After": f"{reset_after:.3f}", "X-RateLimit-Bucket": bucket}
+    if provider == "github":
+        return {"X-RateLimit-Limit": str(int(limit)), "X-RateLimit-Remaining": str(remaining),
+                "X-RateLimit-Used": str(int(limit) - remaining), "X-RateLimit-Resource": "core",
+                "X-RateLimit-Reset": str(int(time.time() + reset_after))}
+    if provider == "openai":
+        return {"x-ratelimit-limit-requests": str(int(limit)), "x-ratelimit-remaining-requests": str(remaining),
+                "x-ratelimit-reset-requests": f"{reset_after:.3f}s"}
+    return {}
+
+
+def _rate_limited(provider: str, reset_after: float, headers: Dict[str, str]) -> Response:
+    headers = {**headers, "Retry-After": str(max(1, int(reset_after + 0.999)))}
+    if provider == "discord":
+        body = {"message": "You are being rate limited.", "retry_after": round(reset_after, 3), "global": False}
+        return JSONResponse(body, 429, headers=headers)
+    if provider == "github":
+        return JSONResponse({"message": "API rate limit exceeded"}, 403, headers=headers)
+    if provider == "openai":
+        return JSONResponse({"error": {"message": "Rate limit reached", "type": "requests", "code": "rate_limit_exceeded"}},
+                            429, headers=headers)
+    return JSONResponse({"error": {"code": 429, "message": "Rate Limit Exceeded", "status": "RESOURCE_EXHAUSTED"}},
+                        429, headers=headers)
+
+
+def _draft_reply(rng: random.Random) -> str:
+    words = [rng.choice(synthetic.WORDS) for _ in range(rng.randint(20, 60))]
+    return json.dumps({"subject": f"Re: {' '.join(words[:3])}", "body": f"Thanks for the update. {' '.join(words)}."})
+
+
+def create_app(fake: Optional[FakeProviders] = None) -> FastAPI:
+    fake = fake or FakeProviders()
+    app = FastAPI(title="ShadowShift fake providers")
+    app.state.fake = fake
+
+    # ---- admin ----
+    @app.get("/_fake/stats")
+    def fake_stats():
+        return fake.snapshot()
+
+    @app.post("/_fake/config")
+    async def fake_config(request: Request):
+        try:
+            fake.configure(await request.json())
+        except ValueError as e:
+            return JSONResponse({"detail": str(e)}, 422)
+        return fake.snapshot()["settings"]
+
+    # ---- gmail ----
+    @app.post("/gmail/token")
+    async def gmail_token():
+        err, _ = await fake.gate("gmail")
+        return err or {"access_token": "fake-access-token", "expires_in": 3600, "token_type": "Bearer"}
+
+    @app.get("/gmail-api/gmail/v1/users/{user}/messages")
+    async def gmail_list(user: str, maxResults: int = 100):
+        fake.arrive("gmail")
+        err, _ = await fake.gate("gmail")
+        if err:
+            return err
+        with fake.lock:
+            items = [{"id": m["id"], "threadId": m["threadId"]} for m in reversed(fake.gmail[-maxResults:])]
+        return {"messages": items, "resultSizeEstimate": len(items)}
+
+    @app.get("/gmail-api/gmail/v1/users/{user}/messages/{msg_id}")
+    async def gmail_get(user: str, msg_id: str):
+        err, _ = await fake.gate("gmail")
+        if err:
+            return err
+        with fake.lock:
+            msg = next((m for m in fake.gmail if m["id"] == msg_id), None)
+        if msg is None:
+            return JSONResponse({"error": {"code": 404, "message": "Requested entity was not found."}}, 404)
+        return msg
+
+    @app.post("/gmail-api/gmail/v1/users/{user}/messages/send")
+    async def gmail_send(user: str, request: Request):
+        err, _ = await fake.gate("gmail")
+        if err:
+            return err
+        body = await request.json()
+        with fake.lock:
+            sent = {"id": f"s{fake._next_id()}", "threadId": body.get("threadId") or f"st{fake._ids}", "labelIds": ["SENT"]}
+            fake.sent.append({"provider": "gmail", **sent})
+        return sent
+
+    # ---- discord ----
+    @app.get("/discord/api/v10/channels/{channel_id}/messages")
+    async def discord_list(channel_id: str, limit: int = 50):
+        fake.arrive("discord")
+        err, headers = await fake.gate("discord", bucket=f"channel:{channel_id}:get")
+        if err:
+            return err
+        with fake.lock:
+            msgs = list(reversed(fake.discord.get(channel_id, [])[-limit:]))   # newest first
+        return JSONResponse(msgs, headers=headers)
+
+    @app.post("/discord/api/v10/channels/{channel_id}/messages")
+    async def discord_post(channel_id: str, request: Request):
+        err, headers = await fake.gate("discord", bucket=f"channel:{channel_id}:post")
+        if err:
+            return err
+        body = await request.json()
+        with fake.lock:
+            msg = {"id": str(10 ** 17 + fake._next_id()), "channel_id": channel_id, "content": body.get("content", ""),
+                   "author": {"username": "shadowshift-bot"}, "timestamp": datetime.now(timezone.utc).isoformat()}
+            fake.sent.append({"provider": "discord", **msg})
+        return JSONResponse(msg, headers=headers)
+
+    # ---- github ----
+    @app.get("/github/repos/{owner}/{repo}")
+    async def github_repo(owner: str, repo: str):
+        err, headers = await fake.gate("github")
+        return err or JSONResponse({"full_name": f"{owner}/{repo}", "default_branch": "main"}, headers=headers)
+
+    @app.get("/github/repos/{owner}/{repo}/commits")
+    async def github_commits(owner: str, repo: str, request: Request, since: Optional[str] = None,
+                             per_page: int = 30, page: int = 1):
+        full = f"{owner}/{repo}"
+        fake.arrive("github")
+        with fake.lock:
+            commits = [c for c in reversed(fake.commits.get(full, []))
+                       if not since or c["commit"]["author"]["date"] >= since]
+        chunk = commits[(page - 1) * per_page: page * per_page]
+        etag = '"' + hashlib.sha1(json.dumps([c["sha"] for c in chunk]).encode()).hexdigest() + '"'
+        not_modified = request.headers.get("if-none-match") == etag
+        err, headers = await fake.gate("github", free=not_modified)
+        if err:
+            return err
+        headers = {**headers, "ETag": etag}
+        if page * per_page < len(commits):
+            nxt = str(request.url.include_query_params(page=page + 1, per_page=per_page))
+            headers["Link"] = f'<{nxt}>; rel="next"'
+        if not_modified:
+            with fake.lock:
+                fake.stats["github"]["not_modified"] += 1
+            return Response(status_code=304, headers=headers)
+        return JSONResponse(chunk, headers=headers)
+
+    @app.post("/github/graphql")
+    async def github_graphql(request: Request):
+        fake.arrive("github")
+        err, headers = await fake.gate("github")
+        if err:
+            return err
+        query = (await request.json()).get("query", "")
+        since_m = _SINCE.search(query)
+        since = json.loads(since_m.group(1)) if since_m else ""
+        remaining = int(headers.get("X-RateLimit-Remaining", 5000))
+        data: Dict[str, Any] = {"rateLimit": {"cost": 1, "remaining": remaining, "resetAt": _iso(time.time() + 3600)}}
+        empty = {"pageInfo": {"hasNextPage": False, "endCursor": None}, "nodes": []}
+        for alias, owner, name in _ALIAS.findall(query):
+            full = f"{json.loads(owner)}/{json.loads(name)}"
+            with fake.lock:
+                nodes = [{"oid": c["sha"], "message": c["commit"]["message"],
+                          "committedDate": c["commit"]["author"]["date"],
+                          "author": {"name": c["commit"]["author"]["name"], "user": None}}
+                         for c in reversed(fake.commits.get(full, [])) if c["commit"]["author"]["date"] >= since]
+            data[alias] = {"nameWithOwner": full,
+                           "defaultBranchRef": {"target": {"history": {**empty, "nodes": nodes[:100]}}},
+                           "pullRequests": empty, "issues": empty}
+        return JSONResponse({"data": data}, headers=headers)
+
+    # ---- openai ----
+    @app.post("/openai/v1/chat/completions")
+    async def openai_chat(request: Request):
+        err, headers = await fake.gate("openai")
+        if err:
+            return err
+        body = await request.json()
+        with fake.lock:
+            content = _draft_reply(fake.rng)
+        prompt_tokens = sum(len(str(m.get("content", ""))) for m in body.get("messages") or []) // 4
+        completion_tokens = len(content) // 4
+        return JSONResponse({
+            "id": f"chatcmpl-fake{fake._next_id()}", "object": "chat.completion", "created": int(time.time()),
+            "model": body.get("model", "fake"),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                      "total_tokens": prompt_tokens + completion_tokens},
+        }, headers=headers)
+
+    @app.post("/openai/v1/completions")
+    async def openai_completions(request: Request):
+        err, headers = await fake.gate("openai")
+        if err:
+            return err
+        body = await request.json()
+        prompts = body.get("prompt") or [""]
+        prompts = prompts if isinstance(prompts, list) else [prompts]
+        with fake.lock:
+            texts = [_draft_reply(fake.rng) for _ in prompts]
+        return JSONResponse({
+            "id": f"cmpl-fake{fake._next_id()}", "object": "text_completion", "created": int(time.time()),
+            "model": body.get("model", "fake"),
+            "choices": [{"index": i, "text": t, "finish_reason": "stop"} for i, t in enumerate(texts)],
+            "usage": {"prompt_tokens": sum(len(p) for p in prompts) // 4,
+                      "completion_tokens": sum(len(t) for t in texts) // 4},
+        }, headers=headers)
+
+    return app
+
+
+def service_env(url: str, fake: Optional[FakeProviders] = None) -> Dict[str, str]:
+    """Env vars pointing gmail/discord/github/llm services at the fake server at `url`."""
+    url = url.rstrip("/")
+    fake = fake or FakeProviders(initial=0)
+    return {
+        "GMAIL_API_ENDPOINT": f"{url}/gmail-api/", "GMAIL_TOKEN_URI": f"{url}/gmail/token",
+        "GMAIL_REFRESH_TOKEN": "fake-refresh", "CLIENT_ID": "fake-client", "CLIENT_SECRET": "fake-secret",
+        "DISCORD_API_BASE": f"{url}/discord/api/v10", "DISCORD_BOT_TOKEN": "fake-bot",
+        "DISCORD_CHANNEL_IDS": ",".join(fake.channels),
+        "GITHUB_API_URL": f"{url}/github", "GITHUB_TOKEN": "fake-gh", "GITHUB_REPOS": ",".join(fake.repos),
+        "OPENAI_BASE_URL": f"{url}/openai/v1", "OPENAI_API_KEY": "fake-key", "LLM_LOCAL_URL": f"{url}/openai/v1",
+    }
+
+
+class FakeServer:
+    """Runs the fake providers with uvicorn in a daemon thread."""
+
+    def __init__(self, fake: Optional[FakeProviders] = None, host: str = "127.0.0.1", port: int = 0):
+        import uvicorn
+        self.fake = fake or FakeProviders()
+        self.app = create_app(self.fake)
+        config = uvicorn.Config(self.app, host=host, port=port, log_level="warning", lifespan="off")
+        self.server = uvicorn.Server(config)
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        sock = self.server.servers[0].sockets[0]
+        host, port = sock.getsockname()[:2]
+        return f"http://{host}:{port}"
+
+    def start(self, timeout: float = 10) -> "FakeServer":
+        self._thread = threading.Thread(target=self.server.run, name="fake-providers", daemon=True)
+        self._thread.start()
+        deadline = time.time() + timeout
+        while not self.server.started:
+            if time.time() > deadline or not self._thread.is_alive():
+                raise RuntimeError("fake provider server did not start")
+            time.sleep(0.02)
+        return self
+
+    def stop(self) -> None:
+        self.server.should_exit = True
+        if self._thread is not None:
+            self._thread.join(timeout=10)
+
+    def env(self) -> Dict[str, str]:
+        return service_env(self.url, self.fake)
+
+
+def start(config: Optional[Dict[str, Dict[str, float]]] = None, port: int = 0, seed: int = 0) -> FakeServer:
+    return FakeServer(FakeProviders(config, seed=seed), port=port).start()
+
+
+if __name__ == "__main__":
+    import argparse
+    ap = argparse.ArgumentParser(description="Run the fake provider APIs")
+    ap.add_argument("--port", type=int, default=8099)
+    ap.add_argument("--config", help='JSON settings, e.g. {"openai": {"latency_ms": 800, "error_rate": 0.05}}')
+    args = ap.parse_args()
+    srv = start(json.loads(args.config) if args.config else None, port=args.port)
+    print(f"fake providers on {srv.url}; point the services at them with:")
+    for k, v in srv.env().items():
+        print(f"export {k}={v}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        srv.stop()
@@ -0,0 +1,249 @@
+"""
+Load generator: drives `scheduler.poll` and the API routes against the fake providers and
+reports throughput and tail latency.
+
+    python backend/benchmarks/loadgen.py --duration 30 --concurrency 16
+    python backend/benchmarks/loadgen.py --fake-config '{"openai": {"latency_ms": 900, "error_rate": 0.05}}'
+    python backend/benchmarks/loadgen.py --api-url http://127.0.0.1:8000   # a running API already using the fakes
+
+By default everything runs in this process: the fake providers on a local port, the API through
+its ASGI app (startup hooks off, so the built-in scheduler does not poll) and the poller in a
+thread of its own. Event, outbound and coordination stores go to a temporary directory.
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import tempfile
+import threading
+from pathlib import Path
+from collections import defaultdict
+from typing import Optional, Dict, Any, List, Tuple
+
+ROOT = Path(__file__).resolve().parents[1]   # .../backend
+if str(ROOT.parent) not in sys.path:
+    sys.path.insert(0, str(ROOT.parent))
+
+from backend.benchmarks import fake_providers, synthetic  # noqa: E402
+
+# relative weight of each route in the request mix
+ROUTE_MIX = {"recommend": 35, "batch": 10, "act": 15, "inbox": 25, "draft": 15}
+
+
+class Recorder:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+
+    def record(self, name: str, seconds: float, error: Optional[str] = None) -> None:
+        with self.lock:
+            self.latencies[name].append(seconds)
+            if error:
+                self.errors[name][error] += 1
+
+    def summary(self, elapsed: float) -> Dict[str, Dict[str, Any]]:
+        with self.lock:
+            items = {k: sorted(v) for k, v in self.latencies.items()}
+            errors = {k: dict(v) for k, v in self.errors.items()}
+        return {name: {**percentiles(times), "per_s": round(len(times) / elapsed, 2) if elapsed else None,
+                       "errors": sum(errors.get(name, {}).values()), "error_kinds": errors.get(name, {})}
+                for name, times in sorted(items.items())}
+
+
+def percentiles(times: List[float]) -> Dict[str, Any]:
+    """Count and p50/p90/p99/max in ms of sorted `times` (seconds)."""
+    if not times:
+        return {"count": 0}
+    pick = lambda q: times[min(len(times) - 1, int(len(times) * q))]
+    return {"count": len(times), "p50_ms": round(pick(0.50) * 1000, 2), "p90_ms": round(pick(0.90) * 1000, 2),
+            "p99_ms": round(pick(0.99) * 1000, 2), "max_ms": round(times[-1] * 1000, 2)}
+
+
+# ---- poller ----
+def run_poller(rounds: int, interval: float, stop: threading.Event, rec: Recorder) -> List[Dict[str, Any]]:
+    """Run up to `rounds` polls back to back (`interval` seconds apart) until `stop` is set."""
+    from backend.app.services import scheduler
+    out = []
+    loop = asyncio.new_event_loop()
+    try:
+        for i in range(rounds):
+            if stop.is_set():
+                break
+            started = time.perf_counter()
+            try:
+                stats = loop.run_until_complete(scheduler.poll())
+                err = f"{len(stats['errors'])} errors" if stats.get("errors") else None
+            except Exception as e:
+                stats, err = {}, type(e).__name__
+            took = time.perf_counter() - started
+            rec.record("poll", took, err)
+            out.append({"round": i, "seconds": round(took, 3),
+                        **{k: stats.get(k) for k in ("gmail_new", "discord_new", "github_new", "drafted",
+                                                      "unchanged_skipped", "deferred")},
+                        "errors": (stats.get("errors") or [])[:5]})
+            stop.wait(interval)
+    finally:
+        loop.close()
+    return out
+
+
+# ---- API ----
+class ApiDriver:
+    """Sends the route mix from `concurrency` async workers until the deadline."""
+
+    def __init__(self, client, rec: Recorder, seed: int = 0, mix: Optional[Dict[str, int]] = None):
+        self.client = client
+        self.rec = rec
+        self.rng = random.Random(seed)
+        self.mix = mix or ROUTE_MIX
+        self.states = synthetic.make_states(200, seed=seed)
+        self.events = synthetic.make_events(20, 8, seed=seed)
+        self.threads: List[Tuple[str, str]] = []   # (source, thread_id) seen in /inbox
+
+    def _request(self, route: str) -> Tuple[str, str, Dict[str, Any]]:
+        if route == "recommend":
+            return "POST", "/recommend", {"state": self.rng.choice(self.states)}
+        if route == "batch":
+            return "POST", "/batch", {"states": self.rng.sample(self.states, 16)}
+        if route == "act":
+            source, events = synthetic.act_payload(self.events, f"t{self.rng.randrange(20)}")
+            return "POST", "/act", {"source": source, "events": events}
+        if route == "draft" and self.threads:
+            source, tid = self.rng.choice(self.threads)
+            return "POST", "/draft/from-thread", {"source": source, "thread_id": tid}
+        return "GET", "/inbox", {"limit": 50}
+
+    async def _one(self) -> None:
+        route = self.rng.choices(list(self.mix), weights=list(self.mix.values()))[0]
+        method, path, payload = self._request(route)
+        started = time.perf_counter()
+        error = None
+        try:
+            if method == "GET":
+                r = await self.client.get(path, params=payload)
+            else:
+                r = await self.client.post(path, json=payload)
+            if r.status_code >= 400:
+                error = str(r.status_code)
+            elif path == "/inbox":
+                self.threads = list({(e["source"], e["thread_id"]) for e in r.json().get("events", [])}) or self.threads
+        except Exception as e:
+            error = type(e).__name__
+        self.rec.record(path, time.perf_counter() - started, error)
+
+    async def run(self, duration: float, concurrency: int) -> None:
+        deadline = time.monotonic() + duration
+
+        async def worker():
+            while time.monotonic() < deadline:
+                await self._one()
+
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+
+
+def _in_process_client():
+    import httpx
+    from backend.app.api import app as api
+    from backend.app.models.ai_stub import AIStub
+    from backend.app.services import scheduler
+    model = AIStub()
+    model.fit(synthetic.make_dataset(2000))
+    api.MODEL, api.READY = model, True
+    scheduler.set_model(model)
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=api.app), base_url="http://loadgen", timeout=120)
+
+
+def run_load(duration: float = 20, concurrency: int = 8, poll_rounds: int = 1000, poll_interval: float = 1.0,
+             fake_config: Optional[Dict[str, Dict[str, float]]] = None, api_url: Optional[str] = None,
+             mix: Optional[Dict[str, int]] = None, seed: int = 0) -> Dict[str, Any]:
+    tmp = tempfile.TemporaryDirectory(prefix="shadowshift-load-")
+    server = fake_providers.start(fake_config, seed=seed)
+    saved = dict(os.environ)
+    # before the service modules are imported: some read their base URLs at import time
+    os.environ.update(server.env())
+    os.environ.pop("LLM_OFFLINE", None)
+    os.environ.update({"EVENT_STORE_PATH": f"{tmp.name}/events.db", "OUTBOUND_DB_PATH": f"{tmp.name}/outbound.db",
+                       "COORDINATION_DB_PATH": f"{tmp.name}/coordination.db", "POLL_MODE": "inprocess"})
+    rec = Recorder()
+    stop = threading.Event()
+    polls: List[Dict[str, Any]] = []
+    try:
+        if api_url:
+            import httpx
+            client = httpx.AsyncClient(base_url=api_url, timeout=120)
+        else:
+            client = _in_process_client()
+        poller = None
+        if poll_rounds:
+            poller = threading.Thread(target=lambda: polls.extend(run_poller(poll_rounds, poll_interval, stop, rec)),
+                                      name="loadgen-poller", daemon=True)
+            poller.start()
+        started = time.perf_counter()
+
+        async def drive():
+            async with client:
+                await ApiDriver(client, rec, seed=seed, mix=mix).run(duration, concurrency)
+
+        if concurrency:
+            asyncio.run(drive())
+        else:
+            stop.wait(duration)
+        stop.set()
+        if poller is not None:
+            poller.join()
+        elapsed = time.perf_counter() - started
+        return {
+            "config": {"duration": duration, "concurrency": concurrency, "poll_interval": poll_interval,
+                       "api_url": api_url, "mix": mix or ROUTE_MIX, "fake": server.fake.snapshot()["settings"]},
+            "elapsed_s": round(elapsed, 2),
+            "requests_per_s": round(sum(len(v) for k, v in rec.latencies.items() if k != "poll") / elapsed, 2),
+            "routes": rec.summary(elapsed),
+            "polls": polls,
+            "providers": server.fake.snapshot()["stats"],
+        }
+    finally:
+        stop.set()
+        server.stop()
+        os.environ.clear()
+        os.environ.update(saved)
+        tmp.cleanup()
+
+
+def _print_report(report: Dict[str, Any]) -> None:
+    print(f"{report['elapsed_s']}s, {report['requests_per_s']} API req/s")
+    print(f"{'route':<22}{'count':>8}{'per s':>9}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'max ms':>10}{'errors':>8}")
+    for name, r in report["routes"].items():
+        print(f"{name:<22}{r['count']:>8}{r['per_s'] or 0:>9.2f}{r.get('p50_ms', 0):>10.1f}{r.get('p90_ms', 0):>10.1f}"
+              f"{r.get('p99_ms', 0):>10.1f}{r.get('max_ms', 0):>10.1f}{r['errors']:>8}")
+    print("providers:", json.dumps(report["providers"]))
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="ShadowShift load generator (uses local provider fakes)")
+    ap.add_argument("--duration", type=float, default=20, help="seconds of API load")
+    ap.add_argument("--concurrency", type=int, default=8, help="concurrent API clients (0 = poller only)")
+    ap.add_argument("--poll-rounds", type=int, default=1000, help="max scheduler.poll rounds (0 = API only)")
+    ap.add_argument("--poll-interval", type=float, default=1.0, help="pause between polls")
+    ap.add_argument("--fake-config", help="JSON provider settings, see fake_providers.DEFAULTS")
+    ap.add_argument("--mix", help='JSON route weights, e.g. {"recommend": 1, "act": 1}')
+    ap.add_argument("--api-url", help="load a running API instead of the in-process ASGI app")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--out", type=Path, help="write the JSON report here")
+    args = ap.parse_args(argv)
+
+    report = run_load(args.duration, args.concurrency, args.poll_rounds, args.poll_interval,
+                      json.loads(args.fake_config) if args.fake_config else None, args.api_url,
+                      json.loads(args.mix) if args.mix else None, args.seed)
+    if args.out:
+        args.out.write_text(json.dumps(report, indent=2), encoding="utf-8")
+    _print_report(report)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,317 @@
+"""
+Benchmark suite: dataset build, AIStub training/inference, build_state and the
+/recommend, /batch and /act routes (through the ASGI app, LLM_OFFLINE=1).
+
+    python backend/benchmarks/run.py --scale small --out bench.json
+    python backend/benchmarks/run.py --baseline bench.json      # exit 1 on regressions
+
+Results are JSON (one entry per benchmark: timings in ms plus items/s) so runs on
+different commits can be compared. A benchmark regresses when its median is more than
+its threshold (default --threshold, or the per-benchmark override) slower than baseline.
+"""
+
+import os
+import sys
+import json
+import time
+import asyncio
+import itertools
+import platform
+import argparse
+import statistics
+import subprocess
+import tempfile
+import contextlib
+import io
+from pathlib import Path
+from datetime import datetime, timezone
+from typing import Callable, Dict, Any, List, Optional, Tuple
+
+ROOT = Path(__file__).resolve().parents[1]   # .../backend
+PROJ = ROOT.parent
+if str(PROJ) not in sys.path:
+    sys.path.insert(0, str(PROJ))
+
+from backend.benchmarks import synthetic  # noqa: E402
+
+SCALES: Dict[str, Dict[str, int]] = {
+    # threads x events_per_thread raw events; rows = training examples; queries = states per batch
+    "tiny":   {"threads": 10,   "events_per_thread": 6,  "rows": 100,    "queries": 20,   "requests": 10,  "repeat": 3},
+    "small":  {"threads": 50,   "events_per_thread": 8,  "rows": 1000,   "queries": 100,  "requests": 50,  "repeat": 5},
+    "medium": {"threads": 200,  "events_per_thread": 12, "rows": 10000,  "queries": 500,  "requests": 200, "repeat": 5},
+    "large":  {"threads": 1000, "events_per_thread": 20, "rows": 100000, "queries": 2000, "requests": 500, "repeat": 3},
+}
+DEFAULT_THRESHOLD = 0.25
+# (setup(ctx) -> (fn, items per call, calls per repeat), threshold override)
+_BENCHES: Dict[str, Tuple[Callable, Optional[float]]] = {}
+_cycle = itertools.count()   # rotates request payloads
+
+
+def bench(name: str, threshold: Optional[float] = None) -> Callable:
+    def deco(setup):
+        _BENCHES[name] = (setup, threshold)
+        return setup
+    return deco
+
+
+class Context:
+    """Shared inputs for one run, generated once per scale and seed."""
+
+    def __init__(self, scale: Dict[str, int], seed: int, workdir: Path):
+        self.scale = scale
+        self.seed = seed
+        self.workdir = workdir
+        self.events = synthetic.make_events(scale["threads"], scale["events_per_thread"], seed=seed)
+        self.dataset = synthetic.make_dataset(scale["rows"], seed=seed)
+        self.queries = synthetic.make_states(scale["queries"], seed=seed + 1)
+        self._model = None
+        self._client = None
+
+    @property
+    def model(self):
+        if self._model is None:
+            from backend.app.models.ai_stub import AIStub
+            self._model = AIStub()
+            self._model.fit(self.dataset)
+        return self._model
+
+    def client(self):
+        """Sync wrapper over an httpx client bound to the ASGI app (no lifespan: the scheduler stays off)."""
+        if self._client is None:
+            import httpx
+            from backend.app.api import app as api
+            saved = api.MODEL, api.READY
+            api.MODEL, api.READY = self.model, True
+            loop = asyncio.new_event_loop()
+            ac = httpx.AsyncClient(transport=httpx.ASGITransport(app=api.app), base_url="http://bench")
+
+            def post(path: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+                r = loop.run_until_complete(ac.post(path, json=payload))
+                if r.status_code != 200:
+                    raise RuntimeError(f"POST {path} -> {r.status_code}: {r.text[:200]}")
+                return r.json()
+
+            def close() -> None:
+                try:
+                    loop.run_until_complete(ac.aclose())
+                    loop.close()
+                finally:
+                    api.MODEL, api.READY = saved
+
+            self._client = (post, close)
+        return self._client[0]
+
+    def close(self) -> None:
+        if self._client is not None:
+            self._client[1]()
+            self._client = None
+
+
+# ---- benchmarks ----
+@bench("build_dataset_fast.main", threshold=0.3)
+def _bench_build_dataset(ctx: Context):
+    from backend.app.pipelines import build_dataset_fast as bdf
+    raw = synthetic.write_events(ctx.workdir / "events.jsonl", ctx.events)
+    out = ctx.workdir / "dataset.parquet"
+
+    def run():
+        saved = bdf.RAW_EVENTS, bdf.OUT
+        bdf.RAW_EVENTS, bdf.OUT = raw, out
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                bdf.main()
+        finally:
+            bdf.RAW_EVENTS, bdf.OUT = saved
+    return run, len(ctx.events), 1
+
+
+@bench("build_state")
+def _bench_build_state(ctx: Context):
+    from backend.app.pipelines.build_dataset_fast import build_state
+    frames = synthetic.thread_frames(ctx.events)
+
+    def run():
+        for g in frames:
+            build_state(g, N=5)
+    return run, len(frames), 1
+
+
+@bench("aistub.fit", threshold=0.3)
+def _bench_fit(ctx: Context):
+    from backend.app.models.ai_stub import AIStub
+    return (lambda: AIStub().fit(ctx.dataset)), len(ctx.dataset), 1
+
+
+@bench("aistub.predict")
+def _bench_predict(ctx: Context):
+    model, queries = ctx.model, ctx.queries[:50]
+
+    def run():
+        for s in queries:
+            model.predict(s)
+    return run, len(queries), 1
+
+
+@bench("aistub.batch_predict")
+def _bench_batch_predict(ctx: Context):
+    model, queries = ctx.model, ctx.queries
+    return (lambda: model.batch_predict(queries)), len(queries), 1
+
+
+@bench("api.recommend", threshold=0.35)
+def _bench_recommend(ctx: Context):
+    post, states = ctx.client(), ctx.queries
+    n = ctx.scale["requests"]
+    return (lambda: post("/recommend", {"state": states[next(_cycle) % len(states)]})), 1, n
+
+
+@bench("api.batch", threshold=0.35)
+def _bench_batch(ctx: Context):
+    post, states = ctx.client(), ctx.queries[:32]
+    return (lambda: post("/batch", {"states": states})), len(states), max(1, ctx.scale["requests"] // 5)
+
+
+@bench("api.act", threshold=0.35)
+def _bench_act(ctx: Context):
+    post = ctx.client()
+    payloads = []
+    for t in range(min(ctx.scale["threads"], 20)):
+        source, events = synthetic.act_payload(ctx.events, f"t{t}")
+        payloads.append({"source": source, "events": events})
+    n = ctx.scale["requests"]
+    return (lambda: post("/act", payloads[next(_cycle) % len(payloads)])), 1, n
+
+
+# ---- measurement ----
+def measure(fn: Callable[[], Any], items: int, calls: int, repeat: int, warmup: int = 1) -> Dict[str, Any]:
+    """Per-call wall times over `repeat` rounds of `calls` calls (after `warmup` calls)."""
+    for _ in range(warmup):
+        fn()
+    times: List[float] = []
+    for _ in range(repeat):
+        for _ in range(calls):
+            started = time.perf_counter()
+            fn()
+            times.append(time.perf_counter() - started)
+    times.sort()
+    median = statistics.median(times)
+    return {
+        "calls": len(times),
+        "items_per_call": items,
+        "min_ms": round(times[0] * 1000, 3),
+        "median_ms": round(median * 1000, 3),
+        "p95_ms": round(times[min(len(times) - 1, int(len(times) * 0.95))] * 1000, 3),
+        "mean_ms": round(statistics.fmean(times) * 1000, 3),
+        "items_per_s": round(items / median, 1) if median > 0 else None,
+    }
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, timeout=5).stdout.strip() or None
+    except Exception:
+        return None
+
+
+@contextlib.contextmanager
+def _offline():
+    # /act must never reach a real provider while benchmarking
+    saved = os.environ.get("LLM_OFFLINE")
+    os.environ["LLM_OFFLINE"] = "1"
+    try:
+        yield
+    finally:
+        if saved is None:
+            os.environ.pop("LLM_OFFLINE", None)
+        else:
+            os.environ["LLM_OFFLINE"] = saved
+
+
+def run_suite(scale: str = "small", only: Optional[List[str]] = None, seed: int = 0,
+              repeat: Optional[int] = None) -> Dict[str, Any]:
+    cfg = dict(SCALES[scale])
+    names = [n for n in _BENCHES if not only or any(n.startswith(o) for o in only)]
+    results: Dict[str, Any] = {}
+    with tempfile.TemporaryDirectory(prefix="shadowshift-bench-") as tmp, _offline():
+        ctx = Context(cfg, seed, Path(tmp))
+        try:
+            for name in names:
+                setup, threshold = _BENCHES[name]
+                fn, items, calls = setup(ctx)
+                res = measure(fn, items, calls, repeat or cfg["repeat"])
+                res["threshold"] = threshold if threshold is not None else DEFAULT_THRESHOLD
+                results[name] = res
+        finally:
+            ctx.close()
+    return {
+        "meta": {
+            "commit": _git_commit(),
+            "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "scale": scale,
+            "scale_config": cfg,
+            "seed": seed,
+        },
+        "results": results,
+    }
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], threshold: Optional[float] = None) -> List[Dict[str, Any]]:
+    """Median ratio per benchmark present in both runs; `regressed` when it exceeds 1 + threshold."""
+    rows = []
+    for name, cur in current["results"].items():
+        base = baseline.get("results", {}).get(name)
+        if not base or not base.get("median_ms"):
+            continue
+        limit = threshold if threshold is not None else cur.get("threshold", DEFAULT_THRESHOLD)
+        ratio = cur["median_ms"] / base["median_ms"]
+        rows.append({"name": name, "baseline_ms": base["median_ms"], "current_ms": cur["median_ms"],
+                     "ratio": round(ratio, 3), "threshold": limit, "regressed": ratio > 1 + limit})
+    return rows
+
+
+def _print_results(report: Dict[str, Any], rows: Optional[List[Dict[str, Any]]]) -> None:
+    by_name = {r["name"]: r for r in rows or []}
+    print(f"scale={report['meta']['scale']} commit={report['meta']['commit']}")
+    print(f"{'benchmark':<26}{'median ms':>12}{'p95 ms':>12}{'items/s':>14}{'vs base':>10}")
+    for name, r in report["results"].items():
+        cmp = by_name.get(name)
+        vs = f"{cmp['ratio']:.2f}x{' !' if cmp['regressed'] else ''}" if cmp else "-"
+        print(f"{name:<26}{r['median_ms']:>12.3f}{r['p95_ms']:>12.3f}{r['items_per_s'] or 0:>14.1f}{vs:>10}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="ShadowShift benchmark suite")
+    ap.add_argument("--scale", choices=sorted(SCALES), default="small")
+    ap.add_argument("--only", nargs="*", help="benchmark name prefixes to run")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--repeat", type=int, help="rounds per benchmark (default: per scale)")
+    ap.add_argument("--out", type=Path, help="write JSON results here")
+    ap.add_argument("--baseline", type=Path, help="JSON results of a previous run to compare against")
+    ap.add_argument("--threshold", type=float, help=f"allowed median slowdown, overrides per-benchmark values "
+                                                    f"(default {DEFAULT_THRESHOLD})")
+    args = ap.parse_args(argv)
+
+    report = run_suite(args.scale, args.only, args.seed, args.repeat)
+    rows = None
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+        if baseline.get("meta", {}).get("scale") != args.scale:
+            print(f"warning: baseline scale is {baseline.get('meta', {}).get('scale')}, this run is {args.scale}")
+        rows = compare(report, baseline, args.threshold)
+        report["comparison"] = {"baseline_commit": baseline.get("meta", {}).get("commit"), "rows": rows}
+    if args.out:
+        args.out.write_text(json.dumps(report, indent=2), encoding="utf-8")
+    _print_results(report, rows)
+    regressed = [r["name"] for r in rows or [] if r["regressed"]]
+    if regressed:
+        print("regressions:", ", ".join(regressed))
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
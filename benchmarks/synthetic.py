@@ -0,0 +1,103 @@
+"""
+Synthetic workloads for the benchmark suite.
+
+Generators are deterministic for a given seed, so runs on different commits measure the
+same inputs. Events use the raw `data/raw/events.jsonl` schema; states use the
+`build_state` format.
+"""
+
+import json
+import random
+from pathlib import Path
+from datetime import datetime, timedelta, timezone
+from typing import List, Dict, Any, Tuple
+
+import pandas as pd
+
+SOURCES = ("gmail", "discord", "github")
+ACTIONS = ("reply", "reply_urgent", "follow_up", "summarize")
+
+# phrases chosen so the labelling rules in build_dataset_fast produce every action
+_PHRASES = {
+    "reply_urgent": ["can you review the PR by EOD?", "need the ETA asap", "this is a blocker for the release",
+                     "deadline is today, please ship", "urgent: prod alerts firing"],
+    "reply": ["could you take a look?", "any update on this?", "ptal when you get a chance",
+              "can you share the numbers?", "please review the doc"],
+    "summarize": ["fixes #123 in the auth module", "closes #88 after the refactor", "resolved #7 with a config change"],
+    "plain": ["pushed fixes for auth", "thanks, looks good", "merged into main", "will check tomorrow",
+              "updated the migration script", "rebased on latest", "added tests for the parser"],
+}
+WORDS = ("api", "build", "cache", "deploy", "docs", "index", "latency", "metrics", "queue", "release",
+          "schema", "token", "worker", "retry", "timeout", "config", "staging", "rollback", "budget", "alert")
+
+
+def make_text(rng: random.Random) -> str:
+    kind = rng.choices(("reply_urgent", "reply", "summarize", "plain"), weights=(2, 3, 1, 4))[0]
+    tail = " ".join(rng.choice(WORDS) for _ in range(rng.randint(0, 8)))
+    return f"{rng.choice(_PHRASES[kind])} {tail}".strip()
+
+
+def make_events(threads: int, events_per_thread: int, seed: int = 0) -> List[Dict[str, Any]]:
+    """Raw events for `threads` threads of `events_per_thread` events each, oldest first."""
+    rng = random.Random(seed)
+    start = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    events = []
+    for t in range(threads):
+        ts = start + timedelta(minutes=rng.randint(0, 60 * 24 * 30))
+        for e in range(events_per_thread):
+            ts += timedelta(minutes=rng.randint(1, 600))
+            events.append({
+                "id": f"t{t}-e{e}",
+                "source": rng.choice(SOURCES),
+                "actor": "you" if rng.random() < 0.35 else "other",
+                "timestamp": ts.strftime("%Y-%m-%dT%H:%M:%SZ"),
+                "thread_id": f"t{t}",
+                "text": make_text(rng),
+            })
+    events.sort(key=lambda o: o["timestamp"])
+    return events
+
+
+def write_events(path: Path, events: List[Dict[str, Any]]) -> Path:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        for o in events:
+            f.write(json.dumps(o) + "\n")
+    return path
+
+
+def thread_frames(events: List[Dict[str, Any]]) -> List[pd.DataFrame]:
+    """Per-thread DataFrames shaped like `read_events()` output (the input of `build_state`)."""
+    df = pd.DataFrame(events)
+    df["ts"] = pd.to_datetime(df["timestamp"], utc=True)
+    return [g.sort_values("ts").reset_index(drop=True) for _, g in df.groupby("thread_id", sort=False)]
+
+
+def make_state(rng: random.Random, thread_id: str, lines: int = 5) -> str:
+    ts = datetime(2025, 1, 1) + timedelta(minutes=rng.randint(0, 60 * 24 * 90))
+    srcs = ", ".join(sorted(set(rng.choice(SOURCES) for _ in range(2))))
+    out = [f"[Thread: {thread_id} | Sources: {srcs}]"]
+    for _ in range(lines):
+        ts += timedelta(minutes=rng.randint(1, 600))
+        out.append(f"{ts:%Y-%m-%d %H:%M} {rng.choice(('you', 'other'))}: {make_text(rng)}")
+    return "\n".join(out)
+
+
+def make_dataset(rows: int, seed: int = 0) -> pd.DataFrame:
+    """Training frame with the `dataset.parquet` columns the model uses ("state", "action")."""
+    rng = random.Random(seed)
+    return pd.DataFrame({
+        "state": [make_state(rng, f"t{i}") for i in range(rows)],
+        "action": [rng.choice(ACTIONS) for _ in range(rows)],
+    })
+
+
+def make_states(n: int, seed: int = 1) -> List[str]:
+    rng = random.Random(seed)
+    return [make_state(rng, f"q{i}") for i in range(n)]
+
+
+def act_payload(events: List[Dict[str, Any]], thread_id: str) -> Tuple[str, List[Dict[str, Any]]]:
+    """(source, events) for an /act request built from one synthetic thread."""
+    rows = [o for o in events if o["thread_id"] == thread_id]
+    return rows[-1]["source"], rows
@@ -0,0 +1,62 @@
+import os
+import sys
+import json
+import time
+import subprocess
+
+from backend.app.services import adaptive_schedule
+
+
+def test_next_interval_bounds():
+    assert adaptive_schedule.next_interval(120, 5, False, 30, 1800) == 60
+    assert adaptive_schedule.next_interval(40, 5, False, 30, 1800) == 30
+    assert adaptive_schedule.next_interval(120, 0, False, 30, 1800) == 180
+    assert adaptive_schedule.next_interval(1500, 0, True, 30, 1800) == 1800
+
+
+def test_due_and_observe(tmp_path, monkeypatch):
+    monkeypatch.setenv("COORDINATION_DB_PATH", str(tmp_path / "coord.db"))
+    monkeypatch.setenv("POLL_EVERY_SECONDS", "100")
+    monkeypatch.setenv("POLL_MIN_SECONDS", "10")
+    monkeypatch.setenv("POLL_MAX_SECONDS", "1000")
+
+    assert adaptive_schedule.due(["gmail", "discord"], now=1000.0) == ["gmail", "discord"]
+    # dispatched sources are not due again until their interval passes
+    assert adaptive_schedule.due(["gmail", "discord"], now=1050.0) == []
+
+    busy = adaptive_schedule.observe("discord", new_events=3)
+    assert busy["interval"] == 50
+    adaptive_schedule.observe("gmail", new_events=0, error=True)
+    err = adaptive_schedule.observe("gmail", new_events=0, error=True)
+    assert err["interval"] == 400 and err["consecutive_errors"] == 2
+
+    snap = adaptive_schedule.snapshot()
+    assert snap["discord"]["interval"] == 50 and 0 < snap["discord"]["next_due_in"] <= 50
+
+
+
+_WORKER = """
+import sys, time, json
+from backend.app.services import adaptive_schedule
+start, me = float(sys.argv[1]), sys.argv[2]
+time.sleep(max(0.0, start - time.time()))
+handed = adaptive_schedule.due([f"s{i}" for i in range(10)], now=1000.0)
+for i in range(15):
+    adaptive_schedule.observe(f"{me}-{i}", new_events=1)
+print(json.dumps(handed))
+"""
+
+
+def test_worker_processes_do_not_lose_updates(tmp_path, monkeypatch):
+    monkeypatch.setenv("COORDINATION_DB_PATH", str(tmp_path / "coord.db"))
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join(p for p in sys.path if p)}
+    start = str(time.time() + 1.5)   # all processes hit the DB at the same moment
+    procs = [subprocess.Popen([sys.executable, "-c", _WORKER, start, f"w{n}"], env=env,
+                              stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True) for n in range(4)]
+    outs = [p.communicate(timeout=120) for p in procs]
+    assert all(p.returncode == 0 for p in procs), [err for _, err in outs]
+
+    handed = [s for out, _ in outs for s in json.loads(out.strip().splitlines()[-1])]
+    assert sorted(handed) == sorted(f"s{i}" for i in range(10))   # each due source dispatched once
+    snap = adaptive_schedule.snapshot()
+    assert all(f"w{n}-{i}" in snap for n in range(4) for i in range(15))
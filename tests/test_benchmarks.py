@@ -0,0 +1,34 @@
+from backend.app.api import app as api
+from backend.benchmarks import run, synthetic
+
+
+def test_synthetic_generators_are_deterministic():
+    a = synthetic.make_events(5, 4, seed=3)
+    assert a == synthetic.make_events(5, 4, seed=3)
+    assert len(a) == 20 and {o["thread_id"] for o in a} == {f"t{i}" for i in range(5)}
+    assert [o["timestamp"] for o in a] == sorted(o["timestamp"] for o in a)
+    ds = synthetic.make_dataset(40)
+    assert list(ds.columns) == ["state", "action"] and ds["state"].str.startswith("[Thread: ").all()
+
+
+def test_tiny_suite_runs_every_benchmark(monkeypatch):
+    monkeypatch.delenv("LLM_OFFLINE", raising=False)
+    monkeypatch.setattr(api, "MODEL", None)
+    monkeypatch.setattr(api, "READY", False)
+    report = run.run_suite("tiny", repeat=1)
+    assert set(report["results"]) == set(run._BENCHES)
+    assert api.MODEL is None and api.READY is False   # the API module is left as it was
+    for r in report["results"].values():
+        assert r["calls"] >= 1 and r["median_ms"] > 0 and r["threshold"] > 0
+    assert report["meta"]["scale"] == "tiny"
+
+
+def test_compare_flags_median_regressions():
+    base = {"results": {"a": {"median_ms": 10.0}, "b": {"median_ms": 10.0}}}
+    cur = {"results": {"a": {"median_ms": 12.0, "threshold": 0.25},
+                       "b": {"median_ms": 13.0, "threshold": 0.25},
+                       "new": {"median_ms": 1.0}}}
+    rows = {r["name"]: r for r in run.compare(cur, base)}
+    assert set(rows) == {"a", "b"}
+    assert not rows["a"]["regressed"] and rows["b"]["regressed"]
+    assert run.compare(cur, base, threshold=0.5)[1]["regressed"] is False
@@ -0,0 +1,74 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi.testclient import TestClient
+
+from backend.app.api import app as api
+from backend.app.services import event_store
+from backend.app.services.event_store import EventStore
+
+
+def _ev(i, thread, ts):
+    return {"id": f"e{i}", "thread_id": thread, "actor": "other", "text": f"msg {i}", "timestamp": ts, "source": "discord"}
+
+
+def test_dedup_thread_and_range_queries(tmp_path):
+    store = EventStore(tmp_path / "events.db")
+    now = datetime.now(timezone.utc)
+    batch = [_ev(1, "c1", now - timedelta(minutes=3)), _ev(2, "c2", now - timedelta(minutes=2)),
+             _ev(3, "c1", (now - timedelta(minutes=1)).isoformat())]
+
+    assert store.insert_events("discord", batch) == 3
+    assert store.insert_events("discord", batch) == 0
+    assert store.count("discord") == 3
+
+    assert [e["id"] for e in store.get_thread("discord", "c1")] == ["e1", "e3"]
+    assert store.get_thread("gmail", "c1") == []
+
+    recent = store.query(source="discord", since=now - timedelta(minutes=2, seconds=30))
+    assert [e["id"] for e in recent] == ["e3", "e2"]
+    assert [e["id"] for e in store.query(limit=1)] == ["e3"]
+
+
+def test_compaction_drops_events_past_retention(tmp_path):
+    store = EventStore(tmp_path / "events.db")
+    now = datetime.now(timezone.utc)
+    store.insert_events("gmail", [_ev(1, "t", now - timedelta(days=40)), _ev(2, "t", now)])
+    assert store.compact(retention_days=30) == 1
+    assert [e["id"] for e in store.get_thread("gmail", "t")] == ["e2"]
+
+
+def test_keyset_pagination_with_filters(tmp_path):
+    store = EventStore(tmp_path / "events.db")
+    now = datetime.now(timezone.utc)
+    store.insert_events("discord", [_ev(i, f"c{i % 2}", now - timedelta(minutes=i)) for i in range(7)])
+    store.insert_events("gmail", [_ev(100, "g", now)])
+
+    seen, cursor = [], None
+    while True:
+        page, cursor = store.page(source="discord", cursor=cursor, limit=3)
+        seen.extend(e["id"] for e in page)
+        if not cursor:
+            break
+    assert seen == [f"e{i}" for i in range(7)]
+
+    page, cursor = store.page(since=now - timedelta(minutes=1, seconds=30), limit=10)
+    assert {e["id"] for e in page} == {"e100", "e0", "e1"} and cursor is None
+
+    assert [e["id"] for e in store.get_thread("discord", "c0", last=2)] == ["e2", "e0"]
+
+
+def test_unparseable_bounds_are_rejected(tmp_path, monkeypatch):
+    store = EventStore(tmp_path / "events.db")
+    with pytest.raises(ValueError, match="invalid timestamp"):
+        store.page(since="yesterday")
+    with pytest.raises(ValueError):
+        store.query(until="soon")
+    # ingest stays lenient: an odd timestamp is stored as "now"
+    assert store.insert_events("discord", [_ev(1, "c", "not a date")]) == 1
+
+    monkeypatch.setattr(event_store, "_store", store)
+    client = TestClient(api.app)
+    r = client.get("/inbox", params={"since": "yesterday"})
+    assert r.status_code == 422 and "invalid timestamp" in r.json()["detail"]
+    assert client.get("/inbox", params={"since": "2024-01-01T00:00:00Z"}).status_code == 200
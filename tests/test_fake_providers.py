@@ -0,0 +1,76 @@
+import json
+import time
+import asyncio
+
+import pytest
+import requests
+
+from backend.benchmarks import fake_providers, loadgen
+from backend.app.services import discord_services, resilience, scheduler
+from backend.app.services.github_client import GitHubClient
+
+
+@pytest.fixture
+def server():
+    srv = fake_providers.start({p: {"latency_ms": 0, "jitter_ms": 0} for p in fake_providers.PROVIDERS})
+    yield srv
+    srv.stop()
+
+
+def test_discord_rate_limit_headers_and_429(server):
+    server.fake.configure({"discord": {"rate_limit": 2, "window_s": 30}})
+    url = f"{server.env()['DISCORD_API_BASE']}/channels/1001/messages?limit=5"
+    first, second, third = (requests.get(url) for _ in range(3))
+    assert first.status_code == 200 and first.headers["X-RateLimit-Remaining"] == "1"
+    assert second.headers["X-RateLimit-Remaining"] == "0" and float(second.headers["X-RateLimit-Reset-After"]) > 0
+    assert third.status_code == 429 and third.json()["retry_after"] > 0
+    # buckets are per channel
+    assert requests.get(url.replace("1001", "1002")).status_code == 200
+    assert server.fake.snapshot()["stats"]["discord"]["rate_limited"] == 1
+
+
+def test_discord_poll_honours_the_fetch_deadline(server, monkeypatch):
+    server.fake.configure({"discord": {"latency_ms": 2000}})
+    monkeypatch.setattr(discord_services, "DISCORD_API_BASE", server.env()["DISCORD_API_BASE"])
+    monkeypatch.setenv("DISCORD_BOT_TOKEN", "t")
+    monkeypatch.setenv("DISCORD_CHANNEL_IDS", "1001")
+    started = time.monotonic()
+    with resilience.deadline(0.3), pytest.raises(RuntimeError, match="discord channel fetches failed"):
+        asyncio.run(scheduler.fetch_new_discord())
+    assert time.monotonic() - started < 1.5
+
+
+def test_github_client_gets_free_304s_from_the_fake(server):
+    client = GitHubClient(base_url=server.env()["GITHUB_API_URL"])
+    first = client.get("repos/acme/api/commits", params={"per_page": 2})
+    assert first.status_code == 200 and len(first.json()) == 2 and "next" in first.links
+    remaining = client.rate_limit.snapshot()["resources"]["core"]["remaining"]
+    again = client.get("repos/acme/api/commits", params={"per_page": 2})
+    assert again.from_cache and again.json() == first.json()
+    assert client.rate_limit.snapshot()["resources"]["core"]["remaining"] == remaining
+    assert server.fake.snapshot()["stats"]["github"]["not_modified"] == 1
+
+
+def test_error_rate_and_openai_replies(server):
+    url = server.env()["OPENAI_BASE_URL"] + "/chat/completions"
+    ok = requests.post(url, json={"model": "m", "messages": [{"role": "user", "content": "hi"}]}).json()
+    draft = json.loads(ok["choices"][0]["message"]["content"])
+    assert draft["subject"] and draft["body"] and ok["usage"]["total_tokens"] > 0
+    server.fake.configure({"openai": {"error_rate": 1}})
+    assert requests.post(url, json={"messages": []}).status_code == 503
+    with pytest.raises(ValueError):
+        server.fake.configure({"openai": {"latency": 1}})
+
+
+def test_arrivals_add_messages_on_list(server):
+    server.fake.configure({"gmail": {"arrival_per_s": 1000}})
+    before = server.fake.snapshot()["messages"]["gmail"]
+    r = requests.get(server.env()["GMAIL_API_ENDPOINT"] + "gmail/v1/users/me/messages", params={"maxResults": 3})
+    assert len(r.json()["messages"]) == 3
+    assert server.fake.snapshot()["messages"]["gmail"] > before
+
+
+def test_percentiles():
+    assert loadgen.percentiles([]) == {"count": 0}
+    p = loadgen.percentiles([i / 1000 for i in range(1, 101)])
+    assert p["count"] == 100 and p["p50_ms"] == 51 and p["p99_ms"] == 100 and p["max_ms"] == 100
@@ -0,0 +1,99 @@
+import json
+import time
+
+import requests
+
+from backend.app.services.github_client import GitHubClient, RateLimitTracker
+
+LINK = '<https://api.github.com/repos/o/r/commits?page=2>; rel="next"'
+
+
+def _response(status, data=None, headers=None):
+    r = requests.Response()
+    r.status_code = status
+    r._content = json.dumps(data).encode() if data is not None else b""
+    r.headers = requests.structures.CaseInsensitiveDict(headers or {})
+    return r
+
+
+class _Session(requests.Session):
+    """Replays queued responses and records the headers of each GET."""
+
+    def __init__(self, *responses):
+        super().__init__()
+        self.responses = list(responses)
+        self.sent = []
+
+    def get(self, url, params=None, headers=None, timeout=None):
+        self.sent.append(dict(headers))
+        return self.responses.pop(0)
+
+
+def test_etag_revalidation_serves_the_cached_body_and_links():
+    session = _Session(_response(200, [1, 2], {"ETag": '"v1"', "Link": LINK}), _response(304, None, {}))
+    client = GitHubClient("https://api.github.com", session=session)
+
+    first = client.get("repos/o/r/commits", params={"page": 1})
+    assert first.json() == [1, 2] and not first.from_cache
+    assert first.links["next"]["url"].endswith("page=2")
+
+    again = client.get("repos/o/r/commits", params={"page": 1})
+    assert session.sent[1]["If-None-Match"] == '"v1"'
+    assert again.from_cache and again.status_code == 200 and again.json() == [1, 2]
+    # a 304 carries no Link header of its own: the cached one is used
+    assert again.links == first.links
+    stats = client.rate_limit.snapshot()
+    assert stats["requests"] == 2 and stats["not_modified"] == 1 and stats["served_from_cache"] == 1
+
+
+def test_last_modified_is_used_without_an_etag():
+    stamp = "Wed, 01 May 2024 10:00:00 GMT"
+    session = _Session(_response(200, {"a": 1}, {"Last-Modified": stamp}), _response(304))
+    client = GitHubClient("https://api.github.com", session=session)
+    client.get("repos/o/r")
+    assert client.get("repos/o/r").from_cache
+    assert session.sent[1]["If-Modified-Since"] == stamp and "If-None-Match" not in session.sent[1]
+
+
+def test_cache_is_lru_bounded():
+    session = _Session(_response(200, {"n": 0}, {"ETag": '"0"'}), _response(200, {"n": 1}, {"ETag": '"1"'}),
+                       _response(304), _response(200, {"n": 2}, {"ETag": '"2"'}))
+    client = GitHubClient("https://api.github.com", cache_size=2, session=session)
+    client.get("a")
+    client.get("b")
+    assert client.get("a").from_cache   # a is now the most recently used
+    client.get("c")                     # evicts b
+
+    assert [k[0].rsplit("/", 1)[1] for k in client._cache] == ["a", "c"]
+
+
+def test_rate_limit_tracker():
+    tracker = RateLimitTracker()
+    reset = int(time.time()) + 60
+    tracker.record({"X-RateLimit-Limit": "5000", "X-RateLimit-Remaining": "0", "X-RateLimit-Used": "5000",
+                    "X-RateLimit-Reset": str(reset)}, 200)
+    tracker.record({"X-RateLimit-Resource": "graphql", "X-RateLimit-Remaining": "10",
+                    "X-RateLimit-Reset": "1"}, 200)
+    tracker.record({}, 304)
+
+    assert tracker.exhausted() is True and tracker.exhausted("graphql") is False
+    snap = tracker.snapshot()
+    assert snap["requests"] == 3 and snap["not_modified"] == 1
+    assert snap["resources"]["core"] == {"limit": 5000, "remaining": 0, "used": 5000, "reset_at": reset}
+
+    tracker.record({"X-RateLimit-Remaining": "0", "X-RateLimit-Reset": str(int(time.time()) - 1)}, 200)
+    assert tracker.exhausted() is False   # the window has reset
+
+
+def test_exhausted_rate_limit_serves_from_cache_without_a_request():
+    exhausted = {"ETag": '"v1"', "Link": LINK, "X-RateLimit-Remaining": "0",
+                 "X-RateLimit-Reset": str(int(time.time()) + 60)}
+    session = _Session(_response(200, [1], exhausted), _response(403, {"message": "rate limited"}))
+    client = GitHubClient("https://api.github.com", session=session)
+    client.get("repos/o/r/commits")
+
+    cached = client.get("repos/o/r/commits")
+    assert cached.from_cache and cached.json() == [1] and cached.links["next"]
+    assert len(session.sent) == 1
+    # nothing cached for this URL: it still goes out
+    assert client.get("repos/o/r/pulls").status_code == 403
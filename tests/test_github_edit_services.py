@@ -0,0 +1,104 @@
+import base64
+
+import pytest
+
+from backend.app.services import github_edit_services as ges
+
+
+class _Resp:
+    def __init__(self, data):
+        self._data = data
+
+    def json(self):
+        return self._data
+
+    def raise_for_status(self):
+        pass
+
+
+class _FakeClient:
+    """Answers the repo, ref, commit, contents and Git Data calls and records them in order."""
+
+    def __init__(self, files):
+        self.files = files
+        self.calls = []
+
+    def get(self, url, headers=None, params=None):
+        self.calls.append(("GET", url, params))
+        if url.endswith("repos/o/r"):
+            return _Resp({"default_branch": "main"})
+        if url.endswith("git/ref/heads/main"):
+            return _Resp({"object": {"sha": "base-sha"}})
+        if url.endswith("git/commits/base-sha"):
+            return _Resp({"tree": {"sha": "base-tree"}})
+        path = url.split("/contents/", 1)[1]
+        if path not in self.files:
+            raise RuntimeError(f"404 {path}")
+        return _Resp({"encoding": "base64", "sha": f"sha-{path}",
+                      "content": base64.b64encode(self.files[path].encode()).decode()})
+
+    def request(self, method, url, headers=None, json=None):
+        self.calls.append((method, url, json))
+        kind = url.rsplit("/", 1)[1]
+        return _Resp({"trees": {"sha": "new-tree"}, "commits": {"sha": "new-commit"},
+                      "refs": {"ref": json.get("ref") if json else None}, "pulls": {"number": 7}}[kind])
+
+    def writes(self):
+        return [(m, u.split("repos/o/r/", 1)[1]) for m, u, _ in self.calls if m != "GET"]
+
+    def body(self, kind):
+        return next(j for m, u, j in self.calls if m == "POST" and u.endswith(kind))
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setenv("GITHUB_TOKEN", "t")
+    fake = _FakeClient({"a.py": "x = 1\n", "b.py": "y = 2\n", "c.py": "z = 3\n"})
+    monkeypatch.setattr(ges, "get_client", lambda: fake)
+    suggestions = {"a.py": "import os\nx = 2\n", "b.py": "import sys\ny = 3\n", "c.py": ""}
+    monkeypatch.setattr(ges, "suggest_code_changes_via_llm",
+                        lambda path, content, instructions: {"suggestion": suggestions[path], "model": "m1"})
+    return fake
+
+
+def test_batch_makes_one_commit_on_the_base(client):
+    out = ges.apply_llm_suggestions_batch(["a.py", "b.py"], "o/r", "tidy", new_branch="feat")
+
+    assert client.writes() == [("POST", "git/trees"), ("POST", "git/commits"), ("POST", "git/refs"), ("POST", "pulls")]
+    assert client.body("git/trees")["base_tree"] == "base-tree"
+    assert [t["path"] for t in client.body("git/trees")["tree"]] == ["a.py", "b.py"]
+    assert client.body("git/commits") == {"message": "chore: apply shadowshift suggestions to 2 file(s)",
+                                          "tree": "new-tree", "parents": ["base-sha"]}
+    assert client.body("git/refs") == {"ref": "refs/heads/feat", "sha": "new-commit"}
+    assert client.body("pulls")["head"] == "feat" and client.body("pulls")["base"] == "main"
+    # files are read at the commit the PR is based on
+    assert all(params == {"ref": "base-sha"} for m, u, params in client.calls if "/contents/" in u)
+    assert out["paths"] == ["a.py", "b.py"] and out["skipped"] == [] and out["failed"] == {}
+
+
+def test_batch_reports_skipped_and_failed_paths(client):
+    out = ges.apply_llm_suggestions_batch(["a.py", "c.py", "missing.py"], "o/r", {"a.py": "tidy"})
+
+    assert out["paths"] == ["a.py"] and out["skipped"] == ["c.py"]
+    assert "404 missing.py" in out["failed"]["missing.py"]
+    assert [t["path"] for t in client.body("git/trees")["tree"]] == ["a.py"]
+    body = client.body("pulls")["body"]
+    assert "Skipped (empty suggestion):\n- c.py" in body and "- missing.py: 404 missing.py" in body
+
+
+def test_batch_deduplicates_paths(client):
+    out = ges.apply_llm_suggestions_batch(["a.py", "b.py", "a.py"], "o/r", "tidy")
+
+    assert out["paths"] == ["a.py", "b.py"]
+    assert [t["path"] for t in client.body("git/trees")["tree"]] == ["a.py", "b.py"]
+    assert sum("/contents/a.py" in u for m, u, _ in client.calls) == 1
+
+
+def test_generate_pr_for_paths_reports_errors(client):
+    res = ges.generate_pr_for_paths(["c.py", "missing.py"], "tidy", repo_full="o/r")
+    assert res["ok"] is False and "no suggestions to apply" in res["error"]
+    assert client.writes() == []   # nothing is committed when every path is skipped or failed
+
+    res = ges.generate_pr_for_paths(["b.py"], "tidy", repo_full="o/r", pr_title="Tidy b")
+    assert res["ok"] is True and res["result"]["pull_request"] == {"number": 7}
+    assert client.body("git/commits")["message"] == "Tidy b"
@@ -0,0 +1,49 @@
+import json
+from pathlib import Path
+
+from backend.app.services import github_graphql
+
+FIXTURES = Path(__file__).resolve().parent / "fixtures" / "github_graphql"
+
+
+def _recorded(*names):
+    pages = [json.loads((FIXTURES / n).read_text()) for n in names]
+    queries = []
+
+    def post(query):
+        queries.append(query)
+        return pages[len(queries) - 1]
+
+    return post, queries
+
+
+def test_batched_fetch_emits_scheduler_events():
+    post, queries = _recorded("page1.json", "page2.json")
+    events = github_graphql.fetch_recent_activity(
+        repos=["acme/api", "acme/web"], newer_than_min=10 ** 7, post=post
+    )
+
+    assert len(queries) == 2
+    assert 'repository(owner: "acme", name: "api")' in queries[0]
+    assert 'repository(owner: "acme", name: "web")' in queries[0]
+    # second round only re-queries the connection that had more pages
+    assert 'after: "c-api-1"' in queries[1]
+    assert "acme/web" not in queries[1] and "pullRequests" not in queries[1]
+
+    by_id = {e["id"]: e for e in events}
+    assert set(by_id) == {"a1", "a0", "w1", "rv1", "rc1", "ic1"}
+    assert by_id["a1"]["thread_id"] == "acme/api" and by_id["a1"]["actor"] == "dana"
+    assert by_id["w1"]["actor"] == "Robin"
+    assert by_id["rc1"]["thread_id"] == "acme/api#7"
+    assert by_id["rc1"]["text"] == "app/retry.py: can you rename this?"
+    assert by_id["ic1"]["thread_id"] == "acme/api#12"
+    for e in events:
+        assert e["source"] == "github"
+        assert {"id", "thread_id", "actor", "text", "timestamp"} <= set(e)
+    assert github_graphql.get_last_rate_limit()["remaining"] == 4998
+
+
+def test_old_activity_is_filtered_by_cutoff():
+    post, queries = _recorded("page1.json")
+    events = github_graphql.fetch_recent_activity(repos=["acme/api"], newer_than_min=1, post=post, max_pages=1)
+    assert events == []
@@ -0,0 +1,89 @@
+import json
+import time
+import threading
+from datetime import datetime, timezone
+
+import pytest
+import requests
+
+from backend.app.services import github_services
+from backend.app.services.github_client import GitHubClient
+
+API = "https://api.github.com"
+
+
+def _commit(sha, minutes_ago=1):
+    ts = datetime.fromtimestamp(time.time() - minutes_ago * 60, timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+    return {"sha": sha, "commit": {"message": f"msg {sha}", "author": {"name": "dev", "date": ts}}}
+
+
+class _Session(requests.Session):
+    """Two pages of commits per repo with ETags; a repeated conditional GET gets a 304."""
+
+    def __init__(self, pages):
+        super().__init__()
+        self.pages = pages   # repo -> [page1 commits, page2 commits]
+        self.calls = []
+        self.lock = threading.Lock()
+        self.inflight = self.max_inflight = 0
+
+    def get(self, url, params=None, headers=None, timeout=None):
+        with self.lock:
+            self.calls.append((url, params))
+            self.inflight += 1
+            self.max_inflight = max(self.max_inflight, self.inflight)
+        time.sleep(0.05)
+        repo = url.split("/repos/", 1)[1].split("/commits", 1)[0]
+        page = 2 if "page=2" in url else 1
+        r = requests.Response()
+        r.headers = requests.structures.CaseInsensitiveDict({"ETag": f'"{repo}-{page}"'})
+        if (headers or {}).get("If-None-Match") == f'"{repo}-{page}"':
+            r.status_code, r._content = 304, b""
+        else:
+            r.status_code, r._content = 200, json.dumps(self.pages[repo][page - 1]).encode()
+            if page == 1:
+                r.headers["Link"] = f'<{API}/repos/{repo}/commits?per_page=2&page=2>; rel="next"'
+        with self.lock:
+            self.inflight -= 1
+        return r
+
+
+@pytest.fixture
+def session(monkeypatch):
+    monkeypatch.setenv("GITHUB_TOKEN", "t")
+    monkeypatch.setenv("GITHUB_REPOS", "o/a, o/b")
+    s = _Session({"o/a": [[_commit("a1"), _commit("a2")], [_commit("a3"), _commit("old", minutes_ago=5000)]],
+                  "o/b": [[_commit("b1"), _commit("b2")], [_commit("b3")]]})
+    client = GitHubClient(API, session=s)
+    monkeypatch.setattr(github_services, "get_client", lambda: client)
+    return s
+
+
+def test_fetch_follows_links_and_applies_the_cutoff(session):
+    events = github_services.fetch_recent_commits(limit_per_repo=10)
+
+    assert sorted(e["id"] for e in events) == ["a1", "a2", "a3", "b1", "b2", "b3"]
+    first = [p for u, p in session.calls if p]
+    assert all(p["per_page"] == 10 and p["since"].endswith(":00:00Z") for p in first)
+    # the next link carries its own query; no params are re-sent with it
+    assert all(p is None for u, p in session.calls if "page=2" in u)
+    assert session.max_inflight == 2   # repos are fetched concurrently
+
+    stats = github_services.get_repo_stats()
+    assert stats["o/a"]["pages"] == 2 and stats["o/a"]["commits"] == 3 and stats["o/a"]["error"] is None
+
+
+def test_cached_pages_still_paginate(session):
+    github_services.fetch_recent_commits(limit_per_repo=10)
+    events = github_services.fetch_recent_commits(limit_per_repo=10)
+
+    # every page is a 304 now; the cached Link keeps pagination going
+    assert sorted(e["id"] for e in events) == ["a1", "a2", "a3", "b1", "b2", "b3"]
+    assert github_services.get_repo_stats()["o/b"]["cached_pages"] == 2
+
+
+def test_limit_stops_pagination(session):
+    events = github_services.fetch_recent_commits(limit_per_repo=2)
+    assert sorted(e["id"] for e in events) == ["a1", "a2", "b1", "b2"]
+    assert not any("page=2" in u for u, _ in session.calls)
+    assert github_services.get_repo_stats()["o/a"]["pages"] == 1
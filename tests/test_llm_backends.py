@@ -0,0 +1,71 @@
+import threading
+
+import pytest
+
+from backend.app.services import llm
+
+
+class _Resp:
+    def __init__(self, data):
+        self._data = data
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self._data
+
+
+class _FakeServer:
+    def __init__(self):
+        self.calls = []
+
+    def post(self, url, json, timeout):
+        self.calls.append(json)
+        # answer out of order: the backend must map choices back by index
+        choices = [{"index": i, "text": f'{{"body": "reply {i}"}}'} for i in range(len(json["prompt"]))]
+        return _Resp({"choices": choices[::-1]})
+
+
+def test_local_backend_batches_concurrent_requests():
+    server = _FakeServer()
+    backend = llm.LocalBackend(base_url="http://local/v1", model="tiny", batch_size=8,
+                               batch_wait_ms=200, session=server)
+    results = {}
+
+    def call(n):
+        resp = backend.chat("tiny", [{"role": "system", "content": "sys"}, {"role": "user", "content": f"u{n}"}])
+        results[n] = resp["choices"][0]["message"]["content"]
+
+    threads = [threading.Thread(target=call, args=(n,)) for n in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(server.calls) == 1
+    prompts = server.calls[0]["prompt"]
+    assert len(prompts) == 4 and prompts[0].endswith("<|im_start|>assistant\n")
+    for n in range(4):
+        i = next(j for j, p in enumerate(prompts) if f"u{n}<|im_end|>" in p)
+        assert results[n] == f'{{"body": "reply {i}"}}'
+    assert backend.info()["max_batch"] == 4
+
+
+def test_drafts_go_through_the_selected_backend(monkeypatch):
+    server = _FakeServer()
+    monkeypatch.delenv("LLM_OFFLINE", raising=False)
+    llm.set_backend(llm.LocalBackend(model="tiny", batch_wait_ms=0, session=server))
+    try:
+        draft = llm.draft_message_from_state("[Thread: t | Sources: discord]\nhi", platform="discord")
+    finally:
+        llm.set_backend(None)
+    assert draft == {"subject": "", "body": "reply 0", "model": "tiny"}
+    assert server.calls[0]["model"] == "tiny"
+
+
+def test_unknown_backend_is_rejected(monkeypatch):
+    monkeypatch.setenv("LLM_BACKEND", "nope")
+    llm.set_backend(None)
+    with pytest.raises(RuntimeError):
+        llm.get_backend()
@@ -0,0 +1,72 @@
+import threading
+import time
+
+import pytest
+
+from backend.app.services import llm
+
+
+class _SlowClient:
+    def __init__(self, fail=False):
+        self.calls = 0
+        self.fail = fail
+        outer = self
+
+        class _Completions:
+            def create(self, model, messages, **kwargs):
+                outer.calls += 1
+                time.sleep(0.2)
+                if outer.fail:
+                    raise RuntimeError("boom")
+                return {"choices": [{"message": {"content": '{"body": "ok"}'}}]}
+
+        self.chat = type("Chat", (), {"completions": _Completions()})()
+
+
+@pytest.fixture
+def client(monkeypatch):
+    c = _SlowClient()
+    monkeypatch.delenv("LLM_OFFLINE", raising=False)
+    monkeypatch.setattr(llm, "get_client", lambda: c)
+    return c
+
+
+def _run(n, *args):
+    results, errors = [], []
+
+    def call():
+        try:
+            results.append(llm._chat_json(*args, retries=0))
+        except Exception as ex:
+            errors.append(ex)
+
+    threads = [threading.Thread(target=call) for _ in range(n)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return results, errors
+
+
+def test_identical_concurrent_calls_share_one_request(client):
+    before = llm.get_llm_stats(recent=0)["coalescing"]
+    results, errors = _run(5, "sys", "same state", "m")
+    assert not errors and client.calls == 1
+    assert results == [{"body": "ok"}] * 5
+    results[0]["body"] = "mutated"
+    assert results[1]["body"] == "ok"
+    after = llm.get_llm_stats(recent=0)["coalescing"]
+    assert after["misses"] - before["misses"] == 1 and after["hits"] - before["hits"] == 4
+    assert after["in_flight"] == 0
+
+
+def test_different_prompts_are_not_coalesced(client):
+    _run(1, "sys", "state a", "m")
+    _run(1, "sys", "state b", "m")
+    assert client.calls == 2
+
+
+def test_errors_fan_out_to_waiters(client):
+    client.fail = True
+    results, errors = _run(3, "sys", "failing state", "m")
+    assert client.calls == 1 and not results and len(errors) == 3
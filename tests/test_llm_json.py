@@ -0,0 +1,52 @@
+import json
+import random
+import string
+import time
+
+from backend.app.services import llm
+
+_NOISE = string.ascii_letters + " \n\t.,:;!?()[]'"
+
+
+def _random_value(rng, depth=0):
+    kind = rng.randrange(6 if depth < 3 else 3)
+    if kind == 0:
+        # strings with braces, quotes and escapes inside
+        return "".join(rng.choice('ab {}"\\\n:,[]') for _ in range(rng.randrange(12)))
+    if kind == 1:
+        return rng.randrange(-1000, 1000)
+    if kind == 2:
+        return rng.choice([True, False, None])
+    if kind == 3:
+        return [_random_value(rng, depth + 1) for _ in range(rng.randrange(4))]
+    return {f"k{i}": _random_value(rng, depth + 1) for i in range(rng.randrange(4))}
+
+
+def test_extracts_first_object_from_noisy_replies():
+    rng = random.Random(1234)
+    for _ in range(500):
+        obj = {"body": _random_value(rng), "extra": _random_value(rng)}
+        prefix = "".join(rng.choice(_NOISE) for _ in range(rng.randrange(40)))
+        suffix = "".join(rng.choice(_NOISE + "}") for _ in range(rng.randrange(40)))
+        text = prefix + json.dumps(obj, indent=rng.choice([None, 2])) + suffix
+        assert llm._extract_json_from_text(text) == obj
+
+
+def test_handles_fences_trailing_commas_and_garbage():
+    assert llm._extract_json_from_text('```json\n{"subject": "s", "body": "b"}\n```') == {"subject": "s", "body": "b"}
+    assert llm._extract_json_from_text('Sure! {"body": "x", "tags": [1, 2,],}') == {"body": "x", "tags": [1, 2]}
+    assert llm._extract_json_from_text('{not json} then {"body": "ok"}') == {"body": "ok"}
+    assert llm._extract_json_from_text('{"body": "unterminated') is None
+    assert llm._extract_json_from_text("no braces at all") is None
+    assert llm._extract_json_from_text("") is None
+
+
+def test_scanner_is_linear_on_long_and_pathological_input():
+    big = "x" * 500_000 + json.dumps({"body": "y" * 100_000}) + "z" * 500_000
+    unbalanced = "{" * 200_000
+    quotes = '{"a": "' + '\\"' * 200_000 + '"}'
+    started = time.perf_counter()
+    assert llm._extract_json_from_text(big) == {"body": "y" * 100_000}
+    assert llm._extract_json_from_text(unbalanced) is None
+    assert llm._extract_json_from_text(quotes) == {"a": '"' * 200_000}
+    assert time.perf_counter() - started < 2.0
@@ -0,0 +1,54 @@
+import threading
+
+import pytest
+
+from backend.app.services import metrics
+
+
+def test_histogram_buckets_are_cumulative_in_exposition():
+    h = metrics.histogram("test_latency_seconds", "test", ("op",), buckets=(0.1, 1.0))
+    for v in (0.05, 0.5, 0.5, 5.0):
+        h.observe(v, op="x")
+    text = metrics.render()
+    assert '# TYPE test_latency_seconds histogram' in text
+    assert 'test_latency_seconds_bucket{op="x",le="0.1"} 1' in text
+    assert 'test_latency_seconds_bucket{op="x",le="1"} 3' in text
+    assert 'test_latency_seconds_bucket{op="x",le="+Inf"} 4' in text
+    assert 'test_latency_seconds_count{op="x"} 4' in text
+
+
+def test_counters_are_thread_safe_and_registry_is_shared():
+    c = metrics.counter("test_events_total", "test", ("kind",))
+    assert metrics.counter("test_events_total", "test", ("kind",)) is c
+    with pytest.raises(ValueError):
+        metrics.histogram("test_events_total", "test", ("kind",))
+
+    def work():
+        for _ in range(10_000):
+            c.inc(kind="a")
+
+    threads = [threading.Thread(target=work) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert c.value(kind="a") == 40_000
+
+
+def test_timed_decorator_and_label_escaping():
+    @metrics.timed("test_fn_seconds", "test", fn="quote\"d")
+    def f():
+        return 42
+
+    assert f() == 42
+    assert metrics.histogram("test_fn_seconds", "test", ("fn",)).snapshot(fn='quote"d')["count"] == 1
+    assert 'fn="quote\\"d"' in metrics.render()
+
+
+def test_cache_counter_is_shared():
+    from backend.app.api import app  # noqa: F401  (registers every cache user)
+    from backend.app.services import llm, github_client  # noqa: F401
+    metrics.CACHE_REQUESTS.inc(cache="thread_draft", result="hit")
+    text = metrics.render()
+    assert text.count("# TYPE shadowshift_cache_requests_total counter") == 1
+    assert 'shadowshift_cache_requests_total{cache="thread_draft",result="hit"}' in text
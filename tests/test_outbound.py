@@ -0,0 +1,100 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from fastapi.testclient import TestClient
+
+from backend.app.api import app as api
+from backend.app.services import outbound, discord_services
+
+
+@pytest.fixture
+def sent(tmp_path, monkeypatch):
+    calls = []
+    lock = threading.Lock()
+
+    def fake_send(channel_id, content):
+        with lock:
+            calls.append((channel_id, content))
+            n = len(calls)
+        if content == "fail":
+            raise RuntimeError("discord down")
+        time.sleep(0.01)
+        return {"id": f"m{n}"}
+
+    monkeypatch.setattr(outbound, "_store", outbound.IdempotencyStore(tmp_path / "outbound.db"))
+    monkeypatch.setattr(outbound, "_PACERS", {"discord": outbound.Pacer(0), "gmail": outbound.Pacer(0)})
+    monkeypatch.setattr(discord_services, "send_message", fake_send)
+    return calls
+
+
+def _msg(content="hi", key=None):
+    return {"provider": "discord", "channel_id": "c1", "content": content, "idempotency_key": key}
+
+
+def test_idempotency_key_prevents_double_send(sent):
+    first = outbound.send(_msg(key="k1"))
+    again = outbound.send(_msg(key="k1"))
+    assert first["message_id"] == again["message_id"] == "m1"
+    assert not first["replayed"] and again["replayed"] and len(sent) == 1
+
+    with pytest.raises(outbound.IdempotencyConflict):
+        outbound.send(_msg("different text", key="k1"))
+    outbound.send(_msg())
+    outbound.send(_msg())
+    assert len(sent) == 3   # no key: every call sends
+
+
+def test_failed_send_can_be_retried_with_the_same_key(sent):
+    with pytest.raises(RuntimeError):
+        outbound.send(_msg("fail", key="k2"))
+    outbound.get_store().begin("k3", "fp")
+    with pytest.raises(outbound.IdempotencyConflict):   # still in flight
+        outbound.get_store().begin("k3", "fp")
+    with pytest.raises(RuntimeError):
+        outbound.send(_msg("fail", key="k2"))
+    assert len(sent) == 2
+
+
+def test_bulk_send_reports_each_message(sent):
+    msgs = [_msg(f"hello {i}", key=f"b:{i}") for i in range(10)] + [_msg("fail"), {"provider": "discord"}]
+    out = asyncio.run(outbound.send_bulk(msgs, concurrency=4))
+    assert out["sent"] == 10 and out["failed"] == 2
+    assert [r["index"] for r in out["results"]] == list(range(12))
+    assert "missing channel_id" in out["results"][-1]["error"]
+
+    replay = asyncio.run(outbound.send_bulk(msgs[:10]))
+    assert all(r["replayed"] for r in replay["results"]) and len(sent) == 11
+
+
+def test_bulk_route_validates_concurrency(sent):
+    client = TestClient(api.app)
+    msgs = [{"provider": "discord", "channel_id": "c1", "content": "hi"}]
+    for bad in (0, -1, 65):
+        assert client.post("/send/bulk", json={"messages": msgs, "concurrency": bad}).status_code == 422
+    r = client.post("/send/bulk", json={"messages": msgs, "concurrency": 2})
+    assert r.status_code == 200 and r.json()["sent"] == 1
+
+
+def test_discord_route_without_a_token_is_a_400(sent, monkeypatch):
+    client = TestClient(api.app)
+    body, headers = {"channel_id": "c1", "content": "hi"}, {"Idempotency-Key": "d1"}
+    monkeypatch.delenv("DISCORD_BOT_TOKEN", raising=False)
+    r = client.post("/send/discord", json=body, headers=headers)
+    assert r.status_code == 400 and "DISCORD_BOT_TOKEN" in r.json()["detail"]
+    assert sent == []
+
+    # the key was never reserved: the same request goes through once configured
+    monkeypatch.setenv("DISCORD_BOT_TOKEN", "t")
+    r = client.post("/send/discord", json=body, headers=headers)
+    assert r.status_code == 200 and r.json()["replayed"] is False and len(sent) == 1
+
+
+def test_pacer_spaces_calls():
+    pacer = outbound.Pacer(50)
+    started = time.monotonic()
+    for _ in range(6):
+        pacer.wait()
+    assert time.monotonic() - started >= 0.09
@@ -0,0 +1,146 @@
+import time
+import threading
+
+from fastapi.testclient import TestClient
+
+from backend.app.api import app as api
+from backend.app.services import coordination, poll_jobs, scheduler, work_queue
+
+
+def _setup(monkeypatch, tmp_path, mode="inprocess"):
+    monkeypatch.setenv("COORDINATION_DB_PATH", str(tmp_path / "coord.db"))
+    monkeypatch.setenv("POLL_MODE", mode)
+    monkeypatch.setattr(scheduler, "_LEASE", None)
+    monkeypatch.setattr(work_queue, "_queue", work_queue.WorkQueue(tmp_path / "queue.db"))
+    release, calls = threading.Event(), []
+
+    async def fake_poll(sources=None):
+        calls.append(list(sources or scheduler.SOURCES))
+        release.wait(5)
+        return {"polled": sources}
+
+    monkeypatch.setattr(scheduler, "poll", fake_poll)
+    return release, calls
+
+
+def test_trigger_joins_the_poll_in_flight(tmp_path, monkeypatch):
+    release, calls = _setup(monkeypatch, tmp_path)
+    first = poll_jobs.trigger()
+    second = poll_jobs.trigger(sources=["gmail"])
+    assert second["joined"] is True and second["job_id"] == first["job_id"]
+
+    release.set()
+    job = poll_jobs._wait(first["job_id"], interval=0.01)
+    assert job["status"] == "done" and job["result"] == {"polled": list(scheduler.SOURCES)}
+    assert len(calls) == 1
+    assert poll_jobs.trigger(wait=True)["joined"] is False   # nothing in flight any more
+
+
+def test_trigger_joins_only_a_poll_covering_its_sources(tmp_path, monkeypatch):
+    release, calls = _setup(monkeypatch, tmp_path)
+    gmail = poll_jobs.trigger(sources=["gmail"])
+    while not calls:   # running, so it can no longer be widened
+        time.sleep(0.01)
+    discord = poll_jobs.trigger(sources=["discord"])
+    assert discord["joined"] is False and discord["status"] == "queued"
+    assert poll_jobs.trigger(sources=["gmail"])["job_id"] == gmail["job_id"]
+    # a queued poll is widened rather than queueing a third one
+    github = poll_jobs.trigger(sources=["github"])
+    assert github["joined"] is True and github["job_id"] == discord["job_id"]
+    assert github["sources"] == ["discord", "github"]
+
+    release.set()
+    assert poll_jobs._wait(discord["job_id"], interval=0.01)["status"] == "done"
+    assert calls == [["gmail"], ["discord", "github"]]
+
+
+def test_runner_survives_a_job_that_cannot_be_recorded(tmp_path, monkeypatch):
+    release, calls = _setup(monkeypatch, tmp_path)
+    release.set()
+    real_run = poll_jobs._run
+    runs = []
+
+    def flaky_run(job_id, sources):
+        runs.append(job_id)
+        if len(runs) == 1:
+            raise RuntimeError("database is locked")
+        real_run(job_id, sources)
+
+    monkeypatch.setattr(poll_jobs, "_run", flaky_run)
+    first = poll_jobs._wait(poll_jobs.trigger()["job_id"], interval=0.01)
+    assert first["status"] == "failed" and "database is locked" in first["error"]
+    # the runner was released: the next trigger is served
+    assert poll_jobs.trigger(wait=True)["status"] == "done"
+    assert len(runs) == 2 and len(calls) == 1
+
+
+def test_follower_queues_and_the_leader_runs(tmp_path, monkeypatch):
+    release, calls = _setup(monkeypatch, tmp_path)
+    release.set()
+    leader = coordination.LeaderLease("poller", ttl=30, holder="leader")
+    follower = coordination.LeaderLease("poller", ttl=30, holder="follower")
+    assert leader.try_acquire() and not follower.try_acquire()
+
+    monkeypatch.setattr(scheduler, "_LEASE", follower)
+    job = poll_jobs.trigger(sources=["discord"])
+    assert job["status"] == "queued" and calls == []
+    # any worker answers from the shared DB
+    assert poll_jobs.get_job(job["job_id"])["sources"] == ["discord"]
+
+    monkeypatch.setattr(scheduler, "_LEASE", leader)
+    poll_jobs.kick()
+    assert poll_jobs._wait(job["job_id"], interval=0.01)["status"] == "done"
+    assert calls == [["discord"]]
+
+
+def test_leader_requeues_a_job_orphaned_by_a_lost_runner(tmp_path, monkeypatch):
+    release, calls = _setup(monkeypatch, tmp_path)
+    release.set()
+    with coordination.transaction() as conn:
+        conn.execute("INSERT INTO poll_jobs (id, status, sources, runner, created_at, started_at) "
+                     "VALUES ('orphan', 'running', '[\"gmail\"]', 'old-leader:1', ?, ?)", (time.time(), time.time()))
+    leader = coordination.LeaderLease("poller", ttl=30, holder="leader")
+    assert leader.try_acquire()
+    monkeypatch.setattr(scheduler, "_LEASE", leader)
+
+    poll_jobs.kick()
+    job = poll_jobs._wait("orphan", interval=0.01)
+    assert job["status"] == "done" and job["runner"] == coordination.worker_id()
+    assert calls == [["gmail"]]
+
+
+def test_wait_gives_up_at_the_deadline(tmp_path, monkeypatch):
+    _setup(monkeypatch, tmp_path)
+    leader = coordination.LeaderLease("poller", ttl=30, holder="leader")
+    follower = coordination.LeaderLease("poller", ttl=30, holder="follower")
+    assert leader.try_acquire() and not follower.try_acquire()
+    monkeypatch.setattr(scheduler, "_LEASE", follower)
+
+    job = poll_jobs.trigger(sources=["gmail"])   # nobody runs it
+    job = poll_jobs._wait(job["job_id"], interval=0.01, timeout=0.05)
+    assert job["status"] == "failed" and job["error"] == "timed out"
+
+
+def test_worker_mode_handle_survives_dedup(tmp_path, monkeypatch):
+    _setup(monkeypatch, tmp_path, mode="worker")
+    first = poll_jobs.trigger(sources=["gmail"])
+    second = poll_jobs.trigger(sources=["gmail"])   # deduplicated against the pending fetch
+    assert first["status"] == second["status"] == "queued"
+    assert second["fetches"]["gmail"]["id"] == first["fetches"]["gmail"]["id"]
+
+    q = work_queue.get_queue()
+    job = q.claim("fetch", "w")
+    q.ack(job["id"], "w", {"new": 0})
+    assert poll_jobs.get_job(second["job_id"])["status"] == "done"
+
+
+def test_poll_routes(tmp_path, monkeypatch):
+    release, _ = _setup(monkeypatch, tmp_path)
+    release.set()
+    client = TestClient(api.app)
+    r = client.post("/poll/now")
+    assert r.status_code == 202
+    job_id = r.json()["job_id"]
+    poll_jobs._wait(job_id, interval=0.01)
+    assert client.get(f"/poll/jobs/{job_id}").json()["status"] == "done"
+    assert client.get("/poll/jobs/nope").status_code == 404
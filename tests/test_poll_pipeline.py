@@ -0,0 +1,94 @@
+import pytest
+
+from backend.app.services import adaptive_schedule, event_store, poll_pipeline, scheduler, work_queue
+
+
+class _FakeModel:
+    def batch_predict(self, states):
+        return [{"action": "reply" if "t-reply" in s else "summarize", "confidence": 0.9} for s in states]
+
+
+def _events(tid, n=1):
+    return [{"id": f"{tid}-{i}", "thread_id": tid, "actor": "other", "text": f"hi {i}",
+             "timestamp": f"2024-01-01T00:0{i}:00Z", "source": "discord"} for i in range(n)]
+
+
+@pytest.fixture
+def pipeline(tmp_path, monkeypatch):
+    monkeypatch.setenv("COORDINATION_DB_PATH", str(tmp_path / "coord.db"))
+    monkeypatch.setattr(event_store, "_store", event_store.EventStore(tmp_path / "events.db"))
+    monkeypatch.setattr(work_queue, "_queue", work_queue.WorkQueue(tmp_path / "queue.db"))
+    monkeypatch.setattr(scheduler, "_MODEL", _FakeModel())
+    fetched, drafted = {"discord": _events("t-reply", 2) + _events("t-sum")}, []
+
+    async def fetch(source):
+        if isinstance(fetched.get(source), Exception):
+            raise fetched[source]
+        return fetched.get(source, [])
+
+    def draft(source, state):
+        drafted.append(state)
+        return {"subject": "", "body": "ok", "model": "fake"}
+
+    monkeypatch.setattr(scheduler, "fetch_source", fetch)
+    monkeypatch.setattr(scheduler, "draft_for_state", draft)
+    return fetched, drafted
+
+
+def test_drain_runs_every_stage_and_skips_unchanged_threads(pipeline):
+    fetched, drafted = pipeline
+    poll_pipeline.enqueue_poll(["discord"])
+    assert poll_pipeline.drain() == 4   # fetch, normalize, classify (both threads), 1 draft
+
+    assert len(drafted) == 1 and "t-reply" in drafted[0]
+    store = event_store.get_store()
+    assert store.get_draft("discord", "t-reply")["body"] == "ok"
+    assert set(store.get_fingerprints("discord", ["t-reply", "t-sum"])) == {"t-reply", "t-sum"}
+    assert adaptive_schedule.snapshot()["discord"]["last_new"] == 3
+
+    # nothing new: both threads stop at normalize
+    poll_pipeline.enqueue_poll(["discord"])
+    assert poll_pipeline.drain() == 2
+    assert len(drafted) == 1
+    assert work_queue.get_queue().stats()["normalize"] == {"done": 2}
+    assert work_queue.get_queue().stats()["classify"] == {"done": 1}
+
+
+def test_classify_batches_a_fetch_and_drafts_within_the_budget(pipeline, monkeypatch):
+    fetched, drafted = pipeline
+    fetched["discord"] = _events("t-reply-1") + _events("t-reply-2") + _events("t-reply-3") + _events("t-sum")
+    monkeypatch.setenv("DRAFT_BUDGET_PER_POLL", "2")
+    batches = []
+
+    class _CountingModel(_FakeModel):
+        def batch_predict(self, states):
+            batches.append(len(states))
+            return super().batch_predict(states)
+
+    monkeypatch.setattr(scheduler, "_MODEL", _CountingModel())
+
+    poll_pipeline.enqueue_poll(["discord"])
+    poll_pipeline.drain(["fetch", "normalize", "classify"])
+    assert batches == [4]   # one model call for the whole fetch
+    assert work_queue.get_queue().stats()["draft"] == {"ready": 2}
+
+    poll_pipeline.drain()
+    assert len(drafted) == 2
+    # the deferred reply and the summarized thread: only the latter is fingerprinted
+    fps = event_store.get_store().get_fingerprints("discord", ["t-reply-1", "t-reply-2", "t-reply-3", "t-sum"])
+    assert "t-sum" in fps and len(fps) == 3
+
+    poll_pipeline.enqueue_poll(["discord"])
+    poll_pipeline.drain()
+    assert len(drafted) == 3   # the deferred thread is drafted on the next poll
+
+
+def test_failed_fetch_is_retried_and_backs_off(pipeline):
+    fetched, _ = pipeline
+    fetched["discord"] = RuntimeError("discord down")
+    ids = poll_pipeline.enqueue_poll(["discord"])
+
+    poll_pipeline.drain(["fetch"])
+    job = work_queue.get_queue().get(ids["discord"])
+    assert job["status"] == "ready" and job["attempts"] == 1 and "discord down" in job["error"]
+    assert adaptive_schedule.snapshot()["discord"]["consecutive_errors"] == 1
@@ -0,0 +1,49 @@
+from backend.app.services import prompts, llm
+
+
+def _thread(n, text="hello there"):
+    lines = ["[Thread: t1 | Sources: discord]"]
+    lines += [f"2024-01-01 00:{i:02d} other: {text} {i}" for i in range(n)]
+    return "\n".join(lines)
+
+
+def test_fit_state_drops_oldest_messages_first():
+    state = _thread(40)
+    out = prompts.fit_state(state, budget=60)
+    assert prompts.count_tokens(out) <= 60
+    assert out.splitlines()[0].startswith("[Thread: t1") and "older message(s) omitted" in out
+    assert out.endswith("hello there 39")
+    assert prompts.fit_state(state, budget=10_000) == state
+
+
+def test_fit_state_cuts_long_text_in_the_middle():
+    text = "HEAD " + "x" * 40_000 + " INSTRUCTIONS: fix it"
+    out = prompts.fit_state(text, budget=200)
+    assert out.startswith("HEAD") and out.endswith("INSTRUCTIONS: fix it")
+    assert "tokens truncated" in out and prompts.count_tokens(out) <= 220
+
+
+def test_draft_prompts_share_a_stable_prefix_and_record_usage(monkeypatch):
+    sent = []
+
+    class _Completions:
+        def create(self, model, messages, **kwargs):
+            sent.append(messages)
+            return {"choices": [{"message": {"content": '{"body": "ok"}'}}],
+                    "usage": {"prompt_tokens": 120, "completion_tokens": 7}}
+
+    class _Client:
+        chat = type("Chat", (), {"completions": _Completions()})()
+
+    monkeypatch.delenv("LLM_OFFLINE", raising=False)
+    monkeypatch.setattr(llm, "get_client", lambda: _Client())
+    before = llm.get_llm_stats(recent=0)["totals"].get("message:m", {}).get("calls", 0)
+
+    llm.draft_message_from_state(_thread(2), platform="discord", model="m")
+    llm.draft_message_from_state(_thread(3, "other text"), platform="discord", model="m", state_budget=50)
+
+    assert sent[0][0] == sent[1][0]
+    assert sent[0][1]["content"].split("STATE:")[0] == sent[1][1]["content"].split("STATE:")[0]
+    stats = llm.get_llm_stats(recent=2)
+    assert stats["totals"]["message:m"]["calls"] == before + 2
+    assert stats["recent"][-1]["prompt_tokens"] == 120 and stats["recent"][-1]["usage_source"] == "provider"
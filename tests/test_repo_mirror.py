@@ -0,0 +1,105 @@
+import subprocess
+
+import pytest
+
+from backend.app.services import repo_mirror
+from backend.app.services.repo_mirror import MirrorCache
+
+
+def _git(cwd, *args):
+    subprocess.run(["git", *args], cwd=cwd, check=True, capture_output=True)
+
+
+@pytest.fixture
+def origin(tmp_path):
+    repo = tmp_path / "origin"
+    repo.mkdir()
+    _git(repo, "init", "-q", "-b", "main")
+    _git(repo, "config", "user.email", "t@example.com")
+    _git(repo, "config", "user.name", "t")
+    (repo / "services").mkdir()
+    (repo / "services" / "a.py").write_text("A = 1\n")
+    (repo / "README.md").write_text("hello\n")
+    _git(repo, "add", ".")
+    _git(repo, "commit", "-q", "-m", "init")
+    return repo
+
+
+def test_reads_and_lists_from_mirror(tmp_path, origin):
+    cache = MirrorCache(root=tmp_path / "mirrors", fetch_ttl=3600)
+    url = origin.as_uri()
+    try:
+        f = cache.read_file(url, "services/a.py")
+        assert f["content"] == "A = 1\n" and len(f["sha"]) == 40
+        assert cache.read_file(url, "README.md", ref="main")["content"] == "hello\n"
+
+        tree = {t["path"]: t for t in cache.list_tree(url)}
+        assert tree["services"]["type"] == "tree"
+        assert tree["services/a.py"]["type"] == "blob" and tree["services/a.py"]["size"] == 6
+
+        with pytest.raises(FileNotFoundError):
+            cache.read_file(url, "nope.txt")
+    finally:
+        cache.close()
+
+
+def test_incremental_fetch_picks_up_new_commits(tmp_path, origin):
+    cache = MirrorCache(root=tmp_path / "mirrors", fetch_ttl=3600)
+    url = origin.as_uri()
+    try:
+        cache.read_file(url, "services/a.py")
+        (origin / "services" / "b.py").write_text("B = 2\n")
+        (origin / "services" / "a.py").write_text("A = 3\n")
+        _git(origin, "add", ".")
+        _git(origin, "commit", "-q", "-m", "more")
+
+        # a missing path forces a fetch even inside the TTL
+        assert cache.read_file(url, "services/b.py")["content"] == "B = 2\n"
+        assert cache.read_file(url, "services/a.py")["content"] == "A = 3\n"
+    finally:
+        cache.close()
+
+
+def test_lru_eviction_by_disk_size(tmp_path, origin):
+    other = tmp_path / "other"
+    _git(tmp_path, "clone", "-q", str(origin), str(other))
+    cache = MirrorCache(root=tmp_path / "mirrors", max_bytes=1, fetch_ttl=3600)
+    try:
+        cache.read_file(origin.as_uri(), "README.md")
+        first = cache.mirror_path(origin.as_uri())
+        cache.read_file(other.as_uri(), "README.md")
+        assert not first.exists()
+        assert cache.mirror_path(other.as_uri()).exists()
+    finally:
+        cache.close()
+
+
+def test_reads_within_the_ttl_do_not_measure_the_cache(tmp_path, origin, monkeypatch):
+    walks = []
+    real = repo_mirror._dir_size
+    monkeypatch.setattr(repo_mirror, "_dir_size", lambda p: walks.append(p) or real(p))
+    cache = MirrorCache(root=tmp_path / "mirrors", fetch_ttl=3600)
+    try:
+        for _ in range(5):
+            cache.read_file(origin.as_uri(), "README.md")
+        cache.list_tree(origin.as_uri())
+        assert len(walks) == 1   # once, after the clone
+    finally:
+        cache.close()
+
+
+def test_mirror_in_use_is_not_evicted(tmp_path, origin):
+    other = tmp_path / "other"
+    _git(tmp_path, "clone", "-q", str(origin), str(other))
+    cache = MirrorCache(root=tmp_path / "mirrors", max_bytes=1, fetch_ttl=3600)
+    try:
+        cache.read_file(origin.as_uri(), "README.md")
+        first = cache.mirror_path(origin.as_uri())
+        with cache._using(str(first)):   # a read of the first mirror is in progress
+            cache.read_file(other.as_uri(), "README.md")
+            assert first.exists()
+        # once idle it goes with the next sync
+        cache.ensure(other.as_uri(), force_fetch=True)
+        assert not first.exists()
+    finally:
+        cache.close()
@@ -0,0 +1,102 @@
+import time
+import threading
+
+import pytest
+
+from backend.app.services import resilience
+
+
+def _boom():
+    raise RuntimeError("down")
+
+
+def test_breaker_opens_then_half_opens_and_closes():
+    br = resilience.CircuitBreaker("test", failure_threshold=2, reset_timeout=0.1)
+    for _ in range(2):
+        with pytest.raises(RuntimeError):
+            br.call(_boom)
+    assert br.state == "open"
+    with pytest.raises(resilience.CircuitOpenError):
+        br.call(lambda: "never called")
+
+    time.sleep(0.12)
+    assert br.state == "half_open"
+    assert br.allow() and not br.allow()   # a single trial call
+    br.record_success()
+    assert br.state == "closed" and br.call(lambda: "ok") == "ok"
+    assert br.snapshot()["rejected"] == 2 and br.snapshot()["opened"] == 1
+
+
+def test_failed_trial_reopens():
+    br = resilience.CircuitBreaker("test", failure_threshold=1, reset_timeout=0.05)
+    with pytest.raises(RuntimeError):
+        br.call(_boom)
+    time.sleep(0.06)
+    with pytest.raises(RuntimeError):
+        br.call(_boom)
+    assert br.state == "open"
+
+
+def test_deadline_caps_timeouts_and_nests():
+    assert resilience.timeout(10) == 10
+    with resilience.deadline(5):
+        assert resilience.timeout(10) <= 5
+        with resilience.deadline(60):   # the outer, earlier deadline wins
+            assert resilience.remaining() <= 5
+        with resilience.deadline(0.01):
+            time.sleep(0.02)
+            with pytest.raises(resilience.DeadlineExceeded):
+                resilience.timeout(10)
+    assert resilience.remaining() is None
+
+
+def test_retry_backs_off_within_bounds():
+    assert all(0 <= resilience.backoff(a, base=0.5, cap=2) <= min(2, 0.5 * 2 ** (a - 1)) for a in range(1, 8))
+    calls = []
+
+    def flaky():
+        calls.append(1)
+        if len(calls) < 3:
+            raise ValueError("again")
+        return "ok"
+
+    assert resilience.retry(flaky, retries=3, base=0.001) == "ok" and len(calls) == 3
+
+
+def test_hedged_returns_the_faster_copy():
+    started = []
+    lock = threading.Lock()
+
+    def call():
+        with lock:
+            n = len(started)
+            started.append(n)
+        time.sleep(0.5 if n == 0 else 0.01)
+        return n
+
+    t0 = time.perf_counter()
+    assert resilience.hedged(call, hedge_after=0.05) == 1
+    assert time.perf_counter() - t0 < 0.4
+
+
+def test_hedged_propagates_the_deadline_to_copies():
+    seen = []
+
+    def call():
+        seen.append(resilience.remaining())
+        return "ok"
+
+    with resilience.deadline(5):
+        assert resilience.hedged(call, hedge_after=1) == "ok"
+    assert seen[0] is not None and seen[0] <= 5
+
+
+def test_hedge_stats_count_concurrent_calls():
+    before = resilience.hedge_stats()
+    threads = [threading.Thread(target=lambda: [resilience.hedged(lambda: 1, hedge_after=1) for _ in range(50)])
+               for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert resilience.hedge_stats()["calls"] - before["calls"] == 400
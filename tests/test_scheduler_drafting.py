@@ -0,0 +1,126 @@
+import asyncio
+
+import pytest
+
+from backend.app.services import scheduler, event_store
+
+
+@pytest.fixture(autouse=True)
+def _store(tmp_path, monkeypatch):
+    store = event_store.EventStore(tmp_path / "events.db")
+    monkeypatch.setattr(event_store, "_store", store)
+    return store
+
+
+class _FakeModel:
+    ACTIONS = {"t-urgent": "reply_urgent", "t-reply": "reply", "t-follow": "follow_up", "t-sum": "summarize"}
+
+    def __init__(self):
+        self.calls = 0
+
+    def batch_predict(self, states):
+        self.calls += 1
+        out = []
+        for s in states:
+            tid = s.split("|")[0].split(": ")[1].strip()
+            out.append({"action": self.ACTIONS[tid], "confidence": 0.9})
+        return out
+
+
+def _recorder(drafted):
+    def draft(source, state):
+        drafted.append(state.split("|")[0])
+        return {"subject": "", "body": f"draft for {state.split('|')[0]}", "model": "fake"}
+    return draft
+
+
+def _events(tid):
+    return [{"id": f"{tid}-1", "thread_id": tid, "actor": "other", "text": "hi",
+             "timestamp": "2024-01-01T00:00:00Z", "source": "discord"}]
+
+
+def test_drafts_by_priority_within_budget(monkeypatch):
+    monkeypatch.setenv("POLL_SKIP_UNCHANGED", "0")
+    model = _FakeModel()
+    drafted = []
+    monkeypatch.setattr(scheduler, "_MODEL", model)
+    monkeypatch.setattr(scheduler, "draft_for_state", _recorder(drafted))
+    monkeypatch.setenv("DRAFT_BUDGET_PER_POLL", "2")
+
+    fetched = {"discord": _events("t-follow") + _events("t-sum") + _events("t-reply"), "gmail": _events("t-urgent")}
+    out = asyncio.run(scheduler._draft_prioritized(fetched))
+
+    assert model.calls == 1
+    assert drafted == ["[Thread: t-urgent ", "[Thread: t-reply "]
+    assert out["drafted"] == 2 and out["deferred"] == 1
+    assert out["skipped"] == {"summarize": 1}
+
+
+def test_unchanged_threads_are_skipped_on_the_next_poll(monkeypatch):
+    monkeypatch.setattr(scheduler, "_MODEL", _FakeModel())
+    drafted = []
+    monkeypatch.setattr(scheduler, "draft_for_state", _recorder(drafted))
+
+    fetched = {"discord": _events("t-reply") + _events("t-sum")}
+    first = asyncio.run(scheduler._draft_prioritized(fetched))
+    assert first["drafted"] == 1 and first["unchanged"] == 0
+
+    second = asyncio.run(scheduler._draft_prioritized(fetched))
+    assert second["drafted"] == 0 and second["unchanged"] == 2 and second["skipped"] == {}
+
+    newer = {"id": "t-reply-2", "thread_id": "t-reply", "actor": "other", "text": "ping",
+             "timestamp": "2024-01-02T00:00:00Z", "source": "discord"}
+    third = asyncio.run(scheduler._draft_prioritized({"discord": fetched["discord"] + [newer]}))
+    assert third["drafted"] == 1 and third["unchanged"] == 1
+    assert len(drafted) == 2
+
+
+def test_poller_drafts_are_served_until_the_thread_changes(_store, monkeypatch):
+    monkeypatch.setattr(scheduler, "_MODEL", _FakeModel())
+    monkeypatch.setattr(scheduler, "draft_for_state", _recorder([]))
+    events = _events("t-reply")
+    _store.insert_events("discord", events)
+    asyncio.run(scheduler._draft_prioritized({"discord": events}))
+
+    state = scheduler.thread_state(_store.get_thread("discord", "t-reply", last=5))
+    cached = scheduler.cached_draft("discord", "t-reply", state)
+    assert cached["body"].startswith("draft for") and cached["model"] == "fake"
+    assert scheduler.cached_draft("discord", "t-reply", state, model="other") is None
+    assert scheduler.cached_draft("discord", "t-reply", state, max_words=50) is None
+
+    _store.insert_events("discord", events)   # already seen: draft kept
+    assert _store.get_draft("discord", "t-reply") is not None
+    _store.insert_events("discord", [{**events[0], "id": "t-reply-2", "timestamp": "2024-01-02T00:00:00Z"}])
+    assert _store.get_draft("discord", "t-reply") is None
+
+
+def test_drafts_use_stored_history_beyond_the_fetch_window(_store, monkeypatch):
+    monkeypatch.setattr(scheduler, "_MODEL", _FakeModel())
+    monkeypatch.setattr(scheduler, "draft_for_state", _recorder([]))
+    history = [{"id": f"m{i}", "thread_id": "t-reply", "actor": "other", "text": f"msg {i}",
+                "timestamp": f"2024-01-0{i}T00:00:00Z", "source": "discord"} for i in range(1, 4)]
+    _store.insert_events("discord", history)
+    fetched = [{**history[0], "id": "m4", "text": "msg 4", "timestamp": "2024-01-04T00:00:00Z"}]
+    _store.insert_events("discord", fetched)   # _poll stores before drafting
+    asyncio.run(scheduler._draft_prioritized({"discord": fetched}))
+
+    state = scheduler.thread_state(_store.get_thread("discord", "t-reply", last=5))
+    assert "msg 1" in state and "msg 4" in state
+    assert scheduler.cached_draft("discord", "t-reply", state) is not None
+
+
+def test_fingerprint_matches_the_worker_pipeline(_store, monkeypatch):
+    from backend.app.services import poll_pipeline
+    monkeypatch.setattr(scheduler, "_MODEL", _FakeModel())
+    monkeypatch.setattr(scheduler, "draft_for_state", _recorder([]))
+    older = {"id": "m2", "thread_id": "t-reply", "actor": "other", "text": "later",
+             "timestamp": "2024-01-05T00:00:00Z", "source": "discord"}
+    _store.insert_events("discord", [older])
+    # a late-arriving, older event: the fetched rows' newest is not the thread's newest
+    fetched = [{**older, "id": "m1", "text": "earlier", "timestamp": "2024-01-01T00:00:00Z"}]
+    _store.insert_events("discord", fetched)
+    asyncio.run(scheduler._draft_prioritized({"discord": fetched}))
+
+    assert _store.get_fingerprints("discord", ["t-reply"])["t-reply"]["last_event_id"] == "m2"
+    assert poll_pipeline.handle_normalize({"source": "discord", "thread_ids": ["t-reply"]}) == {"changed": 0,
+                                                                                              "unchanged": 1}
@@ -0,0 +1,80 @@
+import os
+import sys
+import json
+import time
+import subprocess
+
+from fastapi.testclient import TestClient
+
+from backend.app.api import app as api
+from backend.app.services import scheduler
+from backend.benchmarks import synthetic
+
+# libraries that must not load while the API module is imported
+HEAVY = ("pandas", "sklearn", "scipy", "numpy", "joblib", "openai", "googleapiclient", "feedparser", "apscheduler")
+# import budget of the API module (fastapi alone is ~0.3s); the default is generous enough for a
+# loaded machine but still catches a heavy import creeping back. Pinned CI runners can tighten it.
+IMPORT_BUDGET_SECONDS = float(os.getenv("IMPORT_BUDGET_SECONDS", "5"))
+
+_PROBE = """
+import sys, time, json
+t = time.perf_counter()
+import backend.app.api.app
+print(json.dumps({"seconds": time.perf_counter() - t, "heavy": [m for m in %r if m in sys.modules]}))
+"""
+
+
+def test_api_import_is_lazy_and_within_budget():
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join(p for p in sys.path if p)}
+    runs = []
+    for _ in range(2):   # the first run may also pay for cold .pyc/disk caches
+        out = subprocess.run([sys.executable, "-c", _PROBE % (HEAVY,)], env=env, capture_output=True,
+                             text=True, timeout=120)
+        assert out.returncode == 0, out.stderr
+        runs.append(json.loads(out.stdout.strip().splitlines()[-1]))
+    assert runs[-1]["heavy"] == []
+    assert min(r["seconds"] for r in runs) < IMPORT_BUDGET_SECONDS, runs
+
+
+def _isolate(monkeypatch, tmp_path):
+    synthetic.make_dataset(200).to_parquet(tmp_path / "dataset.parquet")
+    monkeypatch.setattr(api, "DATASET", tmp_path / "dataset.parquet")
+    monkeypatch.setattr(api, "STORAGE", tmp_path)
+    monkeypatch.setattr(api, "MODEL_PATH", tmp_path / "ai_stub.joblib")
+    monkeypatch.setattr(api, "MODEL", None)
+    monkeypatch.setattr(api, "READY", False)
+    monkeypatch.setattr(api, "WARMUP", {"state": "pending", "step": None, "done": [], "started_at": None,
+                                        "seconds": None, "error": None})
+    monkeypatch.setattr(scheduler, "_MODEL", None)
+
+
+def test_warm_up_fits_then_loads_and_reports_progress(monkeypatch, tmp_path):
+    _isolate(monkeypatch, tmp_path)
+    api.warm_up()
+    assert api.READY and api.WARMUP["state"] == "ready"
+    assert api.WARMUP["done"] == ["fit_model", "import:pandas", "import:openai"]
+    assert (tmp_path / "ai_stub.joblib").exists()
+    api.warm_up()
+    assert api.WARMUP["done"][0] == "load_model" and api.READY
+
+
+def test_startup_returns_before_the_model_is_ready(monkeypatch, tmp_path):
+    _isolate(monkeypatch, tmp_path)
+    monkeypatch.delenv("MODEL_WARMUP", raising=False)
+    client = TestClient(api.app)
+    api.startup()
+    health = client.get("/health").json()["warmup"]
+    assert health["state"] in ("running", "ready")   # never "pending": the state is set before the thread starts
+    deadline = time.time() + 60
+    while api.WARMUP["state"] == "running" and time.time() < deadline:
+        time.sleep(0.05)
+    assert client.get("/health").json()["warmup"]["state"] == "ready"
+    assert client.post("/recommend", json={"state": "can you review?"}).status_code == 200
+
+
+def test_failed_warm_up_is_reported(monkeypatch, tmp_path):
+    _isolate(monkeypatch, tmp_path)
+    monkeypatch.setattr(api, "DATASET", tmp_path / "missing.parquet")
+    api.warm_up()
+    assert not api.READY and api.WARMUP["state"] == "failed" and "missing" in api.WARMUP["error"]
+    assert TestClient(api.app).post("/recommend", json={"state": "x"}).status_code == 503
@@ -0,0 +1,71 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from backend.app.services import tracing, resilience, profiler
+
+
+@pytest.fixture(autouse=True)
+def _tracing():
+    tracing.set_enabled(True)
+    tracing.clear()
+    yield
+    tracing.set_enabled(False)
+    tracing.clear()
+
+
+@tracing.traced("leaf")
+def _leaf(delay):
+    time.sleep(delay)
+
+
+def test_spans_nest_and_follow_work_into_threads():
+    with tracing.span("root", req="a"):
+        _leaf(0.01)
+        with ThreadPoolExecutor(2) as pool:
+            resilience.submit(pool, _leaf, 0.01).result()
+    (trace,) = tracing.slowest(5)
+    assert trace["name"] == "root" and trace["attrs"] == {"req": "a"}
+    assert [c["name"] for c in trace["children"]] == ["leaf", "leaf"]
+    assert trace["duration_ms"] >= sum(c["duration_ms"] for c in trace["children"]) - 1
+
+
+def test_slowest_traces_first_and_errors_recorded():
+    for d in (0.001, 0.03, 0.01):
+        with tracing.span(f"t{d}"):
+            time.sleep(d)
+    with pytest.raises(ValueError):
+        with tracing.span("failing"):
+            raise ValueError("bad")
+    names = [t["name"] for t in tracing.slowest(10)]
+    assert names[0] == "t0.03" and len(names) == 4
+    failing = next(t for t in tracing.slowest(10) if t["name"] == "failing")
+    assert failing["attrs"]["error"].startswith("ValueError")
+
+
+def test_disabled_tracing_records_nothing():
+    tracing.set_enabled(False)
+    with tracing.span("root") as sp:
+        sp.set(x=1)
+        _leaf(0)
+    assert tracing.slowest() == []
+
+
+def test_profiler_produces_folded_stacks():
+    def busy():
+        end = time.time() + 0.3
+        while time.time() < end:
+            sum(range(1000))
+
+    with ThreadPoolExecutor(1) as pool:
+        fut = pool.submit(busy)
+        prof = profiler.profile_for(0.2, interval_ms=5)
+        fut.result()
+    lines = prof.folded().splitlines()
+    assert prof.samples > 5 and any("busy (test_tracing.py" in l for l in lines)
+    assert all(l.rsplit(" ", 1)[1].isdigit() for l in lines)
+    with pytest.raises(RuntimeError):
+        profiler.start()
+        profiler.start()
+    profiler.stop()
@@ -0,0 +1,42 @@
+import time
+
+from backend.app.services.work_queue import WorkQueue
+
+
+def test_claim_priority_dedup_and_ack(tmp_path):
+    q = WorkQueue(tmp_path / "queue.db")
+    low = q.enqueue("draft", {"t": "low"}, dedup_key="a", priority=0)
+    high = q.enqueue("draft", {"t": "high"}, dedup_key="b", priority=10)
+    # the pending job takes the newer payload and the higher priority
+    assert q.enqueue("draft", {"t": "newer"}, dedup_key="a", priority=20) == low
+
+    job = q.claim("draft", "w1")
+    assert job["id"] == low and job["payload"] == {"t": "newer"}
+    # a leased job keeps the payload it is running with
+    assert q.enqueue("draft", {"t": "late"}, dedup_key="a") == low
+    assert q.get(low)["payload"] == {"t": "newer"}
+
+    assert q.claim("draft", "w1")["id"] == high
+    assert q.ack(high, "w1", {"ok": True}) is True
+    assert q.get(high)["result"] == {"ok": True}
+    assert q.claim("draft", "w1") is None
+    # once the pending job is done its dedup key is free again
+    q.ack(low, "w1")
+    assert q.enqueue("draft", {"t": "again"}, dedup_key="a") is not None
+    assert q.stats()["draft"] == {"done": 2, "ready": 1}
+
+
+def test_expired_lease_is_reclaimed_and_failures_retry(tmp_path):
+    q = WorkQueue(tmp_path / "queue.db", max_attempts=2)
+    jid = q.enqueue("fetch", {"source": "gmail"})
+    assert q.claim("fetch", "dead-worker", lease_seconds=0.05)["id"] == jid
+    time.sleep(0.1)
+    job = q.claim("fetch", "w2")
+    assert job["id"] == jid and job["attempts"] == 2
+
+    # the first worker's lease was taken over: its late result is dropped
+    assert q.ack(jid, "dead-worker", {"stale": True}) is False
+    assert q.fail(jid, "dead-worker", "late") is False
+
+    assert q.fail(jid, "w2", "boom", retry_delay=0) is True
+    assert q.get(jid)["status"] == "failed" and q.get(jid)["result"] is None
@@ -0,0 +1,60 @@
+import sys
+import threading
+
+import pytest
+
+from backend.app import worker
+from backend.app.services import adaptive_schedule, coordination, poll_pipeline, work_queue
+
+
+def test_parse_concurrency():
+    assert worker._parse_concurrency("normalize=2, draft=4,bogus") == {"normalize": 2, "draft": 4}
+    assert worker._parse_concurrency("draft=0") == {"draft": 1}
+    assert worker._parse_concurrency("") == {}
+
+
+def test_unknown_stage_is_rejected(monkeypatch):
+    monkeypatch.setattr(sys, "argv", ["worker", "--stages", "fetch,nope", "--no-tick"])
+    with pytest.raises(SystemExit, match="nope"):
+        worker.main()
+
+
+def test_run_stage_processes_jobs_until_stopped(tmp_path, monkeypatch):
+    q = work_queue.WorkQueue(tmp_path / "queue.db")
+    monkeypatch.setattr(work_queue, "_queue", q)
+    handled = []
+    monkeypatch.setitem(poll_pipeline.HANDLERS, "draft", lambda payload: handled.append(payload) or {"ok": 1})
+    jid = q.enqueue("draft", {"thread_id": "t1"})
+
+    stop = threading.Event()
+    t = threading.Thread(target=poll_pipeline.run_stage, args=("draft", "w1", stop, 0.01))
+    t.start()
+    for _ in range(200):
+        if q.get(jid)["status"] == "done":
+            break
+        stop.wait(0.01)
+    stop.set()
+    t.join(2)
+
+    assert not t.is_alive()
+    assert handled == [{"thread_id": "t1"}] and q.get(jid)["result"] == {"ok": 1}
+
+
+def test_a_failed_tick_is_logged_and_the_next_one_runs(tmp_path, monkeypatch):
+    monkeypatch.setenv("COORDINATION_DB_PATH", str(tmp_path / "coord.db"))
+    monkeypatch.setattr(work_queue, "_queue", work_queue.WorkQueue(tmp_path / "queue.db"))
+    monkeypatch.setattr(adaptive_schedule, "due", lambda sources: ["gmail"])
+    enqueued = []
+
+    def enqueue_poll(sources):
+        enqueued.append(sources)
+        if len(enqueued) == 1:
+            raise RuntimeError("database is locked")
+
+    monkeypatch.setattr(poll_pipeline, "enqueue_poll", enqueue_poll)
+    lease = coordination.LeaderLease("poll-ticker", ttl=30)
+
+    worker._tick(lease)
+    assert lease.is_leader is False
+    worker._tick(lease)
+    assert lease.is_leader is True and enqueued == [["gmail"], ["gmail"]]